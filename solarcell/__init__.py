@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Package 'solarcell' of project 'Solar Cell'
+                solarcell.constants         physical constants
+                solarcell.parameters        silicon semiconductor parameters (bandgap.py, mobilities.py, ...)
+                solarcell.twodiodemodel     two-diode-model, its fits and measurement input/output
+                solarcell.cli               command line interface
+            Submodules (and numpy, scipy) are imported on first access, so 'import solarcell' is instantaneous
+
+Requires:   -
+"""
+
+import importlib
+#==============================================================================
+
+__version__ = '0.2.0'
+
+submodules = ('constants', 'parameters', 'twodiodemodel', 'cli')
+
+
+
+def __getattr__(name):
+    """
+    Import submodule name on first access (e.g. solarcell.twodiodemodel)
+    """
+
+    if name in submodules:
+        return importlib.import_module('.' + name, __name__)
+
+    raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+
+
+
+def __dir__():
+    return sorted(list(globals()) + list(submodules))
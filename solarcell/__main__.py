@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Run the command line interface with 'python -m solarcell'
+
+Requires:   cli.py
+"""
+
+from solarcell.cli import main
+#==============================================================================
+
+main()
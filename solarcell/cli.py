@@ -0,0 +1,516 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Headless command line interface for batch runs of project 'Solar Cell', driven by a JSON config file
+                solarcell characteristics config.json   U_oc, J_sc, U_MPP, J_MPP, S_MPP, FF, eta of every cell of a parameter sweep
+                solarcell sweep config.json             J(U) and P(U) curves of every cell of a parameter sweep
+                solarcell fit config.json               two-diode-model fit of measured curves (directory or campaign)
+                solarcell table config.json             any parameter model (e.g. mobilities.Klaassen.mu_i_bulk) on an N-D grid
+                solarcell figures [script ...]          figures of the exampleplot scripts, rendered off-screen in parallel (see figures.py)
+                solarcell serve [--socket PATH]         local micro-batching evaluation service (see service.py)
+            Results are streamed to CSV or to a binary table (one raw little-endian file per column, see class TableWriter)
+            matplotlib is only imported with option --plot and by command figures
+
+Requires:   twodiodemodel.py, twodiodemodel_batch.py, twodiodemodel_fit.py, measurement_io.py, grid_evaluator.py (imported on use)
+
+===============================================================================
+CONFIG (JSON, SI units without prefixes, every key optional):
+    "cell":         values of the base cell, e.g. {"J_ph": -350.0, "J_s1": 1.0e-8, "J_s2": 1.0e-5, "R_s": 5.0e-5, "R_p": 0.3,
+                    "T_ini": 298.15, "T_sim": 333.15, "J_sx_on": 1, "E_g_on": 1, "N_a": 1.0e24}, defaults: class SiCell
+    "sweep":        values swept on a grid, e.g. {"T_sim": [278.15, 333.15], "R_s": {"start": 1.0e-5, "stop": 1.0e-4, "num": 10}}
+                    an axis is a list or {"start", "stop", "step"} or {"start", "stop", "num"(, "log": true)}
+    "U":            voltages of the curves (sweep), default {"start": 0.0, "stop": 0.71, "step": 0.005}
+    "output":       output file (directory for binary tables / campaigns)
+    "format":       "csv" (default), "columns" (binary table) or "campaign" (sweep only, see measurement_io.Campaign)
+    "chunk_size":   cells per vectorized batch, default 4096
+    "cache":        persistent result cache of characteristics and sweep (see result_cache.ResultCache): true (default path)
+                    or path of the SQLite file, "cache_size" in B
+fit:
+    "measurements": directory of paired U/J files ("pattern", default "*_U.txt"), converted into campaign "campaign"
+    "campaign":     campaign directory of the measured curves
+    "processes", "fit_chunk_size": see twodiodemodel_fit.BatchFit
+table:
+    "model":        "module.Class.method" of the parameter modules, e.g. "carrier_concentrations.Kimmerle.np" (or any importable module)
+    "axes":         list of axes (see "sweep"), one per argument of the method, output ".npy" or ".csv"
+    "processes", "table_chunk_size": see grid_evaluator.GridEvaluator
+===============================================================================
+"""
+
+import argparse
+import csv
+import importlib
+import itertools
+import json
+import os
+import numpy as np
+#==============================================================================
+
+set_values_names = ('J_ph', 'J_s1', 'J_s2', 'R_s', 'R_p', 'T_ini', 'T_sim')
+fit_options_names = ('fit_J_sx_on', 'fit_tau_on')
+active_effects_names = ('J_sx_on', 'E_g_on', 'm_x_eff_on', 'D_x_on', 'mu_x_on')
+characteristics_names = ('U_oc', 'J_sc', 'U_MPP', 'J_MPP', 'S_MPP', 'FF', 'eta')
+
+
+
+class TableWriter:
+    """
+    Table writer class
+
+    Streams rows of a table with fixed columns to a CSV file (format 'csv') or to a binary table (format 'columns'):
+    a directory with one raw little-endian float64 file '<column>.bin' per column and 'schema.json',
+    readable with numpy.fromfile / numpy.memmap.
+    """
+
+    def __init__(self, path, columns, format='csv'):
+        self.path = path
+        self.columns = list(columns)
+        self.format = format
+        self.n_rows = 0
+        if format == 'csv':
+            self.fobj = open(path, 'w', newline='')
+            self.writer = csv.writer(self.fobj)
+            self.writer.writerow(self.columns)
+        elif format == 'columns':
+            os.makedirs(path, exist_ok=True)
+            self.files = [open(os.path.join(path, name + '.bin'), 'wb') for name in self.columns]
+        else:
+            raise ValueError("unknown table format '%s'" % format)
+
+
+
+    def write(self, data):
+        """
+        Append rows, data is a sequence of one array per column (all of equal length)
+        """
+
+        data = [np.asarray(d, dtype='<f8').ravel() for d in np.broadcast_arrays(*data)]
+        if self.format == 'csv':
+            self.writer.writerows(zip(*(d.tolist() for d in data)))
+            self.fobj.flush()
+        else:
+            for fobj, d in zip(self.files, data):
+                d.tofile(fobj)
+        self.n_rows += data[0].size
+
+
+
+    def close(self):
+        if self.format == 'csv':
+            self.fobj.close()
+        else:
+            for fobj in self.files:
+                fobj.close()
+            with open(os.path.join(self.path, 'schema.json'), 'w') as fobj:
+                json.dump({'n_rows': self.n_rows, 'columns': {name: '<f8' for name in self.columns}}, fobj)
+
+
+
+    def __enter__(self):
+        return self
+
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+
+#==============================================================================
+# config helpers
+def axis_values(spec):
+    """
+    Values of one axis: list, {"start", "stop", "step"} or {"start", "stop", "num"(, "log": true)}
+    """
+
+    if isinstance(spec, dict):
+        if 'step' in spec:
+            return np.arange(spec['start'], spec['stop'], spec['step'])
+        if spec.get('log', False):
+            return np.geomspace(spec['start'], spec['stop'], spec['num'])
+        return np.linspace(spec['start'], spec['stop'], spec['num'])
+
+    return np.atleast_1d(np.asarray(spec, dtype=float))
+
+
+
+def cells(config):
+    """
+    Generator of the cell values (dictionaries) of the sweep grid, returns the swept names and the generator
+    """
+
+    base = config.get('cell', {})
+    sweep = config.get('sweep', {})
+    names = list(sweep)
+    axes = [axis_values(sweep[name]) for name in names]
+
+    def generate():
+        for combination in itertools.product(*axes):
+            values = dict(base)
+            values.update(zip(names, (float(c) for c in combination)))
+            yield values
+
+    return names, generate()
+
+
+
+def chunks(iterable, size):
+    """
+    Split iterable into lists of at most size items
+    """
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+
+def configure_cell(cell, values):
+    """
+    Set all values (dictionary) of a 'twodiodemodel.SiCell' and calculate its simulation values J_s1, J_s2 at T_sim
+    """
+
+    for name, value in values.items():
+        if name in set_values_names or name in fit_options_names or name in active_effects_names:
+            continue
+        if not hasattr(type(cell), name):
+            raise ValueError("unknown cell value '%s'" % name)
+        setattr(cell, name, value)
+    cell.set_values(*(values.get(name, getattr(type(cell), name + '_T_ini' if name in ('J_s1', 'J_s2') else name)) for name in set_values_names))
+    cell.set_fit_options(*(values.get(name, getattr(type(cell), name)) for name in fit_options_names))
+    cell.set_active_effects(*(values.get(name, getattr(type(cell), name)) for name in active_effects_names))
+
+    return cell
+
+
+
+def batch_of(chunk, cell):
+    """
+    Vectorized cell ('twodiodemodel_batch.SiCellBatch', parameters of shape (n_cells, 1)) of a chunk of cell values
+    """
+
+    from .twodiodemodel import twodiodemodel_batch as tdb
+
+    parameters = []
+    for values in chunk:
+        configure_cell(cell, values)
+        parameters.append((cell.J_ph, cell.J_s1, cell.J_s2, cell.R_s, cell.R_p, cell.T_sim))
+    batch = tdb.SiCellBatch(*np.array(parameters).T[:, :, None])
+    batch.accuracy = cell.accuracy
+    batch.U_min = cell.U_min
+    batch.U_max = cell.U_max
+
+    return batch
+
+
+
+def output_of(config, default):
+    return config.get('output', default)
+
+
+
+def cache_of(config):
+    """
+    Persistent result cache of the config or None
+    """
+
+    if not config.get('cache'):
+        return None
+    from .twodiodemodel import result_cache as rc
+
+    return rc.ResultCache(None if config['cache'] is True else config['cache'], config.get('cache_size'))
+
+
+
+#==============================================================================
+# commands
+def characteristics(config):
+    """
+    Solar cell characteristics of every cell of the sweep
+    """
+
+    from .twodiodemodel import twodiodemodel as tdm
+
+    names, generator = cells(config)
+    cell = tdm.SiCell()
+    cache = cache_of(config)
+    state = cache.state(tdm.SiCell()) if cache is not None else None
+    index = 0
+    with TableWriter(output_of(config, 'characteristics.csv'), ['cell'] + names + list(characteristics_names), config.get('format', 'csv')) as writer:
+        for chunk in chunks(generator, config.get('chunk_size', 4096)):
+            compute = lambda: batch_of(chunk, cell).characteristics()[:, :, 0]
+            result = compute() if cache is None else cache.cached(cache.key('cli.characteristics', chunk, state), compute)
+            swept = [[values[name] for values in chunk] for name in names]
+            writer.write([np.arange(index, index + len(chunk))] + swept + list(result))
+            index += len(chunk)
+
+    return index
+
+
+
+def sweep(config, plot=None):
+    """
+    J(U) and P(U) curves of every cell of the sweep
+    """
+
+    from .twodiodemodel import twodiodemodel as tdm
+
+    names, generator = cells(config)
+    U = axis_values(config.get('U', {'start': 0.0, 'stop': 0.71, 'step': 0.005}))
+    cell = tdm.SiCell()
+    cache = cache_of(config)
+    state = cache.state(tdm.SiCell()) if cache is not None else None
+    format = config.get('format', 'csv')
+    output = output_of(config, 'sweep' if format == 'campaign' else 'sweep.csv')
+    if format == 'campaign':
+        from .twodiodemodel import measurement_io as mio
+        writer = mio.CampaignWriter(output)
+    else:
+        writer = TableWriter(output, ['cell'] + names + ['U', 'J', 'P'], format)
+    figure = None
+    if plot:
+        figure = Figure(plot)
+
+    index = 0
+    with writer:
+        for chunk in chunks(generator, config.get('chunk_size', 4096)):
+            compute = lambda: batch_of(chunk, cell).j(U)
+            J = compute() if cache is None else cache.cached(cache.key('cli.sweep', chunk, state, U), compute)
+            for k, values in enumerate(chunk):
+                if format == 'campaign':
+                    writer.add(U, J[k], T=values.get('T_sim', tdm.SiCell.T_sim), cell_id=str(index + k))
+                else:
+                    writer.write([index + k] + [values[name] for name in names] + [U, J[k], U * J[k]])
+                if figure is not None:
+                    figure.add(U, J[k], ', '.join('%s = %g' % (name, values[name]) for name in names))
+            index += len(chunk)
+    if figure is not None:
+        figure.save()
+
+    return index
+
+
+
+def fit(config):
+    """
+    Two-diode-model fit of all measured curves
+    """
+
+    from .twodiodemodel import twodiodemodel as tdm
+    from .twodiodemodel import twodiodemodel_fit as tdf
+
+    campaign = config.get('campaign')
+    if 'measurements' in config:
+        from .twodiodemodel import measurement_io as mio
+        campaign = campaign or output_of(config, 'fit.csv') + '.campaign'
+        mio.MeasurementIO().read_directory(config['measurements'], campaign, config.get('pattern', '*_U.txt'))
+    if campaign is None:
+        raise ValueError("config needs 'measurements' or 'campaign'")
+
+    batch_fit = tdf.BatchFit(configure_cell(tdm.SiCell(), config.get('cell', {})))
+    batch_fit.processes = config.get('processes', batch_fit.processes)
+    batch_fit.chunk_size = config.get('fit_chunk_size', batch_fit.chunk_size)
+    n_curves, unused_n_failed = batch_fit.run(campaign, output_of(config, 'fit.csv'))
+
+    return n_curves
+
+
+
+def table(config):
+    """
+    Parameter model on the grid spanned by the axes
+    """
+
+    from .parameters import grid_evaluator as ge
+
+    module_name, class_name, method_name = config['model'].rsplit('.', 2)
+    if '.' not in module_name:
+        module_name = __package__ + '.parameters.' + module_name
+    model = getattr(getattr(importlib.import_module(module_name), class_name)(), method_name)
+    axes = [axis_values(spec) for spec in config['axes']]
+    output = output_of(config, 'table.npy')
+    npy = output if output.endswith('.npy') else output + '.npy'
+
+    evaluator = ge.GridEvaluator()
+    evaluator.processes = config.get('processes', evaluator.processes)
+    evaluator.chunk_size = config.get('table_chunk_size', evaluator.chunk_size)
+    result = evaluator.evaluate(model, axes, npy, config.get('vectorized', True))
+    if npy == output:
+        return result.size
+
+    # CSV: axis coordinates and results, streamed in chunks of the memory-mapped result
+    shape = tuple(a.size for a in axes)
+    size = int(np.prod(shape))
+    flat = result.reshape(size, -1)
+    columns = ['x%d' % i for i in range(len(axes))] + ['y%d' % i for i in range(flat.shape[1])]
+    with TableWriter(output, columns, 'csv') as writer:
+        for start in range(0, size, evaluator.chunk_size):
+            index = np.arange(start, min(start + evaluator.chunk_size, size))
+            coordinates = [a[i] for a, i in zip(axes, np.unravel_index(index, shape))]
+            writer.write(coordinates + list(flat[index].T))
+    del result, flat
+    os.remove(npy)
+    os.remove(npy + '.done.npy')
+    os.remove(npy + '.fingerprint')
+
+    return size
+
+
+
+def figures(config):
+    """
+    Figures of the exampleplot scripts (short names like 'bandgap' or module names), rendered in parallel
+    """
+
+    from . import figures as fg
+
+    renderer = fg.FigureRenderer(output_of(config, 'figures'))
+    renderer.processes = config.get('processes', renderer.processes)
+    modules = []
+    for name in config.get('scripts') or renderer.exampleplots:
+        matches = [module for module in renderer.exampleplots if module.endswith('.' + name + '_exampleplot')]
+        modules.append(matches[0] if matches else name)
+    results = renderer.render(modules, config.get('data'))
+    n_figures = 0
+    for module in modules:
+        if isinstance(results[module], Exception):
+            print('%s: %s' % (module, results[module]))
+        else:
+            n_figures += len(results[module])
+
+    return n_figures
+
+
+
+def serve(args):
+    """
+    Run the evaluation service until interrupted
+    """
+
+    import asyncio
+    from . import service as sv
+
+    async def run():
+        service = sv.Service()
+        if args.window is not None:
+            service.window = args.window
+        server = await service.serve(args.socket, args.host, args.port)
+        print('serving on %s' % ', '.join(str(sock.getsockname()) for sock in server.sockets), flush=True)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+
+class Figure:
+    """
+    Figure class (off-screen, matplotlib is imported on first use only)
+    """
+
+    max_curves = 100
+
+
+
+    def __init__(self, path):
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as mpl_p
+
+        self.path = path
+        self.mpl_p = mpl_p
+        self.fig = mpl_p.figure()
+        self.ax = self.fig.add_subplot(111)
+        self.ax.set_xlabel(r'Spannung   $U / V$')
+        self.ax.set_ylabel(r'Stromdichte   $\vec{J} / \frac{A}{m^2}$')
+        self.n_curves = 0
+
+
+
+    def add(self, U, J, label):
+        if self.n_curves < self.max_curves:
+            self.ax.plot(U, J, label=label or None)
+        self.n_curves += 1
+
+
+
+    def save(self):
+        from . import figures as fg
+
+        if 0 < self.n_curves <= 10:
+            self.ax.legend()
+        fg.FigureRenderer().decimate_figure(self.fig)
+        self.fig.savefig(self.path)
+        self.mpl_p.close(self.fig)
+
+
+
+#==============================================================================
+def main(argv=None):
+    """
+    Entry point of the console script 'solarcell'
+    """
+
+    parser = argparse.ArgumentParser(prog='solarcell', description='Batch runs of project Solar Cell (see module docstring of solarcell.cli for the config keys)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, text in (('characteristics', 'solar cell characteristics of a parameter sweep'),
+                       ('sweep', 'J(U) curves of a parameter sweep'),
+                       ('fit', 'two-diode-model fit of measured curves'),
+                       ('table', 'parameter model on an N-D grid'),
+                       ('figures', 'figures of the exampleplot scripts'),
+                       ('serve', 'local micro-batching evaluation service')):
+        subparser = subparsers.add_parser(name, help=text)
+        if name == 'figures':
+            subparser.add_argument('scripts', nargs='*', help='exampleplot scripts (e.g. bandgap), default: all')
+            subparser.add_argument('-o', '--output', help='output directory, default figures')
+            subparser.add_argument('--data', help='directory the scripts run in (measurements of twodiodemodel_exampleplot)')
+            subparser.add_argument('-j', '--processes', type=int, help='worker processes, default: number of CPUs')
+            continue
+        if name == 'serve':
+            subparser.add_argument('--socket', help='Unix socket path (default: TCP)')
+            subparser.add_argument('--host', default='127.0.0.1', help='TCP host, default 127.0.0.1')
+            subparser.add_argument('--port', type=int, default=8765, help='TCP port, default 8765')
+            subparser.add_argument('--window', type=float, help='batch window in s, default service.Service.window')
+            continue
+        subparser.add_argument('config', help='JSON config file')
+        subparser.add_argument('-o', '--output', help='output file (overrides the config)')
+        if name in ('characteristics', 'sweep'):
+            subparser.add_argument('-f', '--format', choices=('csv', 'columns', 'campaign') if name == 'sweep' else ('csv', 'columns'),
+                                   help='output format (overrides the config)')
+        if name == 'sweep':
+            subparser.add_argument('--plot', metavar='PNG', help='also plot the curves into PNG (imports matplotlib)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        return serve(args)
+    if args.command == 'figures':
+        config = {'scripts': args.scripts, 'data': args.data, 'processes': args.processes}
+    else:
+        with open(args.config) as fobj:
+            config = json.load(fobj)
+    if args.output:
+        config['output'] = args.output
+    if getattr(args, 'format', None):
+        config['format'] = args.format
+
+    if args.command == 'characteristics':
+        n = characteristics(config)
+    elif args.command == 'sweep':
+        n = sweep(config, args.plot)
+    elif args.command == 'fit':
+        n = fit(config)
+    elif args.command == 'figures':
+        n = figures(config)
+    else:
+        n = table(config)
+    print('%s: %d rows -> %s' % (args.command, n, config.get('output', '(default output)')))
+
+    return 0
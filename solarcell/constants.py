@@ -23,6 +23,10 @@ k_B_J = 1.380649e-23        # Botzmann constant k (herein k_B_J) in J/K
                             # uncertainties:    exact
 k_B = k_B_J/q_e             # Botzmann constant k (herein k_B) in eV/K
                             # uncertainties:    depends on machine epsilon        (exact value: 8.617 333 262 145 177 ... e-5)
+c_0 = 299792458.0           # Speed of light in vacuum c_0 in m/s
+                            # uncertainties:    exact
+eps_0 = 8.8541878128e-12    # Vacuum permittivity epsilon_0 (herein eps_0) in F/m
+                            # uncertainties:    u(epsilon_0) = 0.000 000 0013 e-12    u_r(epsilon_0) = 1.5 e-10
 
 # other conventions
 T_STC = 273.15 + 25.0       # STC-temperature in K
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Render the figures of the exampleplot scripts off-screen (Agg) in parallel worker processes
+            Decimate dense curves to pixel resolution (first, last, minimum and maximum point per pixel column)
+            Cache the computed data of a figure (npz), so re-styling a figure does not recompute the physics
+
+            Also a matplotlib backend: with MPLBACKEND=module://solarcell.figures every 'mpl_p.show()' of a script
+            decimates and saves all open figures to FigureRenderer.directory instead of opening windows, e.g.
+                MPLBACKEND=module://solarcell.figures python -m solarcell.parameters.bandgap_exampleplot
+
+Requires:   matplotlib
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import contextlib
+import hashlib
+import importlib.util
+import inspect
+import io
+import os
+import runpy
+import sys
+import numpy as np
+import matplotlib
+from matplotlib.backend_bases import FigureManagerBase
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+#==============================================================================
+
+class DataCache:
+    """
+    Data cache class
+
+    Call method 'get' with *args 'name, compute' to get the dictionary of arrays returned by compute() from
+    '<directory>/<name>-<key>.npz'; compute is only called if the key changed. The key hashes the source code of compute
+    and the source files of the declared dependencies (module names, default: solarcell.constants and all submodules of
+    solarcell.parameters and solarcell.twodiodemodel, found without importing them), so changing a model invalidates the
+    data, changing only the plotting code of a script does not. Constants used by compute must be defined inside of it.
+    The default directory is figures/cache of the repository (next to the package), wherever the process was started.
+    """
+
+    directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'figures', 'cache')
+    dependencies = None                 # module names hashed into the key, None: all model modules (see model_modules)
+
+
+
+    def __init__(self, directory=None, dependencies=None):
+        if directory is not None:
+            self.directory = directory
+        if dependencies is not None:
+            self.dependencies = tuple(dependencies)
+
+
+
+    def model_modules(self):
+        """
+        Names of the model modules: solarcell.constants and the submodules of solarcell.parameters and solarcell.twodiodemodel
+        (without the exampleplot scripts)
+        """
+
+        from . import parameters, twodiodemodel
+
+        names = [__package__ + '.constants']
+        for package in (parameters, twodiodemodel):
+            names += [package.__name__ + '.' + name for name in package.submodules if not name.endswith('_exampleplot')]
+
+        return names
+
+
+
+    def key(self, compute):
+        """
+        Hash of the source code of compute and of the source files of the dependencies
+        """
+
+        digest = hashlib.sha256(inspect.getsource(compute).encode())
+        for name in sorted(self.model_modules() if self.dependencies is None else self.dependencies):
+            spec = importlib.util.find_spec(name)
+            if spec is None or not spec.origin or not os.path.isfile(spec.origin):
+                raise ValueError("unknown dependency '%s' of the data cache" % name)
+            digest.update(name.encode())
+            with open(spec.origin, 'rb') as fobj:
+                digest.update(fobj.read())
+
+        return digest.hexdigest()[:16]
+
+
+
+    def get(self, name, compute):
+        """
+        Return the cached data of figure name, call compute (returns a dictionary of arrays) on a cache miss
+        """
+
+        path = os.path.join(self.directory, '%s-%s.npz' % (name, self.key(compute)))
+        if os.path.isfile(path):
+            with np.load(path) as data:
+                return {key: data[key] for key in data.files}
+
+        data = {key: np.asarray(value) for key, value in compute().items()}
+        os.makedirs(self.directory, exist_ok=True)
+        for fname in os.listdir(self.directory):
+            if fname.startswith(name + '-') and fname.endswith('.npz'):
+                os.remove(os.path.join(self.directory, fname))
+        temporary = path + '.tmp.npz'
+        np.savez(temporary, **data)
+        os.replace(temporary, path)
+
+        return data
+
+
+
+class FigureRenderer:
+    """
+    Figure renderer class
+
+    Call method 'render' with *args 'modules' (default: all exampleplot scripts) to run the scripts in parallel worker processes
+    with this module as matplotlib backend. Figures are saved as '<directory>/<label>.png' (label set by the script with
+    'fig.set_label', otherwise '<script>_<number>'); scripts run in directory data (e.g. the measurements folder).
+    """
+
+    exampleplots = ('solarcell.parameters.bandgap_exampleplot',
+                    'solarcell.parameters.carrier_concentrations_exampleplot',
+                    'solarcell.parameters.chemical_potential_exampleplot',
+                    'solarcell.parameters.effective_masses_exampleplot',
+                    'solarcell.parameters.thermal_voltage_exampleplot',
+                    'solarcell.twodiodemodel.twodiodemodel_exampleplot')
+    directory = 'figures'
+    script = 'figure'
+    processes = None                    # worker processes, None: number of CPUs
+    decimation = 4                      # decimate curves with more than decimation points per pixel column
+    saved = []
+
+
+
+    def __init__(self, directory=None):
+        if directory is not None:
+            self.directory = directory
+
+
+
+    def decimate(self, x, y, n_columns=None):
+        """
+        Purpose:    Reduce a curve to the points that are visible at pixel resolution
+
+        Model:      Points are grouped into runs of the same pixel column of x (M4 aggregation); of every run
+                    the first, last, minimum and maximum point (in y) are kept in their original order, so extrema and
+                    the connecting lines between neighbouring columns are drawn exactly. Non-finite points are kept (gaps)
+
+        Input:      Pixel coordinates x, y (or data coordinates and the number of pixel columns n_columns spanning x)
+
+        Output:     Indices of the kept points
+        """
+
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if x.size == 0:
+            return np.arange(0)
+        finite = np.isfinite(x) & np.isfinite(y)
+        if n_columns is not None and finite.any():
+            x_min = x[finite].min()
+            x = (x - x_min) / max(x[finite].max() - x_min, np.finfo(float).tiny) * n_columns
+        column = np.where(finite, np.floor(np.where(finite, x, 0.0)), np.nan)
+        new_run = np.ones(x.size, dtype=bool)
+        new_run[1:] = ~(column[1:] == column[:-1])          # non-finite points form runs of their own
+        run = np.cumsum(new_run) - 1
+        starts = np.flatnonzero(new_run)
+        ends = np.append(starts[1:], x.size) - 1
+        order = np.lexsort((np.where(finite, y, 0.0), run))          # by run, then by y
+        minima = np.searchsorted(run[order], np.arange(starts.size))
+        maxima = np.append(minima[1:], x.size) - 1
+
+        return np.unique(np.concatenate((starts, ends, order[minima], order[maxima])))
+
+
+
+    def decimate_figure(self, fig):
+        """
+        Decimate all dense lines without markers of figure fig to the pixel resolution of their axes
+        """
+
+        for ax in fig.axes:
+            ax.get_xlim()                   # fix the autoscaled view limits before the data changes
+            ax.get_ylim()
+            n_columns = max(int(ax.bbox.width), 1)
+            for line in ax.get_lines():
+                x, y = (np.asarray(data, dtype=float) for data in line.get_data())
+                if line.get_marker() not in ('None', 'none', '', ' ', None) or x.size <= self.decimation * n_columns:
+                    continue
+                xy = line.get_transform().transform(np.column_stack((x, y)))
+                index = self.decimate(xy[:, 0], xy[:, 1])
+                line.set_data(x[index], y[index])
+
+
+
+    def save_all(self):
+        """
+        Decimate and save all open figures of pyplot, returns the file names
+        """
+
+        import matplotlib.pyplot as mpl_p
+
+        os.makedirs(self.directory, exist_ok=True)
+        fnames = []
+        for number in mpl_p.get_fignums():
+            fig = mpl_p.figure(number)
+            self.decimate_figure(fig)
+            fname = os.path.join(self.directory, (fig.get_label() or '%s_%d' % (self.script, number)) + '.png')
+            fig.savefig(fname)
+            fnames.append(fname)
+        mpl_p.close('all')
+        FigureRenderer.saved += fnames
+
+        return fnames
+
+
+
+    @staticmethod
+    def render_module(module, directory, cache_directory, data=None):
+        """
+        Run script module (worker process) with this module as matplotlib backend, returns the saved file names
+        """
+
+        matplotlib.use('module://' + __name__, force=True)
+        FigureRenderer.directory = directory
+        FigureRenderer.script = module.rsplit('.', 1)[-1].replace('_exampleplot', '')
+        FigureRenderer.saved = []
+        DataCache.directory = cache_directory
+        cwd = os.getcwd()
+        try:
+            if data is not None:
+                os.chdir(data)
+            with contextlib.redirect_stdout(io.StringIO()):
+                runpy.run_module(module, run_name='__main__')
+        finally:
+            os.chdir(cwd)
+
+        return FigureRenderer.saved
+
+
+
+    def render(self, modules=None, data=None, cache_directory=None):
+        """
+        Purpose:    Render the figures of all scripts modules (default: exampleplots) in parallel
+
+        Input:      Module names of the scripts, directory data the scripts run in (default: current directory)
+                    cache directory of class DataCache (default: '<directory>/cache')
+
+        Output:     Dictionary {module: list of saved file names or exception}
+        """
+
+        modules = self.exampleplots if modules is None else modules
+        directory = os.path.abspath(self.directory)
+        cache_directory = os.path.abspath(cache_directory or os.path.join(directory, 'cache'))
+        data = os.path.abspath(data) if data is not None else None
+        results = {}
+        with ProcessPoolExecutor(self.processes) as executor:
+            futures = {executor.submit(FigureRenderer.render_module, module, directory, cache_directory, data): module for module in modules}
+            for future in as_completed(futures):
+                exception = future.exception()
+                results[futures[future]] = future.result() if exception is None else exception
+
+        return results
+
+
+
+#==============================================================================
+# matplotlib backend interface (MPLBACKEND=module://solarcell.figures)
+FigureCanvas = FigureCanvasAgg
+FigureManager = FigureManagerBase
+
+
+
+def show(*args, **kwargs):
+    """
+    Save all open figures instead of showing them
+    """
+
+    return FigureRenderer().save_all()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Package 'solarcell.parameters' with the silicon semiconductor parameter models
+            Modules are imported on first access (e.g. solarcell.parameters.mobilities)
+
+Requires:   -
+"""
+
+import importlib
+#==============================================================================
+
+submodules = ('bandgap', 'carrier_concentrations', 'chemical_potential', 'diffusion_coefficients', 'doping_profile',
+              'effective_masses', 'grid_evaluator', 'material_state', 'mobilities', 'photocurrent', 'thermal_voltage')
+
+
+
+def __getattr__(name):
+    """
+    Import submodule name on first access
+    """
+
+    if name in submodules:
+        return importlib.import_module('.' + name, __name__)
+
+    raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+
+
+
+def __dir__():
+    return sorted(list(globals()) + list(submodules))
@@ -8,6 +8,7 @@ Requires:   -
 """
 
 import math as m
+import numpy as np
 #==============================================================================
 
 class Eg:
@@ -135,12 +136,53 @@ class Eg:
         E_g_Pae1999 = self.E_g_0K_Pae1999 - ((self.alpha_Pae1999 * self.theta_p_Pae1999 / 2.) * ((1. + (2. * T_sim / self.theta_p_Pae1999) ** self.p_Pae1999) ** (1. / self.p_Pae1999) -1.))
 
         # Paessler (2002) with original parameters
-        E_g_Pae2002 = self.E_g_0K_Pae2002 - self.alpha_Pae2002 * self.theta_Pae2002 * ((1 - 3 * self.delta_Pae2002**2) / (m.exp(self.theta_Pae2002 / T_sim) - 1) + 1.5 * self.delta_Pae2002**2 * ((1 + m.pi**2 / (3 + 3 * self.delta_Pae2002**2) * (2 * T_sim / self.theta_Pae2002)**2 + (0.75 * self.delta_Pae2002**2 - 0.25) * (2 * T_sim / self.theta_Pae2002)**3 + 8. / 3. * (2 * T_sim / self.theta_Pae2002)**4 + (2 * T_sim / self.theta_Pae2002)**6)**(1./6.) - 1))
+        E_g_Pae2002 = self.eg_paessler2002(T_sim)
 
         return E_g_BarSho, E_g_Var, E_g_Var_mod, E_g_Blu, E_g_Gae, E_g_Gre, E_g_Gre_mod, E_g_Pae1999, E_g_Pae2002 
 
 
 
+    def eg_paessler2002(self, T_sim):
+        """
+        Calculate bandgap E_g for one temperature or a temperature array with 'Paessler' 2002 model
+
+        Model:      Paessler (2002)
+
+        Requires:   Parameters from class Eg
+
+        Input:      Simulation temperature T_sim in K (scalar or array)
+
+        Output:     Bandgap E_g in eV (same shape as T_sim)
+        """
+
+        T_sim = np.asarray(T_sim, dtype=float)
+        x = 2 * T_sim / self.theta_Pae2002
+        E_g_Pae2002 = self.E_g_0K_Pae2002 - self.alpha_Pae2002 * self.theta_Pae2002 * ((1 - 3 * self.delta_Pae2002**2) / (np.exp(self.theta_Pae2002 / T_sim) - 1) + 1.5 * self.delta_Pae2002**2 * ((1 + m.pi**2 / (3 + 3 * self.delta_Pae2002**2) * x**2 + (0.75 * self.delta_Pae2002**2 - 0.25) * x**3 + 8. / 3. * x**4 + x**6)**(1./6.) - 1))
+
+        return E_g_Pae2002
+
+
+
+    def deg_paessler2002(self, T_sim):
+        """
+        Calculate temperature derivative dE_g/dT of the 'Paessler' 2002 model (analytic)
+
+        Input:      Simulation temperature T_sim in K (scalar or array)
+
+        Output:     Derivative dE_g/dT in eV/K (same shape as T_sim)
+        """
+
+        T_sim = np.asarray(T_sim, dtype=float)
+        x = 2 * T_sim / self.theta_Pae2002
+        g = 1 + m.pi**2 / (3 + 3 * self.delta_Pae2002**2) * x**2 + (0.75 * self.delta_Pae2002**2 - 0.25) * x**3 + 8. / 3. * x**4 + x**6
+        dg = 2 * m.pi**2 / (3 + 3 * self.delta_Pae2002**2) * x + 3 * (0.75 * self.delta_Pae2002**2 - 0.25) * x**2 + 32. / 3. * x**3 + 6 * x**5
+        exp_theta = np.exp(self.theta_Pae2002 / T_sim)
+        dE_g_Pae2002 = - self.alpha_Pae2002 * self.theta_Pae2002 * ((1 - 3 * self.delta_Pae2002**2) * exp_theta * self.theta_Pae2002 / (T_sim * (exp_theta - 1))**2 + 0.25 * self.delta_Pae2002**2 * g**(-5./6.) * dg * 2 / self.theta_Pae2002)
+
+        return dE_g_Pae2002
+
+
+
     def eg_lists(self, T_list):
         """
         Calculate bandgap lists E_g_list for temperature list with different models
@@ -7,19 +7,28 @@ Purpose:    Plot bandgap E_g with different models in eV
 Requires:   bandgap.py
 """
 
-import bandgap as bg
+from solarcell.parameters import bandgap as bg
+from solarcell import figures as fg
 import numpy as np
 import matplotlib.pyplot as mpl_p
 #==============================================================================
 
-T_axis = np.arange(1., 605., 5.)
+def compute():
+    T_axis = np.arange(1., 605., 5.)
+    names = ('BardeenShockley', 'Varshni', 'Varshni_modified', 'Bludau', 'Gaensslen', 'Green', 'Green_modified', 'Paessler', 'Paessler2')
+    return dict(zip(names, bg.Eg().eg_lists(T_axis)), T_axis=T_axis)
 
+data = fg.DataCache().get('bandgap', compute)      # cached, recomputed only after model changes
+T_axis = data['T_axis']
+E_g_BardeenShockley, E_g_Varshni, E_g_Varshni_modified = data['BardeenShockley'], data['Varshni'], data['Varshni_modified']
+E_g_Bludau, E_g_Gaensslen, E_g_Green, E_g_Green_modified = data['Bludau'], data['Gaensslen'], data['Green'], data['Green_modified']
+E_g_Paessler, E_g_Paessler2 = data['Paessler'], data['Paessler2']
 bgO = bg.Eg()
-E_g_BardeenShockley, E_g_Varshni, E_g_Varshni_modified, E_g_Bludau, E_g_Gaensslen, E_g_Green, E_g_Green_modified, E_g_Paessler, E_g_Paessler2 = bgO.eg_lists(T_axis)
 
 #------------------------------------------------------------------------------
 # plotting results:
 fig1 = mpl_p.figure(1)
+fig1.set_label('Energiebandluecke')
 ax1 = fig1.add_subplot(111)
 ax1.set_xlabel(r'Temperatur $T / K$')
 ax1.set_ylabel(r'Energiebandlücke $E_g / eV$')
@@ -0,0 +1,588 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Calculate intrinsic carrier concentration n_i, electron n and hole concentration p with different models in m^-3
+            Solve charge neutrality with Fermi-Dirac statistics and incomplete ionization for the Fermi level E_F in eV
+
+Requires:   constants.py
+            bandgap.py
+            effective_masses.py (which itself uses bandgap.py)
+"""
+
+from ..constants import q_e, m_e, h_P_J, k_B_J, k_B
+from . import bandgap as bg
+from . import effective_masses as em
+import math as m
+import numpy as np
+from numpy import exp, log
+#==============================================================================
+
+def expit(x):
+    """
+    Logistic function 1 / (1 + exp(-x)) (scipy.special.expit, scipy is imported on first use)
+    """
+
+    from scipy.special import expit as logistic
+
+    return logistic(x)
+
+
+
+class MisiakosTsamakis:
+    """Konstantinos Misiakos and Dimitris Tsamakis 1993 model
+    Ref.: Accurate measurements of the silicon intrinsic carrier density from 78 to 340K (1993), JAP 74, 3293...3297
+    
+    Sufficient accuracy from 78...340K
+    Call method 'n_i' with *args 'T_sim' to calculate intrinsic carrier concentration in m^3
+    """
+
+    T_MisiakosTsamakis = (77.8, 100.0, 120.75, 137.5, 148.4, 169.7, 195.0, 199.5, 213.0, 239.0, 256.5, 270.6, 281.0, 300.0, 319.5, 340.5)
+    n_i_MisiakosTsamakis = (5.0e-20, 2.0e-11, 3.4e-6, 4.6e-3, 0.21, 84, 1.78e4, 4.3e4, 4.16e5, 1.92e7, 1.45e8, 6.7e8, 1.79e9, 9.7e9, 4.51e10, 1.89e11)
+
+
+
+    def n_i(self, T_sim):
+        """
+        Calculate intrinsic carrier concentration with 'Misiakos and Tsamakis' 1993 model in m^3
+        """
+
+        n_i = 5.29e25 * (T_sim / 300)**2.54 * m.exp(-6726 / T_sim)
+
+        return n_i
+
+
+
+class MorinMaita:
+    """F. J. Morin and J. P. Maita 1954 model
+    Ref.: Electrical Properties of Silicon Containing Arsenic and Boron (1954), Physical Review 96, 28...35
+    
+    Sufficient accuracy from 0..700K
+    Call method 'n_i' with *args 'T_sim' to calculate intrinsic carrier concentration in m^3
+    """
+
+    def n_i(self, T_sim):
+        """
+        Calculate intrinsic carrier concentration with 'Morin and Maita' 1954 model in m^3
+        """
+
+        n_i = m.sqrt(1.5e33 * T_sim**3 * m.exp(-1.21 / (k_B * T_sim))) * 1.0e6
+
+        return n_i
+
+
+
+class PutleyMitchell:
+    """E. H. Putley and W. H. Mitchell 1958 model
+    Ref.: The Electrical Conductivity and Hall Effect of Silicon (1958), Proc. Phys. Soc. 72, 193...200
+    
+    Sufficient accuracy from 350..500K
+    Call method 'n_i' with *args 'T_sim' to calculate intrinsic carrier concentration in m^3
+    """
+
+    def n_i(self, T_sim):
+        """
+        Calculate intrinsic carrier concentration with 'Putley and Mitchel' 1958 model in m^3
+        """
+
+        n_i = 3.0e22 * T_sim**1.5 * m.exp(-0.603 / (k_B * T_sim))
+
+        return n_i
+
+
+
+class Barber:
+    """H. D. Barber 1967 model
+    Ref.:EFFECTIVE MASS AND INTRINSIC CONCENTRATION IN SILICON (1967), SSE 10, 1039...1051
+    
+    Sufficient accuracy from 230...700K
+    Call method 'n_i' with *args 'T_sim' to calculate intrinsic carrier concentration in m^3
+    """
+
+    def n_i(self, T_sim):
+        """
+        Calculate intrinsic carrier concentration with 'Barber' 1967 model in m^3
+        """
+
+        n_i = 1.72e22 * T_sim**1.5 * m.exp(-0.6025 / (k_B * T_sim))
+
+        return n_i
+
+
+
+class Slotboom:
+    """J. W. Slotboom 1977 model
+    Ref.: THE pn-PRODUCT IN SILICON (1977), SSE 20, 279...283
+    
+    Sufficient accuracy from 280...450K
+    Call method 'n_i' with *args 'T_sim' to calculate intrinsic carrier concentration in m^3
+    """
+
+    def n_i(self, T_sim):
+        """
+        Calculate intrinsic carrier concentration with 'Slotboom' 1977 model in m^3
+        """
+
+        n_i = m.sqrt(9.61e32 * T_sim**3 * m.exp(-1.206 / (k_B * T_sim))) * 1.0e6
+
+        return n_i
+
+
+
+class Wasserab:
+    """Wasserab 1977 model
+    Ref.: Die Temperaturabhaengigkeit der elektronischen Kenngroeszen des eigenleitenden Siliciums (1977), Z. Naturforsch. Teil A 32, 746...749
+    
+    Call method 'n_i' with *args 'T_sim' to calculate intrinsic carrier concentration in m^3
+    """
+
+    def n_i(self, T_sim):
+        """
+        Calculate intrinsic carrier concentration with 'Wasserab' 1977 model in m^3
+        """
+
+        n_i = 5.71e25 * (T_sim / 300)**2.365 * m.exp(-6733 / T_sim)
+
+        return n_i
+
+
+
+class Green1990:
+    """Martin. A. Green 1990 model
+    Ref.: Intrinsic concentration, effective density of states, and effective mass in silicon (1990), JAP 67, 2944...2954
+    
+    Sufficient accuracy from 200...500K
+    Call method 'n_i' with *args 'T_sim' to calculate intrinsic carrier concentration in m^3
+    uses: bandgap.py
+    """
+
+    def n_i(self, T_sim):
+        """
+        Calculate intrinsic carrier concentration with 'Green' 1990 model in m^3
+        uses: bandgap.py
+        """
+
+        self.e_g(T_sim)
+        N_c = 2.86e25 * (T_sim / 300.0)**1.58
+        N_v = 3.1e25 * (T_sim / 300.0)**1.85
+        n_i = m.sqrt( N_c * N_v * m.exp(-self.E_g_Green / (k_B * T_sim)))
+
+        return n_i
+
+
+
+    def e_g(self, T_sim):
+        """
+        Calls module 'bandgap.py' with *args 'T_sim' and calculates bandgap with 'Green' 1990 model in eV
+        uses: bandgap.py
+        """
+        bgO = bg.Eg()
+        self.E_g_Green = bgO.eg_models(T_sim)[5]
+
+
+
+class SproulGreen1991:
+    """A. B. Sproul and M. A. Green 1991 model
+    Ref.: Improved value for the silicon intrinsic carrier concentration from 275 to 375K (1991), JAP 70, 846...854
+    
+    Sufficient accuracy from 275...375K
+    Call method 'n_i' with *args 'T_sim' to calculate intrinsic carrier concentration in m^3
+    """
+
+    def n_i(self, T_sim):
+        """
+        Calculate intrinsic carrier concentration with 'Sproul and Green' 1991 model in m^3
+        """
+
+        n_i = 9.15e25 * (T_sim / 300)**2 * m.exp(-6880 / T_sim)
+
+        return n_i
+
+
+
+class SproulGreen1993:
+    """A. B. Sproul and M. A. Green 1993 model
+    Ref.: Intrinsic carrier concentration and minority-carrier mobility of silicon from 77 to 300K (1993), JAP 73, 1214...1225
+    
+    Sufficient accuracy from 77...400K
+    Call method 'n_i' with *args 'T_sim' to calculate intrinsic carrier concentration in m^3
+    uses: bandgap.py
+    """
+
+    def n_i(self, T_sim):
+        """
+        Calculate intrinsic carrier concentration with 'Sproul and Green' 1993 model in m^3
+        uses: bandgap.py
+        """
+
+        self.e_g(T_sim)
+        n_i = 1.64e21 * T_sim**1.706 * m.exp(-self.E_g_Green / (2.0 * k_B * T_sim))
+
+        return n_i
+
+
+
+    def e_g(self, T_sim):
+        """
+        Calls module 'bandgap.py' with *args 'T_sim' and calculates bandgap with 'Green' 1990 model in eV
+        uses: bandgap.py
+        """
+
+        bgO = bg.Eg()
+        self.E_g_Green = bgO.eg_models(T_sim)[5]
+
+
+
+class Kimmerle:
+    """Kimmerle 2011 model
+    Ref.: Herstellung und Charakterisierung hochohmiger Emitter fuer Hocheffizienzsolarzellen (2011), thesis
+    
+    Call method 'np' with *args 'T_sim, N_D, N_A' to calculate intrinsic, electron and hole carrier concentration in m^3
+    T_sim, N_D and N_A may be scalars or (broadcastable) arrays
+    input of N_D and N_A in cm^-3
+    output of n_i, n and p in m^-3
+    """
+
+    def n_i2_fermi(self, T_sim, N_D, N_A):
+        """
+        Calculate squared intrinsic carrier concentration with 'Kimmerle' 2011 model in cm^-3
+        input of N_D and N_A in cm^-3
+        output of n_i^2 in cm^-6
+        """
+
+        V_T = k_B_J * T_sim / q_e
+        n = abs(N_D - N_A)
+
+    # E_g_Green
+        # T_sim < 170:          A = 1.17 eV,    B = 1.059e-5 eV/K,  C = -6.05e-7 eV/K**2
+        # 170 <= T_sim < 270:   A = 1.1785 eV,  B = -9.025e-5 eV/K, C = -3.05e-7 eV/K**2
+        # T_sim >= 270:         A = 1.206 eV,   B = -2.73e-4 eV/K,  C = 0.0 eV/K**2     (valid for T_sim < 415K)
+        A = np.where(T_sim < 170, 1.17, np.where(T_sim < 270, 1.1785, 1.206))
+        B = np.where(T_sim < 170, 1.059e-5, np.where(T_sim < 270, -9.025e-5, -2.73e-4))
+        C = np.where(T_sim < 170, -6.05e-7, np.where(T_sim < 270, -3.05e-7, 0.0))
+        E_g_Green = A + B * T_sim + C * T_sim**2.
+
+    # n_i_0
+        n_i_0 = 0.9688 * 1.64e15 * T_sim**1.706 * exp(-E_g_Green * 1.6022e-19 / (2. * 1.3806e-23 * T_sim)) # V_T))
+
+    # N_C
+        N_C = n_i_0 * (0.9477**1.5 * exp(E_g_Green / V_T))**0.5
+
+    # Fermi_12_inverse
+        f = (n / N_C)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            D = np.where(f == 1., -0.5, log(f) / (1. - f**2.))
+        Fermi_12_inverse = D + (3. * m.pi**0.5 * f / 4.)**(2./3.) / (1. + (0.24 + 1.08 * (3. * m.pi**0.5 * f / 4.)**(2./3.))**(-2))
+
+    # BGN Schenk
+        g_e = 12.
+        g_h = 4.
+        a_e = 0.5187
+        a_h = 0.4813
+        Ryex = 0.01655
+        aex = 0.0000003719
+
+        # Normalized carrier densities and temperature
+        Vaex = aex**3.
+        n_h = N_A * Vaex
+        n_e = N_D * Vaex
+        n_s = n_e + n_h
+        n_p = a_e * n_e + a_h * n_h
+        n_i = n_s
+        t_0 = V_T / Ryex
+        u = n_s**2. / t_0**3.
+
+        # Parameters from Table 2, p. 3689
+        b_e = 8.
+        b_h = 1.
+        c_e = 1.3346
+        c_h = 1.2365
+        d_e = 0.893
+        d_h = 1.153
+        P = 7. / 30.
+
+        # Eq. (33)
+        D_xc_h = -((4. * m.pi)**3. * n_s**2. * ((48. * n_h / (m.pi * g_h))**(1./3.) + c_h * log(1. + d_h * n_p**P)) + 8. * m.pi * a_h / g_h * n_h * t_0**2. + (8. * m.pi * n_s)**0.5 * t_0**2.5) / ((4. * m.pi)**3. * n_s**2. + t_0**3. + b_h * n_s**0.5 * t_0**2. + 40. * n_s**1.5 * t_0)
+        D_xc_e = -((4. * m.pi)**3. * n_s**2. * ((48. * n_e / (m.pi * g_e))**(1./3.) + c_e * log(1. + d_e * n_p**P)) + 8. * m.pi * a_e / g_e * n_e * t_0**2. + (8. * m.pi * n_s)**0.5 * t_0**2.5) / ((4. * m.pi)**3. * n_s**2. + t_0**3. + b_e * n_s**0.5 * t_0**2. + 40. * n_s**1.5 * t_0)
+
+        # Parameters from Table 3, p. 3690
+        h_e = 3.91
+        h_h = 4.2
+        j_e = 2.8585
+        j_h = 2.9307
+        k_e = 0.012
+        k_h = 0.19
+        Q_e = 0.75
+        Q_h = 0.25
+
+        # Eq. (37)
+        D_i_h = -n_i * (1. + u) / ((t_0 * n_s / (2. * m.pi))**0.5 * (1. + h_h * log(1. + n_s**0.5 / t_0)) + j_h * u * n_p**0.75 * (1. + k_h * n_p**Q_h))
+        D_i_e = -n_i * (1. + u) / ((t_0 * n_s / (2. * m.pi))**0.5 * (1. + h_e * log(1. + n_s**0.5 / t_0)) + j_e * u * n_p**0.75 * (1. + k_e * n_p**Q_e))
+
+        dE_C_Schenk = -Ryex * (D_xc_e + D_i_e)
+        dE_V_Schenk = -Ryex * (D_xc_h + D_i_h)
+        dE_C = dE_C_Schenk / V_T
+        dE_V = dE_V_Schenk / V_T
+
+    # boltzmannconduction
+        bc = exp(Fermi_12_inverse - dE_C)
+
+    # n_i2_Fermi
+        n_i2 = n_i_0**2. * f * exp(dE_V) / bc
+
+        return n_i2
+
+
+
+    def np(self, T_sim, N_D, N_A):
+        """
+        Calculate electron and hole concentration with 'Kimmerle' 2011 model in m^-3
+        input of N_D and N_A in cm^-3
+        output of n_i, n and p in m^-3
+        """
+
+        n_i2 = self.n_i2_fermi(T_sim, N_D, N_A)
+
+        n_type = N_D > N_A
+        N_net = np.where(n_type, N_D - N_A, N_A - N_D)
+        n = np.where(n_type, N_net, n_i2 / N_net)
+        p = np.where(n_type, n_i2 / N_net, N_net)
+
+        n_i = n_i2**0.5 * 1.0e6
+        n = n * 1.0e6
+        p = p * 1.0e6
+
+        return n_i, n, p
+
+
+
+class FermiDirac:
+    """Charge neutrality with Fermi-Dirac statistics and incomplete ionization of dopants
+    Ref.: S. M. Sze and K. K. Ng, Physics of Semiconductor Devices (2007), ch. 1.4 and 1.5
+          effective carrier masses from 'Green' 1990 (effective_masses.py), bandgap from 'Paessler' 2002 (bandgap.py)
+
+    Ref.: P. P. Altermatt et al., A simulation model for the density of states and for incomplete ionization in crystalline silicon (2006), JAP 100, 113714/113715
+          (decrease of the ionization energies and of the fraction b of localized dopant states with doping concentration)
+
+    Sufficient accuracy from 4...700K for non-degenerate and degenerate doping
+    Call method 'solve' with *args 'T_sim, N_D, N_A' to calculate Fermi level, electron and hole concentration
+    T_sim, N_D and N_A may be scalars or arrays of any broadcastable shape, all points are solved at once
+    input of N_D and N_A in m^-3
+    output of E_F in eV (relative to the valence band edge), n and p in m^-3
+    uses: bandgap.py, effective_masses.py
+    """
+
+    # ionization energies of isolated phosphorous donors and boron acceptors and their decrease E_0 / (1 + (N / N_ref)**c) (Altermatt 2006)
+    # fraction of localized dopant states b = 1 / (1 + (N / N_b)**d), the rest has merged with the band and is ionized
+    # (phosphorous values of N_b and d are used for boron as well)
+    E_C_E_D_0 = 0.0455                  # eV
+    N_ref_D = 3.0e24                    # m^-3
+    c_D = 2.                            # 1
+    E_A_E_V_0 = 0.04439                 # eV
+    N_ref_A = 1.7e24                    # m^-3
+    c_A = 1.4                           # 1
+    N_b = 6.0e24                        # m^-3
+    d = 2.3                             # 1
+    # ground state degeneracy factors
+    g_D = 2.                            # 1
+    g_A = 4.                            # 1
+
+    # below eta_Boltzmann (above eta_Sommerfeld) the Fermi-Dirac integrals equal the Boltzmann limit (Sommerfeld expansion) within 1e-9
+    eta_Boltzmann = -20.                # 1
+    eta_Sommerfeld = 30.                # 1
+    accuracy = 1.0e-12                  # eV
+    max_iter = 200
+
+
+
+    def fermi_integrals(self, eta):
+        """
+        Calculate normalized complete Fermi-Dirac integrals F_1/2(eta) and F_-1/2(eta) = dF_1/2/deta
+        with F_j(eta) -> exp(eta) for eta -> -inf
+
+        Model:      substitution x = t**2 and trapezoidal rule on the even integrand (exponentially convergent)
+                    Boltzmann limit below eta_Boltzmann, Sommerfeld expansion above eta_Sommerfeld
+
+        Input:      Reduced Fermi level eta (scalar or array)
+
+        Output:     ln(F_1/2(eta)) and ratio F_-1/2(eta) / F_1/2(eta) (same shape as eta)
+        """
+
+        eta = np.asarray(eta, dtype=float)
+        ln_F_12 = eta.copy()
+        ratio = np.ones_like(eta)
+        d = eta > self.eta_Sommerfeld
+        if d.any():
+            e = eta[d]
+            ln_F_12[d] = log(4. / (3. * m.sqrt(m.pi)) * e**1.5 * (1. + m.pi**2 / 8. * e**-2 + 7. * m.pi**4 / 640. * e**-4 + 31. * m.pi**6 / 3072. * e**-6))
+            ratio[d] = 2. / m.sqrt(m.pi) * e**0.5 * (1. - m.pi**2 / 24. * e**-2 - 7. * m.pi**4 / 384. * e**-4 - 31. * m.pi**6 / 1024. * e**-6) / exp(ln_F_12[d])
+        q = (eta > self.eta_Boltzmann) & ~d
+        if q.any():
+            e = eta[q]
+            e_max = max(e.max(), 1.)
+            # step width resolves the Fermi edge at t = sqrt(eta) (nearest poles at Im(t) ~ pi / (2 sqrt(eta)))
+            h = min(0.1, 0.3 / m.sqrt(e_max))
+            t_max = m.sqrt(e_max + 40.)
+            F_12 = np.zeros_like(e)
+            F_m12 = 0.5 * expit(e)
+            for t in np.arange(h, t_max + h, h):
+                s = expit(e - t**2)
+                F_12 += t**2 * s
+                F_m12 += s
+            F_12 *= 4. * h / m.sqrt(m.pi)
+            F_m12 *= 2. * h / m.sqrt(m.pi)
+            ln_F_12[q] = log(F_12)
+            ratio[q] = F_m12 / F_12
+
+        return ln_F_12, ratio
+
+
+
+    def f_12(self, eta):
+        """
+        Calculate normalized complete Fermi-Dirac integral F_1/2(eta)
+        """
+
+        return exp(self.fermi_integrals(eta)[0])
+
+
+
+    def n_c_n_v(self, T_sim):
+        """
+        Calculate effective densities of states N_C, N_V in m^-3 and bandgap E_g in eV
+        uses: bandgap.py, effective_masses.py
+        """
+
+        T_sim = np.asarray(T_sim, dtype=float)
+        E_g = bg.Eg().eg_paessler2002(T_sim)
+        m_c, m_v = em.EffectiveMasses().m_x(T_sim, E_g)
+        N_0 = 2. * (2. * m.pi * m_e * k_B_J * T_sim / h_P_J**2)**1.5
+        N_C = N_0 * m_c**1.5
+        N_V = N_0 * m_v**1.5
+
+        return N_C, N_V, E_g
+
+
+
+    def e_dop(self, N_D, N_A):
+        """
+        Calculate doping dependent ionization energies E_C - E_D, E_A - E_V in eV and fractions b_D, b_A of localized dopant states in 1
+        input of N_D and N_A in m^-3
+        """
+
+        E_C_E_D = self.E_C_E_D_0 / (1. + (N_D / self.N_ref_D)**self.c_D)
+        E_A_E_V = self.E_A_E_V_0 / (1. + (N_A / self.N_ref_A)**self.c_A)
+        b_D = 1. / (1. + (N_D / self.N_b)**self.d)
+        b_A = 1. / (1. + (N_A / self.N_b)**self.d)
+
+        return E_C_E_D, E_A_E_V, b_D, b_A
+
+
+
+    def ln_concentrations(self, E_F, kT, E_g, E_dop, ln_N_C, ln_N_V, ln_N_D, ln_N_A):
+        """
+        Calculate logarithms of n, p, N_D+, N_A- and their logarithmic derivatives with respect to E_F in 1/eV
+        """
+
+        ln_F_n, r_n = self.fermi_integrals((E_F - E_g) / kT)
+        ln_F_p, r_p = self.fermi_integrals(-E_F / kT)
+        E_C_E_D, E_A_E_V, b_D, b_A = E_dop
+        x_D = m.log(self.g_D) + (E_F - E_g + E_C_E_D) / kT
+        x_A = m.log(self.g_A) + (E_A_E_V - E_F) / kT
+
+        ln_n = ln_N_C + ln_F_n
+        ln_p = ln_N_V + ln_F_p
+    # ionized fraction 1 - b * s with occupation s of the localized states
+        with np.errstate(divide='ignore'):
+            ln_f_D = np.logaddexp(log(1. - b_D), log(b_D) - np.logaddexp(0., x_D))
+            ln_f_A = np.logaddexp(log(1. - b_A), log(b_A) - np.logaddexp(0., x_A))
+        ln_N_Dp = ln_N_D + ln_f_D
+        ln_N_Am = ln_N_A + ln_f_A
+
+        dln_n = r_n / kT
+        dln_p = -r_p / kT
+        dln_N_Dp = -b_D * expit(x_D) * expit(-x_D) / exp(ln_f_D) / kT
+        dln_N_Am = b_A * expit(x_A) * expit(-x_A) / exp(ln_f_A) / kT
+
+        return (ln_n, ln_p, ln_N_Dp, ln_N_Am), (dln_n, dln_p, dln_N_Dp, dln_N_Am)
+
+
+
+    def solve(self, T_sim, N_D, N_A):
+        """
+        Solve charge neutrality p + N_D+ = n + N_A- for the Fermi level
+
+        Model:      Newton iteration on ln(p + N_D+) - ln(n + N_A-) = 0 (nearly linear in E_F), vectorized over all points
+                    safeguarded by bisection inside a bracket which shrinks with every iteration
+                    start value from Boltzmann statistics with complete ionization
+
+        Input:      Simulation temperature T_sim in K, donor concentration N_D and acceptor concentration N_A in m^-3 (broadcastable)
+
+        Output:     Fermi level E_F in eV (relative to the valence band edge), electron n and hole concentration p in m^-3
+        """
+
+        T_sim, N_D, N_A = np.broadcast_arrays(np.asarray(T_sim, dtype=float), np.asarray(N_D, dtype=float), np.asarray(N_A, dtype=float))
+        shape = T_sim.shape
+        T_sim, N_D, N_A = T_sim.ravel(), N_D.ravel(), N_A.ravel()
+
+        kT = k_B * T_sim
+        N_C, N_V, E_g = self.n_c_n_v(T_sim)
+        E_dop = self.e_dop(N_D, N_A)
+        ln_N_C, ln_N_V = log(N_C), log(N_V)
+        with np.errstate(divide='ignore'):
+            ln_N_D, ln_N_A = log(N_D), log(N_A)
+            ln_N_net = log(abs(N_D - N_A))
+
+    # start value: E_F = E_i + kT * asinh((N_D - N_A) / (2 * n_i)), evaluated without overflow of n_i
+        E_i = 0.5 * E_g + 0.5 * kT * (ln_N_V - ln_N_C)
+        a = ln_N_net - m.log(2.) - (0.5 * (ln_N_C + ln_N_V) - 0.5 * E_g / kT)
+        asinh_a = np.where(a > 0., a + log(1. + np.sqrt(1. + exp(-2. * np.maximum(a, 0.)))), np.arcsinh(exp(np.minimum(a, 0.))))
+        E_F = E_i + np.sign(N_D - N_A) * kT * asinh_a
+
+    # bracket: p (n) exceeds N_D + N_A at eta_lim below (above) the valence (conduction) band edge, F_1/2(eta) > eta**1.5 / 2
+        eta_lim = 50. + (2. * (N_D + N_A) / np.minimum(N_C, N_V))**(2. / 3.)
+        lo = np.minimum(E_F, 0.) - eta_lim * kT
+        hi = np.maximum(E_F, E_g) + eta_lim * kT
+
+        active = np.arange(E_F.size)
+        for unused_i in range(self.max_iter):
+            if active.size == 0:
+                break
+            a_ = active
+            (ln_n, ln_p, ln_N_Dp, ln_N_Am), (dln_n, dln_p, dln_N_Dp, dln_N_Am) = self.ln_concentrations(E_F[a_], kT[a_], E_g[a_], [x[a_] for x in E_dop], ln_N_C[a_], ln_N_V[a_], ln_N_D[a_], ln_N_A[a_])
+            ln_P = np.logaddexp(ln_p, ln_N_Dp)
+            ln_M = np.logaddexp(ln_n, ln_N_Am)
+            g = ln_P - ln_M
+            dg = (exp(ln_p - ln_P) * dln_p + exp(ln_N_Dp - ln_P) * dln_N_Dp) - (exp(ln_n - ln_M) * dln_n + exp(ln_N_Am - ln_M) * dln_N_Am)
+
+            # g is decreasing in E_F
+            lo[a_] = np.where(g > 0., E_F[a_], lo[a_])
+            hi[a_] = np.where(g < 0., E_F[a_], hi[a_])
+            with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+                E_F_new = E_F[a_] - g / dg
+            outside = ~((E_F_new > lo[a_]) & (E_F_new < hi[a_]))
+            E_F_new[outside] = 0.5 * (lo[a_][outside] + hi[a_][outside])
+
+            done = (abs(E_F_new - E_F[a_]) < self.accuracy) | (g == 0.)
+            E_F[a_] = E_F_new
+            active = a_[~done]
+
+        (ln_n, ln_p, unused_ln_N_Dp, unused_ln_N_Am), unused_d = self.ln_concentrations(E_F, kT, E_g, E_dop, ln_N_C, ln_N_V, ln_N_D, ln_N_A)
+
+        return E_F.reshape(shape), exp(ln_n).reshape(shape), exp(ln_p).reshape(shape)
+
+
+
+    def n_ionized(self, T_sim, N_D, N_A, E_F):
+        """
+        Calculate ionized donor N_D+ and acceptor concentration N_A- in m^-3 for a given Fermi level E_F in eV (relative to the valence band edge)
+        """
+
+        T_sim = np.asarray(T_sim, dtype=float)
+        kT = k_B * T_sim
+        E_g = bg.Eg().eg_paessler2002(T_sim)
+        E_C_E_D, E_A_E_V, b_D, b_A = self.e_dop(N_D, N_A)
+        N_Dp = N_D * (1. - b_D * expit(m.log(self.g_D) + (E_F - E_g + E_C_E_D) / kT))
+        N_Am = N_A * (1. - b_A * expit(m.log(self.g_A) + (E_A_E_V - E_F) / kT))
+
+        return N_Dp, N_Am
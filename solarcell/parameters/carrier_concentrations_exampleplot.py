@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Plot intrinsic carrier concentration n_i with different models in cm^-3
+            Plot electron n and hole concentration p in cm^-3
+
+Requires:   carrier_concentrations.py
+"""
+
+from solarcell.parameters import carrier_concentrations as cc
+from solarcell import figures as fg
+import numpy as np
+import matplotlib.pyplot as mpl_p
+#==============================================================================
+
+def compute():
+    T_axis = np.arange(100., 605., 5.)
+
+    N_D = 1.0e18    #9e19
+    N_A = 1.0e6     #1e20
+
+    models = {'MorinMaita': cc.MorinMaita(), 'PutleyMitchell': cc.PutleyMitchell(), 'Barber': cc.Barber(), 'Slotboom': cc.Slotboom(),
+              'Wasserab': cc.Wasserab(), 'Green1990': cc.Green1990(), 'SproulGreen1991': cc.SproulGreen1991(),
+              'SproulGreen1993': cc.SproulGreen1993(), 'MisiakosTsamakis': cc.MisiakosTsamakis()}
+    data = {name: [model.n_i(T_sim) * 1.0e-6 for T_sim in T_axis] for name, model in models.items()}
+    data['Kimmerle'] = [cc.Kimmerle().np(T_sim, N_D, N_A)[0] * 1.0e-6 for T_sim in T_axis]
+    data['T_axis'] = T_axis
+
+    return data
+
+data = fg.DataCache().get('carrier_concentrations', compute)      # cached, recomputed only after model changes
+T_axis = data['T_axis']
+n_i_MorinMaita_list = data['MorinMaita']
+n_i_PutleyMitchell_list = data['PutleyMitchell']
+n_i_Barber_list = data['Barber']
+n_i_Slotboom_list = data['Slotboom']
+n_i_Wasserab_list = data['Wasserab']
+n_i_Green1990_list = data['Green1990']
+n_i_SproulGreen1991_list = data['SproulGreen1991']
+n_i_SproulGreen1993_list = data['SproulGreen1993']
+n_i_MisiakosTsamakis_list = data['MisiakosTsamakis']
+n_i_Kimmerle_list = data['Kimmerle']
+NiMisiakosTsamakisO = cc.MisiakosTsamakis()
+
+#----------------------------------------------------------------------------- 
+# plotting results:
+fig1 = mpl_p.figure(1)
+fig1.set_label('Ladungstraegerkonzentration')
+ax1 = fig1.add_subplot(111)
+ax1.set_xlabel(r'Temperatur  $T / K$')
+ax1.set_ylabel(r'Intrinsische Ladungsträgerdichte $n_i / \frac{1}{cm^3}$')
+ax1.semilogy(NiMisiakosTsamakisO.T_MisiakosTsamakis, NiMisiakosTsamakisO.n_i_MisiakosTsamakis, 'ko', label=r'$n_{i, exp}$ Misiakos et al. (1993)')
+ax1.semilogy(T_axis, n_i_MorinMaita_list, 'bs', label=r'$n_i$ Morin et al. (1954)')
+ax1.semilogy(T_axis, n_i_PutleyMitchell_list, 'b*', label=r'$n_i$ Putley et al. (1958)')
+ax1.semilogy(T_axis, n_i_Barber_list, 'b2', label=r'$n_i$ Barber (1967)')
+ax1.semilogy(T_axis, n_i_Slotboom_list, 'b.', label=r'$n_i$ Slotboom (1976)')
+ax1.semilogy(T_axis, n_i_Wasserab_list, 'b--', label=r'$n_i$ Wasserab (1977)')
+ax1.semilogy(T_axis, n_i_Green1990_list, 'g.', label=r'$n_i$ Green (1990)')
+ax1.semilogy(T_axis, n_i_SproulGreen1991_list, 'g--', label=r'$n_i$ Sproul et al. (1991)')
+ax1.semilogy(T_axis, n_i_SproulGreen1993_list, 'g', label=r'$n_i$ Sproul et al. (1993)')
+ax1.semilogy(T_axis, n_i_MisiakosTsamakis_list, 'b', label=r'$n_i$ Misiakos et al. (1993)')
+ax1.semilogy(T_axis, n_i_Kimmerle_list, 'r.', label=r'$n_i$ Kimmerle (2011)')
+ax1.legend()
+mpl_p.ylim(1.0, 1.0e16)
+mpl_p.xlim(100.0, 600.0)
+mpl_p.show()
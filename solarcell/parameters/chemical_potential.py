@@ -8,9 +8,9 @@ Requires:   constants.py
             effective_masses.py (which itself uses bandgap.py)
 """
 
-from constants import k_B
-import effective_masses as em
-import math as m
+from ..constants import k_B
+from . import effective_masses as em
+import numpy as np
 #==============================================================================
 
 class ChemicalPotential:
@@ -31,14 +31,15 @@ class ChemicalPotential:
 
         Requires:   effective_masses.py (which itself uses bandgap.py)
 
-        Input:      Simulation temperature T_sim in K
+        Input:      Simulation temperature T_sim in K (scalar or array)
 
-        Output:     Effective carrier masses m_c_ast, m_v_ast in multiplicative partivas of the free electron rest mass in 1
+        Output:     Effective carrier masses m_c_ast, m_v_ast in multiplicative partivas of the free electron rest mass in 1 (same shape as T_sim)
         """
 
         m_O = em.EffectiveMasses()
-        self.m_c_ast = m_O.m_x(T_sim)[0]
-        self.m_v_ast = m_O.m_x(T_sim)[1]
+        m_c_ast, m_v_ast = m_O.m_x(T_sim)
+
+        return m_c_ast, m_v_ast
 
 
 
@@ -51,13 +52,14 @@ class ChemicalPotential:
         Requires:   Parameters from class ChemicalPotential
                     Botzmann constant k (herein k_B) in eV/K
 
-        Input:      Simulation temperature T_sim in K
+        Input:      Simulation temperature T_sim in K (scalar or array)
 
-        Output:     Deviation of chemical potential from the bandgap center mu, mu_m_const in eV
+        Output:     Deviation of chemical potential from the bandgap center mu, mu_m_const in eV (same shape as T_sim)
         """
 
-        self.m_ast(T_sim)
-        mu = 3./4. * k_B * T_sim * m.log(self.m_v_ast / self.m_c_ast)
-        mu_m_const = 3./4. * k_B * T_sim * m.log(self.m_h_ast / self.m_e_ast)
+        T_sim = np.asarray(T_sim, dtype=float)
+        m_c_ast, m_v_ast = self.m_ast(T_sim)
+        mu = 3./4. * k_B * T_sim * np.log(m_v_ast / m_c_ast)
+        mu_m_const = 3./4. * k_B * T_sim * np.log(self.m_h_ast / self.m_e_ast)
 
         return mu, mu_m_const
@@ -7,26 +7,24 @@ Purpose:    Plot deviation of chemical potential from the bandgap center mu, mu_
 Requires:   chemical_potential.py
 """
 
-import chemical_potential as cp
+from solarcell.parameters import chemical_potential as cp
+from solarcell import figures as fg
 import numpy as np
 import matplotlib.pyplot as mpl_p
 #==============================================================================
 
-T_axis = np.arange(1., 605., 5.)
+def compute():
+    T_axis = np.arange(1., 605., 5.)
+    mu_list, mu_m_const_list = cp.ChemicalPotential().mu(T_axis)
+    return {'T_axis': T_axis, 'mu': mu_list, 'mu_m_const': mu_m_const_list}
 
-muO = cp.ChemicalPotential()
-mu_list = []
-mu_m_const_list = []
-
-for T_sim in T_axis:
-    mu = muO.mu(T_sim)[0]
-    mu_list.append(mu)
-    mu_m_const = muO.mu(T_sim)[1]
-    mu_m_const_list.append(mu_m_const)
+data = fg.DataCache().get('chemical_potential', compute)      # cached, recomputed only after model changes
+T_axis, mu_list, mu_m_const_list = data['T_axis'], data['mu'], data['mu_m_const']
 
 #------------------------------------------------------------------------------
 # plotting results:
 fig1 = mpl_p.figure(1)
+fig1.set_label('Chemisches_Potential')
 ax1 = fig1.add_subplot(111)
 ax1.set_xlabel(r'Temperatur $T / K$')
 ax1.set_ylabel(r'Chemisches Potential $\Delta\mu / eV$')
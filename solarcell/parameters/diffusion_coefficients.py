@@ -7,8 +7,8 @@ Purpose:    Calculate diffusion coefficients Dn, Dp in cm^2/s
 Requires:   mobilities.py (which itself uses carrier_concentrations.py (which itself uses constants.py and bandgap.py))
 """
 
-from constants import k_B
-import mobilities as mu
+from ..constants import k_B
+from . import mobilities as mu
 #==============================================================================
 
 class D:
@@ -51,6 +51,16 @@ class D:
 
 
 
+    def d_einstein(self, T_sim, mu_x):
+        """
+        Calculates diffusion coefficient with the Einstein-Smoluchowski equation for mobility mu_x (scalar or array)
+        output in units of mu_x * V (e.g. m^2/s for mu_x in m^2/Vs)
+        """
+
+        return k_B * T_sim * mu_x
+
+
+
     def mu_x(self, T_sim):
         """
         
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Calculate electron n and hole concentration p in m^-3, carrier mobilities mu_e, mu_h in m^2/Vs,
+            diffusion coefficients D_e, D_h in m^2/s and diffusion lengths L_e, L_h in m along 1-D doping profiles N_D(x), N_A(x)
+            Calculate sheet resistance R_sh in Ohm/sq and junction depth x_j in m of doping profiles
+
+Requires:   constants.py
+            carrier_concentrations.py (which itself uses constants.py and bandgap.py)
+            mobilities.py (which itself uses carrier_concentrations.py)
+            diffusion_coefficients.py (which itself uses mobilities.py)
+"""
+
+from ..constants import q_e
+from . import carrier_concentrations as cc
+from . import mobilities as mu
+from . import diffusion_coefficients as dc
+import numpy as np
+#==============================================================================
+
+class DopingProfile:
+    """
+    Doping profile class
+
+    Local (quasi-neutral) evaluation of the 'Kimmerle' 2011, 'Klaassen' 1992 and Einstein-Smoluchowski models along depth x.
+    The profile is streamed through the models in chunks of 'chunk_size' points, so the temporary arrays of the models
+    never exceed the chunk size, whatever the length of the profile.
+    input of x in m, N_D(x) and N_A(x) in m^-3, T_sim in K, carrier lifetimes tau_e, tau_h in s (scalars or arrays along x)
+    """
+
+    chunk_size = 8192
+    donor = 'P'                         # donor species of the electron mobility: 'P' or 'As'
+    tau_e = 50.0e-6                     # s
+    tau_h = 50.0e-6                     # s
+
+
+
+    def n_ie(self, T_sim, N_D, N_A):
+        """
+        Calculate effective intrinsic carrier concentration n_ie in m^-3 ('Kimmerle' 2011, N_D and N_A in m^-3),
+        exactly compensated points (N_D == N_A, incl. undoped) get n_ie of undoped silicon
+        """
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            n_i2 = cc.Kimmerle().n_i2_fermi(T_sim, N_D * 1.0e-6, N_A * 1.0e-6)
+        n_i2_undoped = cc.Kimmerle().n_i2_fermi(T_sim, np.zeros(1), np.full(1, 1.0e10))
+
+        return np.sqrt(np.where(np.isfinite(n_i2) & (n_i2 > 0.0), n_i2, n_i2_undoped)) * 1.0e6
+
+
+
+    def chunk_np_mu(self, T_sim, N_D, N_A):
+        """
+        Calculate n, p in m^-3 and majority/minority mobilities mu_e, mu_h in m^2/Vs for one chunk of the profile
+        (charge neutrality n - p = N_D - N_A with n * p = n_ie**2, n = p = n_ie at compensated points)
+        """
+
+        n_ie = self.n_ie(T_sim, N_D, N_A)
+        N_net = N_D - N_A
+        majority = np.abs(N_net) / 2.0 + np.sqrt(N_net**2 / 4.0 + n_ie**2)
+        minority = n_ie**2 / majority
+        n = np.where(N_net > 0.0, majority, minority)
+        p = np.where(N_net > 0.0, minority, majority)
+        with np.errstate(divide='ignore'):
+            mu_As_b, mu_P_b, mu_B_b = mu.Klaassen().mu_i_bulk(T_sim, N_D * 1.0e-6, N_A * 1.0e-6, n, p)
+        mu_e = mu_As_b if self.donor == 'As' else mu_P_b
+
+        return n, p, mu_e, mu_B_b
+
+
+
+    def profile(self, T_sim, x, N_D, N_A, tau_e=None, tau_h=None):
+        """
+        Purpose:    Calculate carrier concentrations, mobilities, diffusion coefficients and diffusion lengths along the profile
+
+        Model:      Kimmerle (2011) n_ie, charge neutrality (n = p = n_ie at compensated points), Klaassen (1992),
+                    Einstein-Smoluchowski equation, L = sqrt(D * tau)
+
+        Requires:   carrier_concentrations.py, mobilities.py, diffusion_coefficients.py
+
+        Input:      Simulation temperature T_sim in K
+                    Depth x in m, donor N_D(x) and acceptor concentration N_A(x) in m^-3 (arrays of equal length)
+                    Optional carrier lifetimes tau_e, tau_h in s (scalars or arrays along x)
+
+        Output:     n, p in m^-3, mu_e, mu_h in m^2/Vs, D_e, D_h in m^2/s, L_e, L_h in m (arrays along x)
+        """
+
+        x = np.asarray(x, dtype=float)
+        N_D = np.broadcast_to(np.asarray(N_D, dtype=float), x.shape)
+        N_A = np.broadcast_to(np.asarray(N_A, dtype=float), x.shape)
+        tau_e = np.broadcast_to(np.asarray(self.tau_e if tau_e is None else tau_e, dtype=float), x.shape)
+        tau_h = np.broadcast_to(np.asarray(self.tau_h if tau_h is None else tau_h, dtype=float), x.shape)
+        D_O = dc.D()
+
+        n, p, mu_e, mu_h, D_e, D_h, L_e, L_h = (np.empty(x.shape) for unused_i in range(8))
+        for i in range(0, x.size, self.chunk_size):
+            c = slice(i, i + self.chunk_size)
+            n[c], p[c], mu_e[c], mu_h[c] = self.chunk_np_mu(T_sim, N_D[c], N_A[c])
+            D_e[c] = D_O.d_einstein(T_sim, mu_e[c])
+            D_h[c] = D_O.d_einstein(T_sim, mu_h[c])
+            L_e[c] = np.sqrt(D_e[c] * tau_e[c])
+            L_h[c] = np.sqrt(D_h[c] * tau_h[c])
+
+        return n, p, mu_e, mu_h, D_e, D_h, L_e, L_h
+
+
+
+    def x_j(self, x, N_D, N_A):
+        """
+        Calculate junction depth x_j in m (first sign change of N_D - N_A, linearly interpolated)
+        returns None if the profile has no junction
+        """
+
+        x = np.asarray(x, dtype=float)
+        N_net = np.asarray(N_D, dtype=float) - np.asarray(N_A, dtype=float)
+        i = np.flatnonzero(np.sign(N_net[1:]) != np.sign(N_net[:-1]))
+        if i.size == 0:
+            return None
+        i = i[0]
+
+        return x[i] + (x[i + 1] - x[i]) * N_net[i] / (N_net[i] - N_net[i + 1])
+
+
+
+    def r_sheet(self, T_sim, x, N_D, N_A, x_max=None):
+        """
+        Purpose:    Calculate sheet resistance of the layer from x[0] to x_max
+
+        Model:      R_sh = 1 / integral(q_e * (n * mu_e + p * mu_h) dx), trapezoidal rule streamed over the chunks
+
+        Input:      Simulation temperature T_sim in K
+                    Depth x in m, donor N_D(x) and acceptor concentration N_A(x) in m^-3 (arrays of equal length)
+                    Optional upper integration limit x_max in m (e.g. the junction depth x_j), default: whole profile
+
+        Output:     Sheet resistance R_sh in Ohm/sq
+        """
+
+        x = np.asarray(x, dtype=float)
+        N_D = np.broadcast_to(np.asarray(N_D, dtype=float), x.shape)
+        N_A = np.broadcast_to(np.asarray(N_A, dtype=float), x.shape)
+        if x_max is not None:
+            N_last = np.searchsorted(x, x_max, side='right')
+            x = np.append(x[:N_last], x_max)
+            N_D = np.append(N_D[:N_last], np.interp(x_max, x[:-1], N_D[:N_last]))
+            N_A = np.append(N_A[:N_last], np.interp(x_max, x[:-1], N_A[:N_last]))
+
+        G_sh = 0.0
+        x_prev = sigma_prev = None
+        for i in range(0, x.size, self.chunk_size):
+            c = slice(i, i + self.chunk_size)
+            n, p, mu_e, mu_h = self.chunk_np_mu(T_sim, N_D[c], N_A[c])
+            sigma = q_e * (n * mu_e + p * mu_h)
+            x_c = x[c]
+            if x_prev is not None:
+                x_c = np.concatenate(([x_prev], x_c))
+                sigma = np.concatenate(([sigma_prev], sigma))
+            G_sh += np.sum(0.5 * (sigma[1:] + sigma[:-1]) * np.diff(x_c))
+            x_prev, sigma_prev = x_c[-1], sigma[-1]
+
+        return 1.0 / G_sh
@@ -7,7 +7,8 @@ Purpose:    Calculate effective carrier masses m_c, m_v in multiplicative partiv
 Requires:   bandgap.py
 """
 
-import bandgap as bg
+from . import bandgap as bg
+import numpy as np
 #==============================================================================
 
 class EffectiveMasses:
@@ -34,7 +35,7 @@ class EffectiveMasses:
 
 
 
-    def m_x(self, T_sim):
+    def m_x(self, T_sim, E_g_Paessler2002=None):
         """
         Purpose:    Calculate effective carrier masses m_c, m_v
 
@@ -43,13 +44,16 @@ class EffectiveMasses:
         Requires:   Parameters from class EffectiveMasses
                     bandgap.py
 
-        Input:      Simulation temperature T_sim in K
+        Input:      Simulation temperature T_sim in K (scalar or array)
+                    Optional, already evaluated bandgap E_g_Paessler2002 in eV at T_sim (skips the bandgap evaluation)
 
-        Output:     Effective carrier masses m_c, m_v in multiplicative partivas of the free electron rest mass in 1
+        Output:     Effective carrier masses m_c, m_v in multiplicative partivas of the free electron rest mass in 1 (same shape as T_sim)
         """
 
+        T_sim = np.asarray(T_sim, dtype=float)
         E_g_O = bg.Eg()
-        E_g_Paessler2002 = E_g_O.eg_models(T_sim)[-1]
+        if E_g_Paessler2002 is None:
+            E_g_Paessler2002 = E_g_O.eg_paessler2002(T_sim)
         m_c = (36 * self.m_lc__4K * (E_g_O.E_g_0K_Pae2002 / E_g_Paessler2002 * self.m_tc__4K)**2)**(1./3)
         m_v = ((self.a + self.b * T_sim + self.c * T_sim**2 + self.d * T_sim**3 + self.e * T_sim**4) / (1 + self.f * T_sim + self.g * T_sim**2 + self.h * T_sim**3 + self.i * T_sim**4))**(2./3)
 
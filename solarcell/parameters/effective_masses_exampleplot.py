@@ -7,24 +7,25 @@ Purpose:    Plot effective carrier masses m_c, m_v in multiplicative partivas of
 Requires:   effective_masses.py
 """
 
-import effective_masses as em
+from solarcell.parameters import effective_masses as em
+from solarcell import figures as fg
 import numpy as np
 import matplotlib.pyplot as mpl_p
 #==============================================================================
 
-T_axis = np.arange(1., 605., 5.)
+def compute():
+    T_axis = np.arange(1., 605., 5.)
+    m_c_list, m_v_list = em.EffectiveMasses().m_x(T_axis)
+    return {'T_axis': T_axis, 'm_c': m_c_list, 'm_v': m_v_list}
 
+data = fg.DataCache().get('effective_masses', compute)      # cached, recomputed only after model changes
+T_axis, m_c_list, m_v_list = data['T_axis'], data['m_c'], data['m_v']
 mO = em.EffectiveMasses()
-m_c_list = []
-m_v_list = []
-
-for T_sim in T_axis:
-    m_c_list.append(mO.m_x(T_sim)[0])
-    m_v_list.append(mO.m_x(T_sim)[1])
 
 #------------------------------------------------------------------------------
 # plotting results:
 fig1 = mpl_p.figure(1)
+fig1.set_label('Effektive_Massen')
 ax1 = fig1.add_subplot(111)
 ax1.set_xlabel(r'Temperatur $T / K$')
 ax1.set_ylabel(r'Effektive Massen $m_{c/v}^{\ast} / m_e$')
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Evaluate any parameter model on an N-D grid of axis arrays (e.g. temperature x doping concentration)
+            in chunks, spread over a process pool and written straight into a memory-mapped .npy file
+            Interrupted evaluations are resumed from the last finished chunk
+
+Requires:   -
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import os
+import pickle
+import numpy as np
+from numpy.lib.format import open_memmap
+#==============================================================================
+
+class GridEvaluator:
+    """
+    Grid evaluator class
+
+    Call method 'evaluate' with *args 'model, axes, path' to evaluate model(*coordinates) on the full grid spanned by axes.
+    model is any picklable callable, e.g. the bound method of a parameter class 'mobilities.Klaassen().mu_i_bulk'.
+    It is called with one array per axis (the coordinates of all points of one chunk) and returns one array or a tuple of
+    n_out arrays. Models which only accept scalars are evaluated point by point with 'vectorized=False'.
+
+    The result is stored in path (.npy, shape = axes shape (+ (n_out,) for n_out > 1)), the finished chunks in
+    path + '.done.npy' and a fingerprint of the arguments in path + '.fingerprint'. Calling 'evaluate' again with the same
+    arguments skips all finished chunks, other arguments (fingerprint differs) start a new evaluation. The fingerprint
+    covers the pickled model (bound instance state, arguments of functools.partial), models which cannot be pickled
+    are never resumed.
+    """
+
+    chunk_size = 65536                  # grid points per chunk
+    processes = None                    # worker processes (None: os.cpu_count(), 1: evaluate in this process)
+    dtype = np.float64
+
+
+
+    def evaluate(self, model, axes, path, vectorized=True):
+        """
+        Purpose:    Evaluate model on the grid spanned by axes and write the result to a memory-mapped .npy file
+
+        Input:      Model callable model(*coordinates)
+                    Sequence of 1-D axis arrays axes
+                    Output file path (.npy)
+                    vectorized=False for models which only accept scalars
+
+        Output:     Read-only memory map of the result
+        """
+
+        self.model = model
+        self.axes = [np.asarray(a, dtype=float) for a in axes]
+        self.shape = tuple(a.size for a in self.axes)
+        self.path = path
+        self.vectorized = vectorized
+
+        size = int(np.prod(self.shape))
+        n_chunks = -(-size // self.chunk_size)
+        self.n_out = len(self.evaluate_points(np.zeros(1, dtype=np.intp)))
+        out_shape = self.shape + ((self.n_out,) if self.n_out > 1 else ())
+
+        done_path = path + '.done.npy'
+        fingerprint_path = path + '.fingerprint'
+        fingerprint = self.fingerprint()
+        resume = fingerprint is not None and os.path.exists(path) and os.path.exists(done_path) and os.path.exists(fingerprint_path)
+        if resume:
+            with open(fingerprint_path) as fobj:
+                resume = fobj.read().strip() == fingerprint
+        if resume:
+            out = np.load(path, mmap_mode='r')
+            done = np.load(done_path, mmap_mode='r+')
+            resume = out.shape == out_shape and out.dtype == self.dtype and done.shape == (n_chunks,)
+            del out
+        if not resume:
+            open_memmap(path, mode='w+', dtype=self.dtype, shape=out_shape).flush()
+            done = open_memmap(done_path, mode='w+', dtype=bool, shape=(n_chunks,))
+            with open(fingerprint_path, 'w') as fobj:
+                fobj.write((fingerprint or '') + '\n')
+
+        todo = np.flatnonzero(~done)
+        processes = self.processes or os.cpu_count()
+        if processes == 1 or todo.size <= 1:
+            for i in todo:
+                self.evaluate_chunk(i)
+                done[i] = True
+                done.flush()
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = [executor.submit(self.evaluate_chunk, i) for i in todo]
+                for future in as_completed(futures):
+                    done[future.result()] = True
+                    done.flush()
+
+        return np.load(path, mmap_mode='r')
+
+
+
+    def fingerprint(self):
+        """
+        SHA-256 of the pickled model, axes, vectorized, dtype and chunk_size (None if the model cannot be pickled)
+        """
+
+        try:
+            model = pickle.dumps(self.model, protocol=4)
+        except Exception:
+            return None
+        digest = hashlib.sha256(model)
+        digest.update(repr((self.vectorized, np.dtype(self.dtype).str, self.chunk_size, self.shape)).encode())
+        for a in self.axes:
+            digest.update(np.ascontiguousarray(a, dtype='<f8').tobytes())
+
+        return digest.hexdigest()
+
+
+
+    def evaluate_points(self, flat_index):
+        """
+        Evaluate the model at the grid points with flat (C-order) indices flat_index, returns a list of n_out arrays
+        """
+
+        index = np.unravel_index(flat_index, self.shape)
+        coordinates = [a[i] for a, i in zip(self.axes, index)]
+        if self.vectorized:
+            result = self.model(*coordinates)
+        else:
+            result = list(zip(*[np.atleast_1d(self.model(*point)) for point in zip(*coordinates)]))
+        if not isinstance(result, (tuple, list)):
+            result = [result]
+
+        return [np.broadcast_to(np.asarray(r, dtype=self.dtype), flat_index.shape) for r in result]
+
+
+
+    def evaluate_chunk(self, i):
+        """
+        Evaluate chunk i and write it into the memory-mapped output file (runs in the worker processes)
+        """
+
+        size = int(np.prod(self.shape))
+        c = slice(i * self.chunk_size, min((i + 1) * self.chunk_size, size))
+        result = self.evaluate_points(np.arange(c.start, c.stop))
+
+        out = np.load(self.path, mmap_mode='r+')
+        out_flat = out.reshape(size, self.n_out)
+        for k, r in enumerate(result):
+            out_flat[c, k] = r
+        out.flush()
+        del out, out_flat
+
+        return i
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Bundle the semiconductor parameters of one operating point (T_sim, N_D, N_A) in one object
+            Every parameter is calculated lazily on first access and memoized afterwards
+
+Requires:   constants.py
+            bandgap.py
+            effective_masses.py (which itself uses bandgap.py)
+            carrier_concentrations.py (which itself uses constants.py and bandgap.py)
+            mobilities.py (which itself uses carrier_concentrations.py)
+"""
+
+from ..constants import k_B
+from functools import cached_property
+from . import bandgap as bg
+from . import effective_masses as em
+from . import carrier_concentrations as cc
+from . import mobilities as mu
+import numpy as np
+#==============================================================================
+
+class MaterialState:
+    """
+    Material state class
+
+    Dependency graph of the parameter modules for one operating point:
+        E_g                 <- bandgap.py (Paessler 2002)
+        m_c, m_v            <- effective_masses.py (Green 1990), uses E_g
+        Delta_mu            <- chemical potential (standard definition), uses m_c, m_v
+        n_i, n, p           <- carrier_concentrations.py (Kimmerle 2011)
+        mu_As/P/B_b         <- mobilities.py (Klaassen 1992), uses n, p
+        D_As/P/B            <- Einstein-Smoluchowski equation, uses mu_As/P/B_b
+
+    Each node is evaluated at most once and only when it (or a node depending on it) is accessed.
+    input of T_sim in K, N_D and N_A in m^-3
+    output in SI units (eV for energies)
+    """
+
+    def __init__(self, T_sim, N_D, N_A):
+        self.T_sim = T_sim
+        self.N_D = N_D
+        self.N_A = N_A
+
+
+
+    @cached_property
+    def U_Te(self):
+        """
+        (thermal voltage * elementary charge) in eV
+        """
+
+        return k_B * self.T_sim
+
+
+
+    @cached_property
+    def E_g(self):
+        """
+        Bandgap E_g with 'Paessler' 2002 model in eV
+        """
+
+        return bg.Eg().eg_paessler2002(self.T_sim)
+
+
+
+    @cached_property
+    def m_x(self):
+        """
+        Effective carrier masses m_c, m_v with 'Green' 1990 model in multiplicative partivas of the free electron rest mass in 1
+        """
+
+        return em.EffectiveMasses().m_x(self.T_sim, self.E_g)
+
+
+
+    @property
+    def m_c(self):
+        return self.m_x[0]
+
+
+
+    @property
+    def m_v(self):
+        return self.m_x[1]
+
+
+
+    @cached_property
+    def Delta_mu(self):
+        """
+        Deviation of chemical potential from the bandgap center with temperature dependent effective masses in eV
+        """
+
+        return 3./4. * self.U_Te * np.log(self.m_v / self.m_c)
+
+
+
+    @cached_property
+    def n_i_n_p(self):
+        """
+        Intrinsic carrier concentration n_i, electron n and hole concentration p with 'Kimmerle' 2011 model in m^-3
+        """
+
+        return cc.Kimmerle().np(self.T_sim, self.N_D * 1.0e-6, self.N_A * 1.0e-6)
+
+
+
+    @property
+    def n_i(self):
+        return self.n_i_n_p[0]
+
+
+
+    @property
+    def n(self):
+        return self.n_i_n_p[1]
+
+
+
+    @property
+    def p(self):
+        return self.n_i_n_p[2]
+
+
+
+    @cached_property
+    def mu_b(self):
+        """
+        Total bulk mobilities mu_As_b, mu_P_b, mu_B_b with 'Klaassen (Philips)' 1992 model in m^2/Vs
+        """
+
+        return mu.Klaassen().mu_i_bulk(self.T_sim, self.N_D * 1.0e-6, self.N_A * 1.0e-6, self.n, self.p)
+
+
+
+    @property
+    def mu_As_b(self):
+        return self.mu_b[0]
+
+
+
+    @property
+    def mu_P_b(self):
+        return self.mu_b[1]
+
+
+
+    @property
+    def mu_B_b(self):
+        return self.mu_b[2]
+
+
+
+    @cached_property
+    def D(self):
+        """
+        Diffusion coefficients D_As, D_P, D_B with the Einstein-Smoluchowski equation in m^2/s
+        """
+
+        return self.U_Te * self.mu_As_b, self.U_Te * self.mu_P_b, self.U_Te * self.mu_B_b
+
+
+
+    @property
+    def D_As(self):
+        return self.D[0]
+
+
+
+    @property
+    def D_P(self):
+        return self.D[1]
+
+
+
+    @property
+    def D_B(self):
+        return self.D[2]
@@ -7,7 +7,8 @@ Purpose:    Calculate carrier mobilities mu_As_b, mu_P_b, mu_B_b in m^2/Vs
 Requires:   carrier_concentrations.py (which itself uses constants.py and bandgap.py)
 """
 
-import carrier_concentrations as cc
+from . import carrier_concentrations as cc
+import numpy as np
 #==============================================================================
 
 class Klaassen:
@@ -16,6 +17,7 @@ class Klaassen:
 
     Sufficient accuracy from 50...500K
     Call method 'mu_i_bulk' with *args 'T_sim, N_D, N_A' to calculate total bulk mobility in m^2/Vs
+    T_sim, N_D and N_A may be scalars or (broadcastable) arrays
 
     GENERAL NOTE
     i takes value 'e(lectrons)' from As & P or 'h(oles)' from B   
@@ -149,15 +151,8 @@ class Klaassen:
         G_min_h = self.k1 + self.k2 * (T_sim / (300. * self.m_h)) + self.k3 * (T_sim / (300. * self.m_h))**2. + self.k4 * (T_sim / (300. * self.m_h))**3. + self.k5 * (T_sim / (300. * self.m_h))**4.
         
     # G(P): minority impurity scattering (I eqn 9)
-        if P_e < P_min_e:
-            G__P_e = G_min_e
-        else:
-            G__P_e = 1. - self.s1 / (self.s2 + (T_sim / (300. * self.m_e))**self.s4 * P_e)**self.s3 + self.s5 / (((300. * self.m_e) / T_sim)**self.s7 * P_e)**self.s6
-
-        if P_h < P_min_h:
-            G__P_h = G_min_h
-        else:
-            G__P_h = 1. - self.s1 / (self.s2 + (T_sim / (300 * self.m_h))**self.s4 * P_h)**self.s3 + self.s5 / (((300. * self.m_h) / T_sim)**self.s7 * P_h)**self.s6
+        G__P_e = np.where(P_e < P_min_e, G_min_e, 1. - self.s1 / (self.s2 + (T_sim / (300. * self.m_e))**self.s4 * P_e)**self.s3 + self.s5 / (((300. * self.m_e) / T_sim)**self.s7 * P_e)**self.s6)
+        G__P_h = np.where(P_h < P_min_h, G_min_h, 1. - self.s1 / (self.s2 + (T_sim / (300 * self.m_h))**self.s4 * P_h)**self.s3 + self.s5 / (((300. * self.m_h) / T_sim)**self.s7 * P_h)**self.s6)
 
     # N_(i,sc,eff): effective two body scattering density (I eqn 21)
         N_e_sc_eff = N_D + G__P_e * N_A + p / F__P_e
@@ -183,19 +178,22 @@ class Klaassen:
 
 
 
-    def mu_i_bulk(self, T_sim, N_D, N_A):
+    def mu_i_bulk(self, T_sim, N_D, N_A, n=None, p=None):
         """
         Calculate total bulk mobility with 'Klaassen (Philips)' 1992 model in m^2/Vs
+        input of N_D and N_A in cm^-3
+        optional input of already evaluated n and p in m^-3 (skips the 'Kimmerle' 2011 evaluation)
         """
 
     # n_i2_Fermi, n, p    
-        NiKimmerleO = cc.Kimmerle()
-        """
-        input of N_D and N_A in cm^-3.
-        output of n_i, n and p in m^-3.
-        """
-        unused_n_i2, n, p = NiKimmerleO.np(T_sim, N_D, N_A)
-        unused_n_i = unused_n_i2**0.5
+        if n is None or p is None:
+            NiKimmerleO = cc.Kimmerle()
+            """
+            input of N_D and N_A in cm^-3.
+            output of n_i, n and p in m^-3.
+            """
+            unused_n_i2, n, p = NiKimmerleO.np(T_sim, N_D, N_A)
+            unused_n_i = unused_n_i2**0.5
         c = n + p
 
     # lattice mobility and mobility in dependence of all other bulk scattering mechanisms
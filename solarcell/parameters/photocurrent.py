@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Calculate absorption coefficient alpha of silicon in m^-1 with the Rajkanan-Singh-Shewchun model
+            Calculate external quantum efficiency EQE of a silicon wafer (absorption limited, ideal collection)
+            Calculate photocurrent density J_ph in A/m**2 of many spectra at once (one matrix product)
+            Read spectral irradiance tables (e.g. a locally stored ASTM G173 AM1.5 table), blackbody reference spectrum
+
+Requires:   constants.py
+"""
+
+from ..constants import h_P, h_P_J, k_B, k_B_J, c_0
+import numpy as np
+#==============================================================================
+
+class RajkananSinghShewchun:
+    """K. Rajkanan, R. Singh and J. Shewchun 1979 model
+    Ref.: Absorption coefficient of silicon for solar cell calculations (1979), SSE 22, 793...795
+    Indirect transitions (two gaps, two phonons) plus one direct transition, bandgaps after Varshni
+    input of wavelength in nm, T_sim in K
+    output in m^-1
+    """
+
+    E_g_0K = (1.1557, 2.5)                      # eV, indirect gaps E_g1, E_g2
+    E_gd_0K = 3.2                               # eV, direct gap
+    E_p = (1.827e-2, 5.773e-2)                  # eV, phonon energies
+    C = (5.5, 4.0)                              # 1
+    A = (3.231e2 * 1.0e2, 7.237e3 * 1.0e2)      # cm^-1 eV^-2 * 1.0e2 = m^-1 eV^-2
+    A_d = 1.052e6 * 1.0e2                       # cm^-1 eV^-1/2 * 1.0e2 = m^-1 eV^-1/2
+    beta = 7.021e-4                             # eV/K
+    gamma = 1108.0                              # K
+
+
+
+    def e_g(self, E_g_0K, T_sim):
+        """
+        Bandgap at T_sim in eV (Varshni)
+        """
+
+        return E_g_0K - self.beta * T_sim**2 / (T_sim + self.gamma)
+
+
+
+    def alpha(self, wavelength, T_sim=300.0):
+        """
+        Purpose:    Calculate absorption coefficient alpha
+
+        Model:      alpha = sum_ij C_i A_j [(E - E_gj + E_pi)**2 / (exp(E_pi / kT) - 1) + (E - E_gj - E_pi)**2 / (1 - exp(-E_pi / kT))]
+                            + A_d (E - E_gd)**0.5, photon energy E = h c / wavelength, every term only above its threshold
+
+        Input:      Wavelength in nm (scalar or array), simulation temperature T_sim in K (broadcast against wavelength)
+
+        Output:     Absorption coefficient alpha in m^-1
+        """
+
+        E = h_P * c_0 / (np.asarray(wavelength, dtype=float) * 1.0e-9)
+        T_sim = np.asarray(T_sim, dtype=float)
+        kT = k_B * T_sim
+        alpha = np.zeros(np.broadcast(E, T_sim).shape)
+        for E_p_i, C_i in zip(self.E_p, self.C):
+            for E_g_0K_j, A_j in zip(self.E_g_0K, self.A):
+                E_g_j = self.e_g(E_g_0K_j, T_sim)
+                absorption = np.maximum(E - E_g_j + E_p_i, 0.0)**2 / np.expm1(E_p_i / kT)
+                emission = np.maximum(E - E_g_j - E_p_i, 0.0)**2 / -np.expm1(-E_p_i / kT)
+                alpha = alpha + C_i * A_j * (absorption + emission)
+        alpha = alpha + self.A_d * np.sqrt(np.maximum(E - self.e_g(self.E_gd_0K, T_sim), 0.0))
+
+        return alpha
+
+
+
+class Spectrum:
+    """
+    Spectral irradiance class
+
+    Call method 'read' with *args 'path' to read a table of wavelengths in nm and spectral irradiances in W/(m**2*nm)
+    (e.g. ASTM G173: column 0 wavelength, columns 1...3 extraterrestrial, global tilt (AM1.5G), direct + circumsolar).
+    No AM1.5 data is shipped with the repository; method 'blackbody' gives a reference spectrum instead.
+    """
+
+    T_sun = 5778.0                              # K, effective temperature of the sun
+    irradiance = 1000.0                         # W/m**2, STC
+
+
+
+    def read(self, path, column=1, comment='#'):
+        """
+        Read wavelengths in nm and spectral irradiance in W/(m**2*nm) of column from a text table
+        (separated by whitespace, ',' or ';', non-numeric header lines are skipped)
+        """
+
+        rows = []
+        with open(path) as fobj:
+            for line in fobj:
+                fields = line.split(comment, 1)[0].replace(',', ' ').replace(';', ' ').split()
+                try:
+                    rows.append([float(field) for field in fields])
+                except ValueError:
+                    continue
+        data = np.array([row for row in rows if len(row) > column])
+
+        return data[:, 0], data[:, column]
+
+
+
+    def blackbody(self, wavelength, T=None, irradiance=None):
+        """
+        Planck spectrum of temperature T (default T_sun) in W/(m**2*nm), scaled to total irradiance (default 1000 W/m**2)
+        over all wavelengths
+        """
+
+        T = self.T_sun if T is None else T
+        irradiance = self.irradiance if irradiance is None else irradiance
+        wavelength_m = np.asarray(wavelength, dtype=float) * 1.0e-9
+        x = h_P_J * c_0 / (wavelength_m * k_B_J * T)
+        spectral = 2.0 * np.pi * h_P_J * c_0**2 / wavelength_m**5 / np.expm1(x) * 1.0e-9          # W/(m**2*nm)
+        total = 2.0 * np.pi**5 * (k_B_J * T)**4 / (15.0 * h_P_J**3 * c_0**2)      # W/m**2 (Stefan-Boltzmann)
+
+        return spectral * irradiance / total
+
+
+
+class Photocurrent:
+    """
+    Photocurrent density class
+
+    Spectra are given on the wavelength grid of the instance (nm). The photocurrent density of n spectra
+    (array of shape (n, n_wavelengths), e.g. one spectrum per time step of a yield simulation) is one matrix product
+        J_ph = - spectra @ weights,     weights = trapezoid weights * q_e * wavelength / (h * c) * EQE
+    Sign convention of 'twodiodemodel.SiCell': J_ph < 0 under illumination.
+    """
+
+    def __init__(self, wavelength):
+        self.wavelength = np.asarray(wavelength, dtype=float)
+        self.absorption = RajkananSinghShewchun()
+
+
+
+    def trapezoid(self):
+        """
+        Trapezoidal quadrature weights of the wavelength grid in nm
+        """
+
+        d = np.diff(self.wavelength)
+        weights = np.zeros_like(self.wavelength)
+        weights[:-1] += 0.5 * d
+        weights[1:] += 0.5 * d
+
+        return weights
+
+
+
+    def eqe(self, W=180.0e-6, T_sim=300.0, R=0.0, path_factor=1.0):
+        """
+        Purpose:    Calculate external quantum efficiency EQE of a silicon wafer
+
+        Model:      EQE = (1 - R) * (1 - exp(-alpha * path_factor * W)), every absorbed photon is collected
+                    (path_factor > 1 for light trapping, e.g. 4 n**2 ~ 50 for a Lambertian rear)
+
+        Input:      Wafer thickness W in m, simulation temperature T_sim in K, front reflectance R (scalar or array on the grid)
+
+        Output:     EQE in 1 on the wavelength grid
+        """
+
+        alpha = self.absorption.alpha(self.wavelength, T_sim)
+
+        return (1.0 - np.asarray(R, dtype=float)) * -np.expm1(-alpha * path_factor * W)
+
+
+
+    def weights(self, eqe=None):
+        """
+        Quadrature weights in A/W of the spectra (spectral irradiance in W/(m**2*nm)) for EQE (default: eqe()),
+        shape of eqe: (n_wavelengths,) or (n_wavelengths, n_eqe)
+        """
+
+        eqe = self.eqe() if eqe is None else np.asarray(eqe, dtype=float)
+        responsivity = self.trapezoid() * self.wavelength * 1.0e-9 / (h_P * c_0)          # q_e * wavelength / (h * c) in A/W
+
+        return (responsivity if eqe.ndim == 1 else responsivity[:, None]) * eqe
+
+
+
+    def j_ph(self, spectra, eqe=None):
+        """
+        Purpose:    Calculate photocurrent density J_ph
+
+        Input:      Spectral irradiances in W/(m**2*nm) on the wavelength grid, shape (n_wavelengths,) or (..., n_wavelengths)
+                    EQE on the wavelength grid (default: eqe()), shape (n_wavelengths,) or (n_wavelengths, n_eqe) for several cells
+
+        Output:     Photocurrent density J_ph in A/m**2 (negative), shape of spectra without the last axis (plus n_eqe)
+        """
+
+        return - np.asarray(spectra, dtype=float) @ self.weights(eqe)
+
+
+
+    def resampler(self, wavelength):
+        """
+        Linear interpolation matrix of shape (n_wavelengths, len(wavelength)) from the (ascending) wavelengths of a table
+        to the wavelength grid (zero outside the table), so spectra_on_grid = spectra @ matrix.T for many spectra at once
+        """
+
+        wavelength = np.asarray(wavelength, dtype=float)
+        matrix = np.zeros((self.wavelength.size, wavelength.size))
+        k = np.clip(np.searchsorted(wavelength, self.wavelength) - 1, 0, wavelength.size - 2)
+        t = (self.wavelength - wavelength[k]) / (wavelength[k + 1] - wavelength[k])
+        inside = (self.wavelength >= wavelength[0]) & (self.wavelength <= wavelength[-1])
+        rows = np.arange(self.wavelength.size)
+        matrix[rows, k] = np.where(inside, 1.0 - t, 0.0)
+        matrix[rows, k + 1] += np.where(inside, t, 0.0)
+
+        return matrix
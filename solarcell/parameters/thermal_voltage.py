@@ -7,7 +7,8 @@ Purpose:    Calculate thermal voltage U_T in V
 Requires:   constants.py
 """
 
-from constants import q_e, k_B_J
+from ..constants import q_e, k_B_J
+import numpy as np
 #==============================================================================
 
 class ThermalVoltage:
@@ -24,11 +25,11 @@ class ThermalVoltage:
         Requires:   Elementary charge q_e in C
                     Botzmann constant k (herein k_B_J) in J/K
 
-        Input:      Simulation temperature T_sim in K
+        Input:      Simulation temperature T_sim in K (scalar or array)
 
-        Output:     Thermal voltage U_T in V
+        Output:     Thermal voltage U_T in V (same shape as T_sim)
         """
 
-        U_T = k_B_J * T_sim / q_e
+        U_T = k_B_J * np.asarray(T_sim, dtype=float) / q_e
 
         return U_T
@@ -7,23 +7,23 @@ Purpose:    Plot thermal voltage U_T in mV
 Requires:   thermal_voltage.py
 """
 
-import thermal_voltage as tv
+from solarcell.parameters import thermal_voltage as tv
+from solarcell import figures as fg
 import numpy as np
 import matplotlib.pyplot as mpl_p
 #==============================================================================
 
-T_axis = np.arange(0., 605., 5.)
+def compute():
+    T_axis = np.arange(0., 605., 5.)
+    return {'T_axis': T_axis, 'U_T': tv.ThermalVoltage().u_t(T_axis) * 1000}
 
-tvO = tv.ThermalVoltage()
-U_T_list = []
-
-for T_sim in T_axis:
-    U_T = tvO.u_t(T_sim)
-    U_T_list.append(U_T*1000)
+data = fg.DataCache().get('thermal_voltage', compute)      # cached, recomputed only after model changes
+T_axis, U_T_list = data['T_axis'], data['U_T']
 
 #------------------------------------------------------------------------------
 # plotting results:
 fig1 = mpl_p.figure(1)
+fig1.set_label('Temperaturspannung')
 ax1 = fig1.add_subplot(111)
 ax1.set_xlabel(r'Temperatur $T / K$')
 ax1.set_ylabel(r'Temperaturspannung $U_T / mV$')
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Local evaluation service (asyncio, Unix socket or TCP) for many small concurrent requests of J(U) points,
+            solar cell characteristics and parameter models
+            Concurrent requests are collected over a short time window and evaluated as one vectorized batch
+            ('twodiodemodel_batch.SiCellBatch'), the results are fanned back out to the callers
+
+Requires:   twodiodemodel.py, twodiodemodel_batch.py, cli.py (configure_cell)
+
+===============================================================================
+PROTOCOL (one JSON object per line, responses carry the "id" of their request and may arrive out of order):
+    {"id": 1, "op": "j", "cell": {"J_ph": -350.0, "T_sim": 333.15, ...}, "U": [0.0, 0.5, 0.6]}
+        -> {"id": 1, "J": [...]}                                        current densities in A/m**2
+    {"id": 2, "op": "characteristics", "cell": {...}}
+        -> {"id": 2, "U_oc": ..., "J_sc": ..., "U_MPP": ..., "J_MPP": ..., "S_MPP": ..., "FF": ..., "eta": ...}
+    {"id": 3, "op": "model", "model": "mobilities.Klaassen.mu_i_bulk", "args": [300.0, 1.0e22, 1.0e16]}
+        -> {"id": 3, "result": ...}                                     (list for models with several outputs)
+    "model" is restricted to the classes of the modules of solarcell.parameters, other names are answered with an error
+    errors: {"id": ..., "error": "message"}
+"cell" takes the keys of the config "cell" of the command line interface (see cli.py), default: class SiCell
+===============================================================================
+"""
+
+import asyncio
+import importlib
+import json
+import numpy as np
+#==============================================================================
+
+class Service:
+    """
+    Evaluation service class
+
+    Call (await) method 'handle' with *args 'request' (dictionary, see PROTOCOL) for in-process use or method 'serve'
+    with *args 'path' (Unix socket) or 'host, port' (TCP) to accept connections.
+
+    Requests of the same kind ('j' and 'characteristics' of any cells, 'model' of the same model) are collected until
+    window seconds after the first one or until max_batch requests are pending, then evaluated together in the default
+    executor (the event loop keeps collecting the next window meanwhile).
+    """
+
+    window = 2.0e-3                     # s
+    max_batch = 4096                    # requests
+    max_cells = 10000                   # cached parameter sets of configured cells
+    characteristics_names = ('U_oc', 'J_sc', 'U_MPP', 'J_MPP', 'S_MPP', 'FF', 'eta')
+    excluded_modules = ('grid_evaluator',)                  # modules of solarcell.parameters without parameter models
+
+
+
+    def __init__(self):
+        self.pending = {}
+        self.cells = {}
+        self.models = {}
+        self.n_batches = 0
+        self.n_requests = 0
+
+
+
+    def cell_parameters(self, values):
+        """
+        Parameters (J_ph, J_s1, J_s2, R_s, R_p, T_sim) at T_sim of the cell values (dictionary), cached per values
+        """
+
+        from .twodiodemodel import twodiodemodel as tdm
+        from . import cli
+
+        key = json.dumps(values or {}, sort_keys=True)
+        if key not in self.cells:
+            if len(self.cells) >= self.max_cells:
+                self.cells.clear()
+            cell = cli.configure_cell(tdm.SiCell(), values or {})
+            self.cells[key] = (cell.J_ph, cell.J_s1, cell.J_s2, cell.R_s, cell.R_p, cell.T_sim)
+
+        return self.cells[key]
+
+
+
+    def batch(self, parameters):
+        """
+        Vectorized cell of the parameter sets (rows of parameters) with the numerical settings of class SiCell
+        """
+
+        from .twodiodemodel import twodiodemodel as tdm
+        from .twodiodemodel import twodiodemodel_batch as tdb
+
+        batch = tdb.SiCellBatch(*np.asarray(parameters, dtype=float).T)
+        batch.accuracy = tdm.SiCell.accuracy
+        batch.U_min = tdm.SiCell.U_min
+        batch.U_max = tdm.SiCell.U_max
+
+        return batch
+
+
+
+    def model_modules(self):
+        """
+        Modules of solarcell.parameters which provide parameter models (the example plots and tools are excluded)
+        """
+
+        from . import parameters
+
+        return tuple(name for name in parameters.submodules if name not in self.excluded_modules and not name.endswith('_exampleplot'))
+
+
+
+    def model(self, name):
+        """
+        Bound method of a parameter model "module.Class.method" of solarcell.parameters (module given as "module" or
+        "solarcell.parameters.module", one of model_modules), other modules, classes imported from elsewhere and private
+        names are rejected before anything is imported
+        """
+
+        if name not in self.models:
+            package = __package__ + '.parameters'
+            parts = str(name).split('.')
+            if parts[:-3] == package.split('.'):
+                parts = parts[-3:]
+            if len(parts) != 3 or not all(part.isidentifier() and not part.startswith('_') for part in parts):
+                raise ValueError("unknown model '%s' (use 'module.Class.method' of %s)" % (name, package))
+            module_name, class_name, method_name = parts
+            if module_name not in self.model_modules():
+                raise ValueError("unknown model '%s' (no model module '%s' in %s)" % (name, module_name, package))
+            module = importlib.import_module(package + '.' + module_name)
+            model_class = getattr(module, class_name, None)
+            if not isinstance(model_class, type) or model_class.__module__ != module.__name__:
+                raise ValueError("unknown model '%s' (no class '%s' in %s)" % (name, class_name, module.__name__))
+            self.models[name] = getattr(model_class(), method_name)
+
+        return self.models[name]
+
+
+
+#==============================================================================
+# vectorized evaluation of one batch (list of requests), returns one response per request
+    def evaluate_j(self, requests):
+        """
+        J(U) of all requests: all voltages are concatenated, every point carries the parameters of its cell
+        """
+
+        U = [np.atleast_1d(np.asarray(request['U'], dtype=float)) for request in requests]
+        parameters = [self.cell_parameters(request.get('cell')) for request in requests]
+        offsets = np.cumsum([0] + [u.size for u in U])
+        J = self.batch(np.repeat(parameters, np.diff(offsets), axis=0)).j(np.concatenate(U))
+
+        return [{'J': J[offsets[i]:offsets[i + 1]].tolist()} for i in range(len(requests))]
+
+
+
+    def evaluate_characteristics(self, requests):
+        """
+        Solar cell characteristics of all requests
+        """
+
+        parameters = [self.cell_parameters(request.get('cell')) for request in requests]
+        characteristics = self.batch(parameters).characteristics()
+
+        return [dict(zip(self.characteristics_names, column.tolist())) for column in characteristics.T]
+
+
+
+    def evaluate_model(self, requests):
+        """
+        Parameter model of all requests (same model), arguments stacked into arrays
+        """
+
+        model = self.model(requests[0]['model'])
+        args = [np.asarray(arg, dtype=float) for arg in zip(*(request['args'] for request in requests))]
+        result = model(*args)
+        if isinstance(result, (tuple, list)):
+            columns = list(zip(*(np.broadcast_to(np.asarray(r, dtype=float), (len(requests),)).tolist() for r in result)))
+            return [{'result': list(column)} for column in columns]
+
+        return [{'result': r} for r in np.broadcast_to(np.asarray(result, dtype=float), (len(requests),)).tolist()]
+
+
+
+    def evaluate(self, kind, requests):
+        """
+        Evaluate a batch; if it fails, evaluate its requests one by one, so only the faulty ones get an error
+        """
+
+        evaluator = {'j': self.evaluate_j, 'characteristics': self.evaluate_characteristics, 'model': self.evaluate_model}[kind[0]]
+        try:
+            return evaluator(requests)
+        except Exception:
+            if len(requests) == 1:
+                raise
+        responses = []
+        for request in requests:
+            try:
+                responses.append(evaluator([request])[0])
+            except Exception as exception:
+                responses.append({'error': '%s: %s' % (type(exception).__name__, exception)})
+
+        return responses
+
+
+
+#==============================================================================
+# micro-batching
+    async def handle(self, request):
+        """
+        Purpose:    Answer one request (dictionary, see PROTOCOL)
+
+        Model:      The request waits in the pending batch of its kind, which is evaluated after window seconds
+                    (or as soon as max_batch requests are pending) together with all requests arriving meanwhile
+
+        Output:     Response dictionary (with the "id" of the request if given)
+        """
+
+        op = request.get('op')
+        if op not in ('j', 'characteristics', 'model'):
+            response = {'error': "unknown op '%s'" % op}
+        elif op == 'model' and not isinstance(request.get('model'), str):
+            response = {'error': "model must be a string 'module.Class.method' of solarcell.parameters"}
+        else:
+            kind = (op, request.get('model')) if op == 'model' else (op,)
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            pending = self.pending.setdefault(kind, [])
+            pending.append((request, future))
+            if len(pending) == 1:
+                loop.call_later(self.window, self.flush, kind)
+            elif len(pending) >= self.max_batch:
+                self.flush(kind)
+            try:
+                response = dict(await future)
+            except Exception as exception:
+                response = {'error': '%s: %s' % (type(exception).__name__, exception)}
+        if 'id' in request:
+            response['id'] = request['id']
+
+        return response
+
+
+
+    def flush(self, kind):
+        """
+        Start the evaluation of the pending batch of kind
+        """
+
+        pending = self.pending.pop(kind, None)
+        if pending:
+            asyncio.ensure_future(self.run_batch(kind, pending))
+
+
+
+    async def run_batch(self, kind, pending):
+        """
+        Evaluate a batch in the default executor and resolve the futures of its requests
+        """
+
+        self.n_batches += 1
+        self.n_requests += len(pending)
+        loop = asyncio.get_running_loop()
+        try:
+            responses = await loop.run_in_executor(None, self.evaluate, kind, [request for request, unused_future in pending])
+        except Exception as exception:
+            for unused_request, future in pending:
+                if not future.done():
+                    future.set_exception(exception)
+            return
+        for (unused_request, future), response in zip(pending, responses):
+            if not future.done():
+                future.set_result(response)
+
+
+
+#==============================================================================
+# connections
+    async def connection(self, reader, writer):
+        """
+        Serve one connection: every line is a request, answered concurrently as soon as its batch is done
+        """
+
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def answer(line):
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('request must be a JSON object')
+            except ValueError as exception:
+                response = {'error': 'invalid request: %s' % exception}
+            else:
+                response = await self.handle(request)
+            async with lock:
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(answer(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+
+    async def serve(self, path=None, host='127.0.0.1', port=0):
+        """
+        Start the server on Unix socket path (if given) or on TCP host:port (port 0: any free port), returns the asyncio server
+        """
+
+        if path is not None:
+            return await asyncio.start_unix_server(self.connection, path=path, limit=2**24)
+
+        return await asyncio.start_server(self.connection, host, port, limit=2**24)
+
+
+
+class Client:
+    """
+    Client class of the evaluation service
+
+    Call (await) method 'connect' with *args 'path' (Unix socket) or 'host, port' (TCP), then method 'request' with
+    *args 'op' and the request keys (e.g. client.request('j', cell={...}, U=[...])) from as many tasks as needed.
+    """
+
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.futures = {}
+        self.next_id = 0
+        self.receiver = None
+
+
+
+    async def connect(self, path=None, host='127.0.0.1', port=None):
+        if path is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(path, limit=2**24)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port, limit=2**24)
+        self.receiver = asyncio.ensure_future(self.receive())
+
+        return self
+
+
+
+    async def receive(self):
+        """
+        Resolve the futures of the pending requests with the responses of the service
+        """
+
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self.futures.pop(response.pop('id', None), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self.futures.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('connection to the service closed'))
+            self.futures.clear()
+
+
+
+    async def request(self, op, **request):
+        """
+        Send one request and wait for its response, raises RuntimeError on error responses
+        """
+
+        self.next_id += 1
+        request.update(id=self.next_id, op=op)
+        future = asyncio.get_running_loop().create_future()
+        self.futures[self.next_id] = future
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        response = await future
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+
+        return response
+
+
+
+    async def close(self):
+        self.writer.close()
+        await self.receiver
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Package 'solarcell.twodiodemodel' with the two-diode-model, its fits and measurement input/output
+            Modules are imported on first access (e.g. solarcell.twodiodemodel.twodiodemodel_batch)
+
+Requires:   -
+"""
+
+import importlib
+#==============================================================================
+
+submodules = ('curve_translation', 'design_optimizer', 'distributed_cell', 'drift_diffusion', 'measurement_io', 'result_cache', 'saturation_currents', 'sensitivity', 'temperature_coefficients', 'transient', 'twodiodemodel', 'twodiodemodel_batch', 'twodiodemodel_fit', 'twodiodemodel_stream')
+
+
+
+def __getattr__(name):
+    """
+    Import submodule name on first access
+    """
+
+    if name in submodules:
+        return importlib.import_module('.' + name, __name__)
+
+    raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+
+
+
+def __dir__():
+    return sorted(list(globals()) + list(submodules))
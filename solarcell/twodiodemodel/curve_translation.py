@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Translate measured current density-voltage characteristics J(U) to other temperature and irradiance (e.g. STC)
+            with the procedures 1 and 2 of IEC 60891 for whole arrays of curves (or measurement campaigns) at once
+            Derive the correction coefficients from the two-diode-model of silicon solar cells
+
+Requires:   constants.py
+            temperature_coefficients.py (coefficients of 'from_cells', which itself uses saturation_currents.py and twodiodemodel_batch.py)
+"""
+
+from ..constants import T_STC
+from . import temperature_coefficients as tc
+import numpy as np
+#==============================================================================
+
+class CurveTranslation:
+    """
+    Curve translation class
+
+    Call method 'procedure_1' or 'procedure_2' with *args 'U, J, T, G' (curves as 2-D arrays of shape (n_curves, n_points), nan
+    padded like 'measurement_io.Campaign.padded', temperature T in K and irradiance G in W/m**2 per curve) or method 'campaign'
+    with a 'measurement_io.Campaign'. Create the coefficients of the cells of the curves with 'from_cells', all coefficients may
+    be arrays of one value per curve (size 1: same value for all curves). Curves of unknown irradiance (nan, e.g. dark curves) are translated in temperature only.
+
+    Model:      IEC 60891 (ed. 2, 2009) in the sign convention of 'twodiodemodel.SiCell' (J = - I / A, J_sc < 0), dT = T_2 - T
+                procedure 1:    J_2 = J + J_sc (G_2 / G - 1) + alpha dT
+                                U_2 = U + R_s (J_2 - J) + kappa J_2 dT + beta dT
+                procedure 2:    J_2 = J (1 + alpha_rel dT) G_2 / G
+                                U_2 = U + U_oc (beta_rel dT + a ln(G_2 / G)) + R_s_2 (J_2 - J) + kappa_2 J_2 dT
+                J_sc, U_oc of every curve by linear interpolation at its zero crossing of U, J (nan without crossing)
+    input of U in V, J in A/m**2, T in K, G in W/m**2, alpha in A/(m**2*K), beta in V/K, alpha_rel, beta_rel in 1/K,
+    R_s, R_s_2 in Ohm*m**2, kappa, kappa_2 in Ohm*m**2/K
+    """
+
+    names = ('alpha', 'beta', 'R_s', 'kappa', 'alpha_rel', 'beta_rel', 'a', 'R_s_2', 'kappa_2')
+    G_STC = 1000.0                      # W/m**2, STC-irradiance
+    chunk_size = 65536                  # curves per chunk of 'campaign'
+
+
+
+    def __init__(self, alpha=0.0, beta=0.0, R_s=0.0, kappa=0.0, alpha_rel=0.0, beta_rel=0.0, a=0.0, R_s_2=0.0, kappa_2=0.0):
+        self.alpha = np.asarray(alpha, dtype=float)
+        self.beta = np.asarray(beta, dtype=float)
+        self.R_s = np.asarray(R_s, dtype=float)
+        self.kappa = np.asarray(kappa, dtype=float)
+        self.alpha_rel = np.asarray(alpha_rel, dtype=float)
+        self.beta_rel = np.asarray(beta_rel, dtype=float)
+        self.a = np.asarray(a, dtype=float)
+        self.R_s_2 = np.asarray(R_s_2, dtype=float)
+        self.kappa_2 = np.asarray(kappa_2, dtype=float)
+
+
+
+    @classmethod
+    def from_cells(cls, cells):
+        """
+        Purpose:    Create the coefficients of both procedures from the two-diode-model of cells (one set of coefficients per cell)
+
+        Model:      alpha = dJ_sc/dT, beta = dU_oc/dT, alpha_rel = alpha / J_sc, beta_rel = beta / U_oc ('temperature_coefficients'),
+                    a = dU_oc/d(ln G) / U_oc = - J_ph / (U_oc dJ_d/dU) (J_ph proportional to G, dJ_d/dU of the diodes at U_oc),
+                    R_s, R_s_2 (like IEC 60891 from curves at different irradiance) such that the translated maximum power follows
+                    dS_MPP/d(ln G) = U_MPP J_ph / (1 + R_s dJ_d/dU) (first order in ln G, dJ_d/dU at the MPP, R_s of the cell):
+                        R_s     = (dS_MPP/d(ln G) - U_MPP J_sc) / (J_MPP J_sc)
+                        R_s_2   = (dS_MPP/d(ln G) - S_MPP - J_MPP U_oc a) / J_MPP**2
+                    kappa, kappa_2 such that the translated maximum power follows dS_MPP/dT (first order in dT):
+                        kappa   = (dS_MPP/dT - U_MPP alpha - J_MPP (R_s alpha + beta)) / J_MPP**2
+                        kappa_2 = (dS_MPP/dT - S_MPP alpha_rel - J_MPP (U_oc beta_rel + R_s_2 J_MPP alpha_rel)) / J_MPP**2
+
+        Input:      List of 'twodiodemodel.SiCell' (after set_values / set_active_effects, at the reference conditions of the
+                    translation, e.g. T_sim = T_STC and J_ph at G_STC)
+
+        Output:     CurveTranslation with coefficient arrays of shape (len(cells),)
+        """
+
+        coefficients = tc.TemperatureCoefficients()
+        batch = coefficients.batch(cells)
+        U_oc, J_sc, U_MPP, J_MPP, S_MPP, unused_FF, unused_eta = batch.characteristics()
+        dU_oc, dJ_sc, unused_dU_MPP, unused_dJ_MPP, dS_MPP, unused_dFF, unused_deta = coefficients.coefficients(cells)
+        unused_J, dJ_d = batch.j_bounded(U_oc)
+        a = - batch.J_ph / (U_oc * dJ_d)
+        unused_J, dJ_d = batch.j_bounded(U_MPP - J_MPP * batch.R_s)
+        dS_MPP_G = U_MPP * batch.J_ph / (1.0 + batch.R_s * dJ_d)
+
+        alpha, beta = dJ_sc, dU_oc
+        alpha_rel, beta_rel = dJ_sc / J_sc, dU_oc / U_oc
+        R_s = (dS_MPP_G - U_MPP * J_sc) / (J_MPP * J_sc)
+        R_s_2 = (dS_MPP_G - S_MPP - J_MPP * U_oc * a) / J_MPP**2
+        kappa = (dS_MPP - U_MPP * alpha - J_MPP * (R_s * alpha + beta)) / J_MPP**2
+        kappa_2 = (dS_MPP - S_MPP * alpha_rel - J_MPP * (U_oc * beta_rel + R_s_2 * J_MPP * alpha_rel)) / J_MPP**2
+
+        return cls(alpha, beta, R_s, kappa, alpha_rel, beta_rel, a, R_s_2, kappa_2)
+
+
+
+    def crossing(self, x, y):
+        """
+        Value of y at the first zero crossing of x of every curve (rows, linear interpolation, nan without crossing)
+        """
+
+        sign_change = (x[:, :-1] * x[:, 1:] <= 0.0) & (x[:, :-1] != x[:, 1:])          # nan compares False
+        k = np.argmax(sign_change, axis=1)[:, np.newaxis]
+        x_0, x_1 = np.take_along_axis(x, k, axis=1), np.take_along_axis(x, k + 1, axis=1)
+        y_0, y_1 = np.take_along_axis(y, k, axis=1), np.take_along_axis(y, k + 1, axis=1)
+        value = (y_0 + x_0 / (x_0 - x_1) * (y_1 - y_0))[:, 0]
+
+        return np.where(sign_change.any(axis=1), value, np.nan)
+
+
+
+    def conditions(self, T, G, T_2, G_2):
+        """
+        Per curve (column vectors) temperature difference dT = T_2 - T and irradiance ratio G_2 / G (1 for unknown G)
+        """
+
+        dT = (np.asarray(T_2, dtype=float) - np.asarray(T, dtype=float))[..., np.newaxis]
+        G = np.asarray(G, dtype=float)
+        ratio = np.where(np.isnan(G), 1.0, np.asarray(G_2, dtype=float) / G)[..., np.newaxis]
+
+        return dT, ratio
+
+
+
+    def coefficient(self, name):
+        """
+        Coefficient name as column vector (one value per curve)
+        """
+
+        return getattr(self, name)[..., np.newaxis]
+
+
+
+    def procedure_1(self, U, J, T, G, T_2=T_STC, G_2=G_STC):
+        """
+        Purpose:    Translate curves U, J at temperature T and irradiance G to T_2, G_2 with IEC 60891 procedure 1
+
+        Input:      Voltages U in V and current densities J in A/m**2 of shape (n_curves, n_points), T in K and G in W/m**2
+                    (scalars or per curve), target temperature T_2 in K and irradiance G_2 in W/m**2
+
+        Output:     Translated voltages U_2 in V and current densities J_2 in A/m**2 (shape of U)
+        """
+
+        U = np.atleast_2d(np.asarray(U, dtype=float))
+        J = np.atleast_2d(np.asarray(J, dtype=float))
+        dT, ratio = self.conditions(T, G, T_2, G_2)
+        J_sc = self.crossing(U, J)[:, np.newaxis]
+        J_2 = J + np.where(ratio == 1.0, 0.0, J_sc * (ratio - 1.0)) + self.coefficient('alpha') * dT
+        U_2 = U + self.coefficient('R_s') * (J_2 - J) + self.coefficient('kappa') * J_2 * dT + self.coefficient('beta') * dT
+
+        return U_2, J_2
+
+
+
+    def procedure_2(self, U, J, T, G, T_2=T_STC, G_2=G_STC):
+        """
+        Purpose:    Translate curves U, J at temperature T and irradiance G to T_2, G_2 with IEC 60891 procedure 2
+
+        Input:      Voltages U in V and current densities J in A/m**2 of shape (n_curves, n_points), T in K and G in W/m**2
+                    (scalars or per curve), target temperature T_2 in K and irradiance G_2 in W/m**2
+
+        Output:     Translated voltages U_2 in V and current densities J_2 in A/m**2 (shape of U)
+        """
+
+        U = np.atleast_2d(np.asarray(U, dtype=float))
+        J = np.atleast_2d(np.asarray(J, dtype=float))
+        dT, ratio = self.conditions(T, G, T_2, G_2)
+        U_oc = self.crossing(J, U)[:, np.newaxis]
+        J_2 = J * (1.0 + self.coefficient('alpha_rel') * dT) * ratio
+        U_2 = (U + U_oc * (self.coefficient('beta_rel') * dT + self.coefficient('a') * np.log(ratio))
+               + self.coefficient('R_s_2') * (J_2 - J) + self.coefficient('kappa_2') * J_2 * dT)
+
+        return U_2, J_2
+
+
+
+    def campaign(self, campaign, procedure=1, T_2=T_STC, G_2=G_STC, index=None):
+        """
+        Purpose:    Translate curves index (default: all) of a 'measurement_io.Campaign' with their metadata T, G
+
+        Input:      Campaign, procedure (1 or 2), target temperature T_2 in K and irradiance G_2 in W/m**2, index
+                    (coefficient arrays of one value per curve follow index)
+
+        Output:     Translated voltages U_2 in V and current densities J_2 in A/m**2 of shape (n_curves, max. number of points),
+                    padded with nan
+        """
+
+        if procedure not in (1, 2):
+            raise ValueError('unknown procedure %r (use 1 or 2)' % (procedure,))
+        index = np.arange(len(campaign)) if index is None else np.asarray(index)
+        if index.size == 0:
+            return np.zeros((0, 0)), np.zeros((0, 0))
+        chunks = []
+        for start in range(0, index.size, self.chunk_size):
+            chunk = index[start:start + self.chunk_size]
+            U, J = campaign.padded(chunk)
+            values = {name: getattr(self, name) for name in self.names}
+            coefficients = CurveTranslation(**{name: value[start:start + self.chunk_size] if value.size > 1 else value
+                                               for name, value in values.items()})
+            translate = getattr(coefficients, 'procedure_%d' % procedure)
+            chunks.append(translate(U, J, np.asarray(campaign.T)[chunk], np.asarray(campaign.G)[chunk], T_2, G_2))
+        n_points = max(U_2.shape[1] for U_2, unused_J_2 in chunks)
+        pad = lambda x: np.pad(x, ((0, 0), (0, n_points - x.shape[1])), constant_values=np.nan)
+
+        return np.concatenate([pad(U_2) for U_2, unused_J_2 in chunks]), np.concatenate([pad(J_2) for unused_U_2, J_2 in chunks])
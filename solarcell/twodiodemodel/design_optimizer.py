@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Optimize the device design (thickness W, lifetime tau, surface recombination velocity S, acceptor concentration N_a)
+            of a silicon solar cell for maximum efficiency eta or MPP power density S_MPP within bounds
+            Whole candidate populations are evaluated as one vectorized batch, optionally split across worker processes
+
+Requires:   saturation_currents.py, twodiodemodel_batch.py (which themselves use constants.py)
+            material_state.py (mobility of the candidate dopings)
+            scipy (imported on first use)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+from ..parameters import material_state as ms
+from . import saturation_currents as sc
+from . import twodiodemodel_batch as tdb
+import numpy as np
+#==============================================================================
+
+class DesignOptimizer:
+    """
+    Device design optimizer class
+
+    Call method 'optimize' with *args 'bounds' (dictionary {name: (lower, upper)} of design parameters W, tau, S, N_a)
+    for a 'twodiodemodel.SiCell' configured with physical saturation currents: set_fit_options(0, 1) and
+    set_active_effects(..., m_x_eff_on=1, ..., mu_x_on=1), i.e. J_s1 of mode 'absolute' of 'saturation_currents.SaturationCurrents'
+    (the other modes scale the measured J_s1_T_ini with temperature only, so the design cancels out).
+
+    Model:      differential evolution (scipy.optimize.differential_evolution, vectorized): every generation is one
+                array of candidates, J_s1, J_s2 of all candidates come from one call of the saturation current engine
+                (mobility of the candidate dopings from one material state), their characteristics from one
+                'twodiodemodel_batch.SiCellBatch'. With processes > 1 the population is split into chunks of
+                chunk_size candidates, evaluated by worker processes. Parameters of log_scale are searched on log10 axes.
+    """
+
+    design_names = ('W', 'tau', 'S', 'N_a')
+    characteristics_names = ('U_oc', 'J_sc', 'U_MPP', 'J_MPP', 'S_MPP', 'FF', 'eta')
+    negative = ('J_sc', 'J_MPP', 'S_MPP', 'eta')         # negative under illumination (sign convention of SiCell)
+    log_scale = ('tau', 'S', 'N_a')
+    objective = 'eta'                   # 'eta' or 'S_MPP' (or any other name of characteristics_names), maximized in magnitude
+    popsize = 16                        # candidates per design parameter
+    maxiter = 200                       # generations
+    tol = 1.0e-8                        # relative spread of the population objective at convergence
+    seed = None
+    polish = True                       # final local optimization (L-BFGS-B)
+    processes = 1                       # worker processes, None: number of CPUs
+    chunk_size = 64                     # candidates per worker task
+    worker = None
+
+
+
+    def __init__(self, cell):
+        self.cell = cell
+        self.engine = sc.SaturationCurrents.from_cell(cell)
+        self.names = ()
+        self.executor = None
+        self.n_designs = 0
+        if self.engine.modes()[0] != 'absolute':
+            raise ValueError("design optimization needs physical saturation currents (set_fit_options(0, 1), m_x_eff_on and mu_x_on)")
+
+
+
+    def __getstate__(self):
+        """
+        Copies for worker processes are created without the process pool
+        """
+
+        state = dict(self.__dict__)
+        state['executor'] = None
+
+        return state
+
+
+
+    def designs(self, x):
+        """
+        Design parameters {name: array} of the candidates x (search coordinates, shape (len(names), n_candidates))
+        """
+
+        return {name: 10.0**x_i if name in self.log_scale else x_i for name, x_i in zip(self.names, x)}
+
+
+
+    def j_sx(self, designs):
+        """
+        Saturation current densities J_s1, J_s2 of all candidate designs {name: array}
+        """
+
+        values = dict(designs)
+        if 'N_a' in designs:
+            values['mu_As_b_T_sim'] = ms.MaterialState(self.cell.T_sim, self.cell.N_d, designs['N_a']).mu_As_b
+
+        return self.engine.j_sx(**self.engine.cell_values(self.cell, **values))
+
+
+
+    def characteristics(self, designs):
+        """
+        Solar cell characteristics U_oc, J_sc, U_MPP, J_MPP, S_MPP, FF, eta of all candidate designs {name: array}
+        (stacked along the first axis)
+        """
+
+        J_s1, J_s2 = self.j_sx(designs)
+        batch = tdb.SiCellBatch(self.cell.J_ph, J_s1, J_s2, self.cell.R_s, self.cell.R_p, self.cell.T_sim)
+        batch.accuracy = self.cell.accuracy
+        batch.U_min = self.cell.U_min
+        batch.U_max = self.cell.U_max
+
+        return batch.characteristics()
+
+
+
+    def objective_values(self, x):
+        """
+        Objective of the candidates x (search coordinates, generated power and efficiency positive), nan for designs without
+        maximum power point
+        """
+
+        values = self.characteristics(self.designs(x))[self.characteristics_names.index(self.objective)]
+
+        return - values if self.objective in self.negative else values
+
+
+
+    @staticmethod
+    def init_worker(optimizer):
+        """
+        Keep the optimizer once per worker process
+        """
+
+        DesignOptimizer.worker = optimizer
+
+
+
+    @staticmethod
+    def evaluate_chunk(x):
+        """
+        Objective of the candidates x (runs in the worker processes)
+        """
+
+        return DesignOptimizer.worker.objective_values(x)
+
+
+
+    def fitness(self, x):
+        """
+        Minimized function of the differential evolution: - objective of the candidates x
+        (shape (len(names), n_candidates) or (len(names),) for polishing), inf for failed designs
+        """
+
+        x = np.asarray(x, dtype=float)
+        if x.ndim == 1:
+            return self.fitness(x[:, None])[0]
+        self.n_designs += x.shape[1]
+        chunks = [x[:, i:i + self.chunk_size] for i in range(0, x.shape[1], self.chunk_size)]
+        if self.executor is None or len(chunks) <= 1:
+            values = np.concatenate([self.objective_values(chunk) for chunk in chunks])
+        else:
+            futures = [self.executor.submit(self.evaluate_chunk, chunk) for chunk in chunks]
+            values = np.concatenate([future.result() for future in futures])
+
+        return np.where(np.isfinite(values), - values, np.inf)
+
+
+
+    def optimize(self, bounds, objective=None):
+        """
+        Purpose:    Find the design with maximum objective within bounds
+
+        Input:      Bounds {name: (lower, upper)} of the design parameters (subset of design_names, SI units)
+                    objective name (default: class attribute objective)
+
+        Output:     Dictionary of the best design {name: value}, its characteristics {name: value}, 'objective' (name),
+                    'n_designs' (evaluated designs), 'nit' (generations), 'success' and 'message' of the differential evolution
+        """
+
+        import scipy.optimize as sp_o
+
+        unknown = [name for name in bounds if name not in self.design_names]
+        if unknown:
+            raise ValueError('unknown design parameters %s (use %s)' % (', '.join(unknown), ', '.join(self.design_names)))
+        if objective is not None:
+            self.objective = objective
+        self.names = tuple(bounds)
+        self.n_designs = 0
+        search_bounds = [tuple(np.log10(bounds[name])) if name in self.log_scale else tuple(bounds[name]) for name in self.names]
+
+        processes = self.processes or os.cpu_count()
+        try:
+            if processes > 1:
+                self.executor = ProcessPoolExecutor(max_workers=processes, initializer=self.init_worker, initargs=(self,))
+            result = sp_o.differential_evolution(self.fitness, search_bounds, popsize=self.popsize, maxiter=self.maxiter, tol=self.tol,
+                                                 seed=self.seed, polish=self.polish, vectorized=True, updating='deferred')
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+        design = {name: float(value[0]) for name, value in self.designs(np.asarray(result.x)[:, None]).items()}
+        characteristics = self.characteristics({name: np.array([value]) for name, value in design.items()})[:, 0]
+        output = dict(design)
+        output.update(characteristics=dict(zip(self.characteristics_names, characteristics.tolist())), objective=self.objective,
+                      n_designs=self.n_designs, nit=int(result.nit), success=bool(result.success), message=str(result.message))
+
+        return output
+
+
+
+    def apply(self, design):
+        """
+        Set the design {name: value} (e.g. the result of 'optimize') to the cell and recalculate its simulation values
+        """
+
+        for name in self.design_names:
+            if name in design:
+                setattr(self.cell, name, design[name])
+        self.cell.activate_effects()
+
+        return self.cell
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Calculate current density-voltage characteristic J(U) in A/m**2 of a full solar cell area with distributed
+            series resistance: a mesh of local two-diode elements linked by the emitter sheet resistance and the
+            resistances of the fingers and busbars of the front metallization (layout studies)
+
+Requires:   twodiodemodel_batch.py (local two-diode elements, which itself uses constants.py)
+            scipy (imported on first use)
+"""
+
+from . import twodiodemodel_batch as tdb
+import numpy as np
+#==============================================================================
+
+class DistributedCell:
+    """
+    Distributed cell class
+
+    Call method 'j_u_curve' with *args 'U_list' like 'twodiodemodel.SiCell.j_u_curve'. The cell area length_x * length_y is
+    tiled into n_x * n_y elements with the parameters J_ph, J_s1, J_s2, R_s, R_p, T_sim of a 'twodiodemodel.SiCell'
+    (after set_values / set_active_effects); its R_s is the local, not distributed part of the series resistance (base,
+    contact resistance, rear side). The parameters of the elements may be replaced by arrays of shape (n_y, n_x) in
+    attribute elements ('twodiodemodel_batch.SiCellBatch', e.g. shading or shunts).
+
+    Model:      one node per element at the front side potential U_i (rear side equipotential), Kirchhoff's current law
+                    sum_j g_ij (U_i - U_j) + A_i J(U_i) = 0
+                with the conductances g_ij of the emitter (sheet resistance R_sheet) and in parallel of n_fingers fingers along x
+                (rows of the mesh, line resistance r_finger) and n_busbars busbars along y (columns of the mesh, line resistance
+                r_busbar). The terminal at voltage U contacts every busbar at n_tabs points (all its nodes for r_busbar = 0).
+                Newton iteration of the potentials of all other nodes: the conductance matrix (5-point stencil of the mesh) is
+                assembled once, every iteration only adds the element derivatives A_i dJ/dU to its diagonal. The (symmetric
+                positive definite) Newton systems are solved by conjugate gradients preconditioned with the sparse LU
+                factorization (scipy.sparse.linalg.splu) of an earlier Jacobian, refactorized only when they do not converge
+                within max_cg iterations. Updates are limited to max_step, voltages are solved in order of U_list, each from
+                the solution of the previous one. The terminal current is the sum of the element currents (the conductance
+                matrix conserves current), which stays accurate also for small resistances of the metallization.
+    input of length_x, length_y in m, R_sheet in Ohm (per square), r_finger, r_busbar in Ohm/m
+    """
+
+    length_x = 0.156                    # m, cell edge along the fingers
+    length_y = 0.156                    # m, cell edge along the busbars
+    n_x = 100                           # elements along x
+    n_y = 100                           # elements along y
+    R_sheet = 100.0                     # Ohm, emitter sheet resistance
+    n_fingers = 50                      # fingers (rows of the mesh at equal pitch)
+    r_finger = 30.0                     # Ohm/m, line resistance of one finger
+    n_busbars = 3                       # busbars (columns of the mesh at equal pitch)
+    r_busbar = 0.5                      # Ohm/m, line resistance of one busbar
+    n_tabs = 6                          # contacts of the terminal along every busbar
+    tolerance = 1.0e-9                  # V, largest Newton update at convergence
+    max_iter = 50                       # Newton iterations per voltage
+    max_step = 0.1                      # V, largest Newton update of a node
+    cg_tolerance = 1.0e-8               # relative residual of the conjugate gradients
+    max_cg = 10                         # conjugate gradient iterations before refactorization
+
+
+
+    def __init__(self, cell):
+        self.elements = tdb.SiCellBatch.from_cell(cell)
+        self.layout()
+
+
+
+    def pitch_indices(self, count, size):
+        """
+        Mesh indices of count lines at equal pitch across size elements (lines centered in their segment)
+        """
+
+        return np.unique(np.floor((np.arange(count) + 0.5) * size / count).astype(int))
+
+
+
+    def layout(self):
+        """
+        Set up mesh, conductance matrix and terminal nodes from the class attributes (call again after changing them)
+        """
+
+        import scipy.sparse as sp
+
+        n_x, n_y = self.n_x, self.n_y
+        self.dx = self.length_x / n_x
+        self.dy = self.length_y / n_y
+        self.area = self.dx * self.dy
+        self.fingers = self.pitch_indices(self.n_fingers, n_y)
+        self.busbars = self.pitch_indices(self.n_busbars, n_x)
+
+        g_x = np.full((n_y, n_x - 1), self.dy / (self.dx * self.R_sheet))         # edges between neighbours along x
+        g_x[self.fingers] += 1.0 / (self.r_finger * self.dx)
+        g_y = np.full((n_y - 1, n_x), self.dx / (self.dy * self.R_sheet))         # edges between neighbours along y
+        terminal = np.zeros((n_y, n_x), dtype=bool)
+        if self.r_busbar == 0.0:
+            terminal[:, self.busbars] = True
+        else:
+            g_y[:, self.busbars] += 1.0 / (self.r_busbar * self.dy)
+            terminal[np.ix_(self.pitch_indices(self.n_tabs, n_y), self.busbars)] = True
+
+        node = np.arange(n_x * n_y).reshape(n_y, n_x)
+        first = np.concatenate((node[:, :-1].ravel(), node[:-1, :].ravel()))
+        second = np.concatenate((node[:, 1:].ravel(), node[1:, :].ravel()))
+        g = np.concatenate((g_x.ravel(), g_y.ravel()))
+        diagonal = np.bincount(first, g, n_x * n_y) + np.bincount(second, g, n_x * n_y)
+        G = sp.coo_matrix((np.concatenate((- g, - g, diagonal)),
+                           (np.concatenate((first, second, node.ravel())), np.concatenate((second, first, node.ravel())))),
+                          shape=(n_x * n_y, n_x * n_y)).tocsr()
+
+        self.terminal = terminal.ravel()
+        self.free = np.flatnonzero(~self.terminal)
+        self.G = G
+        self.G_free = G[self.free][:, self.free].tocsc()
+        self.G_free.sort_indices()
+        columns = np.repeat(np.arange(self.free.size), np.diff(self.G_free.indptr))
+        self.diagonal_index = np.flatnonzero(self.G_free.indices == columns)        # positions of the diagonal in the data
+        self.factor = None
+
+
+
+    def linear_solve(self, jacobian, rhs):
+        """
+        Solution of jacobian x = rhs by conjugate gradients preconditioned with the factorization of an earlier Jacobian
+        (refactorized if they do not converge within max_cg iterations)
+        """
+
+        from scipy.sparse.linalg import splu
+
+        if self.factor is not None:
+            x = self.factor.solve(rhs)
+            r = rhs - jacobian @ x
+            z = self.factor.solve(r)
+            d = z.copy()
+            rz = r @ z
+            norm = self.cg_tolerance * np.linalg.norm(rhs)
+            for unused_i in range(self.max_cg):
+                if np.linalg.norm(r) <= norm:
+                    return x
+                jd = jacobian @ d
+                alpha = rz / (d @ jd)
+                x += alpha * d
+                r -= alpha * jd
+                z = self.factor.solve(r)
+                rz, rz_prev = r @ z, rz
+                d = z + rz / rz_prev * d
+            if np.linalg.norm(r) <= norm:
+                return x
+        self.factor = splu(jacobian, permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.0, options=dict(SymmetricMode=True))
+
+        return self.factor.solve(rhs)
+
+
+
+    def element_currents(self, U):
+        """
+        Currents A_i J(U_i) in A of all elements at node potentials U (flat array) and their derivatives by U_i
+        """
+
+        elements = self.elements
+        shape = (self.n_y, self.n_x)
+        U_nodes = U.reshape(shape)
+        J = elements.j(U_nodes)
+        unused_J_U, dJ_U = elements.j_bounded(U_nodes - J * elements.R_s)
+        dJ = dJ_U / (1.0 + elements.R_s * dJ_U)
+
+        return self.area * np.broadcast_to(J, shape).ravel(), self.area * np.broadcast_to(dJ, shape).ravel()
+
+
+
+    def solve(self, U, U_nodes=None):
+        """
+        Purpose:    Solve the network at terminal voltage U
+
+        Input:      Voltage U in V, initial node potentials U_nodes (flat array, default: U everywhere)
+
+        Output:     Current density J in A/m**2 (terminal current per cell area) and node potentials (flat array)
+        """
+
+        U_nodes = np.full(self.n_x * self.n_y, float(U)) if U_nodes is None else np.array(U_nodes, dtype=float)
+        U_nodes[self.terminal] = U
+        free = self.free
+        jacobian = self.G_free.copy()
+        for unused_i in range(self.max_iter):
+            I, dI = self.element_currents(U_nodes)
+            residual = (self.G @ U_nodes + I)[free]
+            jacobian.data[:] = self.G_free.data
+            jacobian.data[self.diagonal_index] += dI[free]
+            update = - self.linear_solve(jacobian, residual)
+            update *= min(1.0, self.max_step / max(np.max(np.abs(update)), self.max_step))
+            U_nodes[free] += update
+            if np.max(np.abs(update)) < self.tolerance:
+                break
+        else:
+            raise ArithmeticError('distributed cell did not converge at U = %g V' % U)
+
+        I, unused_dI = self.element_currents(U_nodes)
+        I_terminal = np.sum(I)                          # Kirchhoff: the element currents leave through the terminal
+
+        return I_terminal / (self.length_x * self.length_y), U_nodes
+
+
+
+    def operating_points(self, U_list):
+        """
+        Purpose:    Solve the network at all voltages U_list
+
+        Output:     Current densities J in A/m**2 and node potentials in V (shape (len(U_list), n_y, n_x))
+        """
+
+        U_list = np.asarray(U_list, dtype=float)
+        J = np.empty(U_list.shape)
+        maps = np.empty((U_list.size, self.n_y, self.n_x))
+        U_nodes, U_prev = None, 0.0
+        for k, U in enumerate(U_list.ravel()):
+            if U_nodes is not None:
+                U_nodes = U_nodes + (U - U_prev)                # shifted previous solution
+            J.flat[k], U_nodes = self.solve(U, U_nodes)
+            maps[k] = U_nodes.reshape(self.n_y, self.n_x)
+            U_prev = U
+
+        return J, maps
+
+
+
+    def j_u_curve(self, U_list):
+        """
+        Current densities J in A/m**2 at all voltages of U_list
+        """
+
+        J, unused_maps = self.operating_points(U_list)
+
+        return J
@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Calculate current density-voltage characteristic J(U) in A/m**2 of a silicon solar cell with a 1-D drift-diffusion
+            model (Poisson equation, electron and hole continuity equations) across the wafer thickness W
+            Reference of the lumped two-diode-model 'twodiodemodel.SiCell' for process development
+
+Requires:   constants.py
+            carrier_concentrations.py (intrinsic carrier concentration 'Green' 1990, which uses bandgap.py)
+            doping_profile.py (mobilities 'Klaassen' 1992 and n_ie 'Kimmerle' 2011 along the doping profile)
+            photocurrent.py (absorption coefficient and spectrum of the generation)
+            scipy (imported on first use)
+"""
+
+from ..constants import q_e, k_B, eps_0, h_P_J, c_0
+from ..parameters import carrier_concentrations as cc
+from ..parameters import doping_profile as dp
+from ..parameters import photocurrent as pc
+import numpy as np
+#==============================================================================
+
+class DriftDiffusion:
+    """
+    Drift-diffusion class
+
+    1-D device from the front contact x = 0 (n-type emitter, ohmic) to the rear contact x = W (p-type base, ohmic for holes,
+    surface recombination velocity S for electrons), illuminated from the front. Call method 'j_u_curve' with *args 'U_list'
+    like 'twodiodemodel.SiCell.j_u_curve', create the device of a cell (Gaussian emitter, same W, N_a, tau, S, T_sim, J_ph,
+    R_s, R_p) with 'from_cell'. Its saturation currents follow from the device, not from J_s1, J_s2 of the cell.
+
+    Model:      unknowns electrostatic potential psi and quasi-Fermi potentials phi_n, phi_p (in units of U_T = k_B T) per node
+                    n = n_ie exp((psi - phi_n) / U_T),      p = n_ie exp((phi_p - psi) / U_T)
+                    Poisson:        d/dx (eps dpsi/dx) = - q (p - n + N_D - N_A)
+                    continuity:     dJ_n/dx = q (R - G),    dJ_p/dx = - q (R - G)
+                box method, Scharfetter-Gummel fluxes (band gap narrowing of n_ie as effective potentials of electrons and holes),
+                SRH recombination R = (n p - n_ie**2) / (tau (n + p + 2 n_ie)) (midgap traps), Beer-Lambert generation G
+                integrated over every box. Newton iteration of all unknowns at once: the unknowns of a node are interleaved,
+                so the Jacobian is banded (5 sub- and superdiagonals, scipy.linalg.solve_banded), continuation in voltage.
+    Mobilities and n_ie are evaluated for the doping (equilibrium carrier concentrations, no injection dependence).
+    input of x in m, N_D, N_A in m^-3 (arrays on the mesh), T_sim in K, tau in s, S in m/s
+    """
+
+    eps_r = 11.7                        # relative permittivity of silicon
+    n_i_model = 'Kimmerle'              # 'Kimmerle' (2011, band gap narrowing) or 'Green1990' (bandgap.py, constant n_i)
+    n_nodes = 10000                     # nodes of the mesh of 'from_cell'
+    grading = 5.0                       # refinement of the mesh of 'from_cell' towards the front (0: uniform)
+    N_D_surface = 1.0e26                # m^-3, surface concentration of the Gaussian emitter of 'from_cell'
+    x_j = 0.5e-6                        # m, junction depth of the emitter of 'from_cell'
+    wavelength = np.arange(300.0, 1200.5, 5.0)          # nm, grid of the generation
+    R_front = 0.0                       # front reflectance
+    R_s = 0.0                           # Ohm*m**2, external series resistance of 'j_u_curve'
+    R_p = np.inf                        # Ohm*m**2, external parallel resistance of 'j_u_curve'
+    dU = 0.02                           # V, largest voltage step of the continuation
+    tolerance = 1.0e-7                  # largest Newton update of the potentials in U_T at convergence
+    max_iter = 30                       # Newton iterations per step of the continuation
+    max_bisections = 12                 # halvings of a failed continuation step
+
+
+
+    def __init__(self, x, N_D, N_A, T_sim=300.0, tau=50.0e-6, S=6.0, spectrum=None, J_ph=None):
+        self.x = np.asarray(x, dtype=float)
+        self.N_D = np.broadcast_to(np.asarray(N_D, dtype=float), self.x.shape)
+        self.N_A = np.broadcast_to(np.asarray(N_A, dtype=float), self.x.shape)
+        self.T_sim = T_sim
+        self.tau = np.broadcast_to(np.asarray(tau, dtype=float), self.x.shape)
+        self.S = S
+        self.U_T = k_B * T_sim
+        self.h = np.diff(self.x)
+        self.box = np.concatenate(([self.h[0]], self.h[:-1] + self.h[1:], [self.h[-1]])) / 2.0
+        self.n_ie = self.intrinsic()
+        self.ln_n_ie = np.log(self.n_ie)
+        unused_n, unused_p, mu_e, mu_h, unused_D_e, unused_D_h, unused_L_e, unused_L_h = dp.DopingProfile().profile(T_sim, self.x, self.N_D, self.N_A, self.tau, self.tau)
+        self.D_n = self.U_T * (mu_e[1:] + mu_e[:-1]) / 2.0         # m**2/s on the edges
+        self.D_p = self.U_T * (mu_h[1:] + mu_h[:-1]) / 2.0
+        self.c_psi = eps_0 * self.eps_r * self.U_T / (q_e * self.h)
+        self.v_eq = self.equilibrium()
+        self.G = self.generation(spectrum, J_ph)
+
+
+
+    @classmethod
+    def mesh(cls, W):
+        """
+        Nodes x in m from 0 to W, refined towards the front: x = W sinh(grading t) / sinh(grading), t uniform in 0...1
+        """
+
+        t = np.linspace(0.0, 1.0, cls.n_nodes)
+        if cls.grading == 0.0:
+            return W * t
+
+        return W * np.sinh(cls.grading * t) / np.sinh(cls.grading)
+
+
+
+    @classmethod
+    def from_cell(cls, cell, spectrum=None):
+        """
+        Device of a 'twodiodemodel.SiCell': Gaussian emitter N_D_surface exp(-(x / sigma)**2) with junction depth x_j in the
+        base N_a, N_d of the cell, W, tau, S, T_sim, R_s, R_p of the cell, generation scaled to J_ph of the cell
+        """
+
+        x = cls.mesh(cell.W)
+        sigma = cls.x_j / np.sqrt(np.log(cls.N_D_surface / cell.N_a))
+        device = cls(x, cls.N_D_surface * np.exp(-(x / sigma)**2) + cell.N_d, cell.N_a, cell.T_sim, cell.tau, cell.S, spectrum, cell.J_ph)
+        device.R_s = cell.R_s
+        device.R_p = cell.R_p
+
+        return device
+
+
+
+    def intrinsic(self):
+        """
+        Effective intrinsic carrier concentration n_ie in m^-3 on the mesh
+        """
+
+        if self.n_i_model == 'Green1990':
+            return np.full(self.x.shape, cc.Green1990().n_i(self.T_sim))
+
+        return dp.DopingProfile().n_ie(self.T_sim, self.N_D, self.N_A)
+
+
+
+    def generation(self, spectrum=None, J_ph=None):
+        """
+        Purpose:    Calculate the generation rate integrated over the boxes of the mesh
+
+        Model:      Beer-Lambert, single pass: G_box = sum (1 - R_front) Phi (exp(-alpha x_lo) - exp(-alpha x_hi)) over the
+                    wavelengths with photon flux Phi = spectrum * wavelength / (h c) * trapezoid weight, absorption coefficient
+                    alpha of 'photocurrent.RajkananSinghShewchun', scaled to q_e * sum(G_box) = - J_ph if J_ph is given
+
+        Input:      Spectral irradiance in W/(m**2*nm) on the wavelength grid (default: 'photocurrent.Spectrum().blackbody')
+                    optional photocurrent density J_ph in A/m**2 (negative)
+
+        Output:     Generation rate G_box in m^-2 s^-1 per node
+        """
+
+        photocurrent = pc.Photocurrent(self.wavelength)
+        spectrum = pc.Spectrum().blackbody(self.wavelength) if spectrum is None else np.asarray(spectrum, dtype=float)
+        flux = (1.0 - self.R_front) * spectrum * photocurrent.trapezoid() * self.wavelength * 1.0e-9 / (h_P_J * c_0)
+        alpha = photocurrent.absorption.alpha(self.wavelength, self.T_sim)
+        x_box = np.concatenate(([0.0], (self.x[1:] + self.x[:-1]) / 2.0 - self.x[0], [self.x[-1] - self.x[0]]))
+        G = - np.diff(np.exp(- np.outer(x_box, alpha)), axis=0) @ flux
+        if J_ph is not None:
+            G = G * (- J_ph / (q_e * G.sum()))
+
+        return G
+
+
+
+    def equilibrium(self):
+        """
+        Potential psi / U_T of charge neutrality in thermal equilibrium on the mesh
+        """
+
+        N = self.N_D - self.N_A
+        root = np.sqrt((N / 2.0)**2 + self.n_ie**2)
+        majority = np.abs(N) / 2.0 + root               # without cancellation for both signs of N
+        n = np.where(N > 0.0, majority, self.n_ie**2 / majority)
+
+        return np.log(n / self.n_ie)
+
+
+
+    def bernoulli(self, x):
+        """
+        Bernoulli function B(x) = x / (exp(x) - 1) and its derivative dB/dx (series for small |x|, B(-x) = B(x) + x)
+        """
+
+        small = np.abs(x) < 1.0e-4
+        x_ = np.where(small, 1.0, x)
+        with np.errstate(over='ignore'):
+            B = np.where(small, 1.0 - x / 2.0 + x**2 / 12.0, x_ / np.expm1(x_))
+        dB = np.where(small, - 0.5 + x / 6.0, B * (1.0 - B - x_) / x_)
+
+        return B, dB
+
+
+
+    def carriers(self, state):
+        """
+        Electron n and hole concentration p in m^-3 of state (psi, phi_n, phi_p in U_T)
+        """
+
+        v, a, b = state
+
+        return self.n_ie * np.exp(v - a), self.n_ie * np.exp(b - v)
+
+
+
+    def fluxes(self, state, n, p):
+        """
+        Scharfetter-Gummel particle fluxes F_n = J_n / q, F_p = J_p / q in m^-2 s^-1 of all edges and their derivatives
+        by psi, phi_n (phi_p) of the left and right node, written without cancellation:
+            F_n = D_n / h * n_l B(-dpsi_n) expm1(phi_n_l - phi_n_r),    F_p = - D_p / h * p_l B(dpsi_p) expm1(phi_p_r - phi_p_l)
+        """
+
+        v, a, b = state
+        dln_n_ie = self.ln_n_ie[1:] - self.ln_n_ie[:-1]
+        dv = v[1:] - v[:-1]
+
+        B_n, dB_n = self.bernoulli(- (dv + dln_n_ie))
+        c_n = self.D_n / self.h
+        g_n = n[:-1] * B_n
+        E_n = np.expm1(a[:-1] - a[1:])
+        F_n = c_n * g_n * E_n
+        dF_n = (c_n * E_n * (g_n + n[:-1] * dB_n), - c_n * E_n * n[:-1] * dB_n, c_n * g_n, - c_n * g_n * (E_n + 1.0))
+
+        B_p, dB_p = self.bernoulli(dv - dln_n_ie)
+        c_p = self.D_p / self.h
+        g_p = p[:-1] * B_p
+        E_p = np.expm1(b[1:] - b[:-1])
+        F_p = - c_p * g_p * E_p
+        dF_p = (c_p * E_p * (g_p + p[:-1] * dB_p), - c_p * E_p * p[:-1] * dB_p, c_p * g_p, - c_p * g_p * (E_p + 1.0))
+
+        return F_n, dF_n, F_p, dF_p
+
+
+
+    def system(self, state, U, illumination=1.0):
+        """
+        Residuals of all equations and their Jacobian at voltage U (unknowns and equations interleaved per node,
+        banded layout of scipy.linalg.solve_banded with 5 sub- and superdiagonals)
+        """
+
+        v, a, b = state
+        N_nodes = v.size
+        n, p = self.carriers(state)
+        F_n, (Fn_vl, Fn_vr, Fn_al, Fn_ar), F_p, (Fp_vl, Fp_vr, Fp_bl, Fp_br) = self.fluxes(state, n, p)
+        G = illumination * self.G
+
+        den = self.tau * (n + p + 2.0 * self.n_ie)
+        n_p = self.n_ie**2 * np.exp(b - a)
+        R = self.n_ie**2 * np.expm1(b - a) / den
+        R_v = - R * self.tau * (n - p) / den
+        R_a = (- n_p + R * self.tau * n) / den
+        R_b = (n_p - R * self.tau * p) / den
+
+        residual = np.empty((N_nodes, 3))
+        jacobian = np.zeros((11, 3 * N_nodes))
+
+        def add(equation, unknown, offset, nodes, values):
+            # band row 5 + row - column is the same for all nodes of a slice, columns are strided by 3
+            columns = slice(3 * (nodes.start + offset) + unknown, 3 * (nodes.stop + offset) + unknown, 3)
+            jacobian[5 + equation - unknown - 3 * offset, columns] += values
+
+        i = slice(1, N_nodes - 1)
+        l = slice(0, N_nodes - 2)       # edges left and right of the interior nodes
+        r = slice(1, N_nodes - 1)
+        box = self.box[i]
+        flux_psi = self.c_psi * (v[1:] - v[:-1])
+
+        # Poisson equation
+        residual[i, 0] = flux_psi[r] - flux_psi[l] + box * (p[i] - n[i] + self.N_D[i] - self.N_A[i])
+        add(0, 0, 0, i, - self.c_psi[l] - self.c_psi[r] - box * (n[i] + p[i]))
+        add(0, 0, 1, i, self.c_psi[r])
+        add(0, 0, -1, i, self.c_psi[l])
+        add(0, 1, 0, i, box * n[i])
+        add(0, 2, 0, i, box * p[i])
+
+        # electron continuity equation
+        residual[i, 1] = F_n[r] - F_n[l] - box * R[i] + G[i]
+        add(1, 0, 0, i, Fn_vl[r] - Fn_vr[l] - box * R_v[i])
+        add(1, 1, 0, i, Fn_al[r] - Fn_ar[l] - box * R_a[i])
+        add(1, 2, 0, i, - box * R_b[i])
+        add(1, 0, 1, i, Fn_vr[r])
+        add(1, 1, 1, i, Fn_ar[r])
+        add(1, 0, -1, i, - Fn_vl[l])
+        add(1, 1, -1, i, - Fn_al[l])
+
+        # hole continuity equation
+        residual[i, 2] = F_p[r] - F_p[l] + box * R[i] - G[i]
+        add(2, 0, 0, i, Fp_vl[r] - Fp_vr[l] + box * R_v[i])
+        add(2, 1, 0, i, box * R_a[i])
+        add(2, 2, 0, i, Fp_bl[r] - Fp_br[l] + box * R_b[i])
+        add(2, 0, 1, i, Fp_vr[r])
+        add(2, 2, 1, i, Fp_br[r])
+        add(2, 0, -1, i, - Fp_vl[l])
+        add(2, 2, -1, i, - Fp_bl[l])
+
+        # front contact (ohmic, phi_n = phi_p = 0), rear contact (ohmic for holes, phi_p = U, electrons: surface recombination)
+        front = slice(0, 1)
+        rear = slice(N_nodes - 1, N_nodes)
+        residual[0] = v[0] - self.v_eq[0], a[0], b[0]
+        residual[-1, 0] = v[-1] - self.v_eq[-1] - U / self.U_T
+        residual[-1, 2] = b[-1] - U / self.U_T
+        for unknown in range(3):
+            add(unknown, unknown, 0, front, 1.0)
+        add(0, 0, 0, rear, 1.0)
+        add(2, 2, 0, rear, 1.0)
+        n_0 = self.n_ie[-1] * np.exp(v[-1] - b[-1])
+        box = self.box[-1]
+        residual[-1, 1] = - self.S * (n[-1] - n_0) - F_n[-1] - box * R[-1] + G[-1]
+        add(1, 0, 0, rear, - self.S * (n[-1] - n_0) - Fn_vr[-1] - box * R_v[-1])
+        add(1, 1, 0, rear, self.S * n[-1] - Fn_ar[-1] - box * R_a[-1])
+        add(1, 2, 0, rear, - self.S * n_0 - box * R_b[-1])
+        add(1, 0, -1, rear, - Fn_vl[-1])
+        add(1, 1, -1, rear, - Fn_al[-1])
+
+        return residual.ravel(), jacobian
+
+
+
+    def newton(self, state, U, illumination=1.0):
+        """
+        Newton iteration at voltage U from state, returns the new state and True at convergence
+        (equations scaled by their diagonal, updates beyond 1 U_T damped logarithmically)
+        """
+
+        from scipy.linalg import solve_banded
+
+        state = state.copy()
+        size = state.size
+        for unused_i in range(self.max_iter):
+            residual, jacobian = self.system(state, U, illumination)
+            scale = 1.0 / jacobian[5]
+            padded = np.pad(scale, 5)               # band k of column j belongs to row j + k - 5
+            for k in range(11):
+                jacobian[k] *= padded[k:k + size]
+            try:
+                update = solve_banded((5, 5), jacobian, - residual * scale, overwrite_ab=True, check_finite=False)
+            except (ValueError, np.linalg.LinAlgError):
+                return state, False
+            if not np.all(np.isfinite(update)):
+                return state, False
+            large = np.abs(update) > 1.0
+            update[large] = np.sign(update[large]) * (1.0 + np.log(np.abs(update[large])))
+            state += update.reshape(-1, 3).T
+            if np.max(np.abs(update)) < self.tolerance:
+                return state, True
+
+        return state, False
+
+
+
+    def continuation(self, state, U_from, U_to, illumination_from=1.0, illumination_to=1.0, previous=None):
+        """
+        Solve the device at voltage U_to and illumination_to from state at U_from, illumination_from
+        (steps of at most dU, failed steps halved up to max_bisections times). Voltage steps start from the secant
+        predictor through previous (state, U) and the last converged state.
+        """
+
+        n_steps = max(int(np.ceil(abs(U_to - U_from) / self.dU)), 1)
+        steps = [(U_from + (U_to - U_from) * k / n_steps, illumination_from + (illumination_to - illumination_from) * k / n_steps)
+                 for k in range(n_steps + 1)]
+        if illumination_from != illumination_to:
+            previous = None
+        depth = 0
+        k = 1
+        while k < len(steps):
+            guess = state
+            if previous is not None and previous[1] != steps[k - 1][0]:
+                guess = state + (state - previous[0]) * (steps[k][0] - steps[k - 1][0]) / (steps[k - 1][0] - previous[1])
+            new_state, converged = self.newton(guess, *steps[k])
+            if converged:
+                if illumination_from == illumination_to:
+                    previous = (state, steps[k - 1][0])
+                state = new_state
+                k += 1
+            elif depth < self.max_bisections:
+                midpoint = tuple((x_0 + x_1) / 2.0 for x_0, x_1 in zip(steps[k - 1], steps[k]))
+                steps.insert(k, midpoint)
+                depth += 1
+            else:
+                raise ArithmeticError('drift-diffusion solution did not converge at U = %g V' % steps[k][0])
+
+        return state
+
+
+
+    def current(self, state):
+        """
+        Current density J in A/m**2 of state (sign convention of 'twodiodemodel.SiCell': positive in the dark at forward bias)
+        """
+
+        n, p = self.carriers(state)
+        F_n, unused_dF_n, F_p, unused_dF_p = self.fluxes(state, n, p)
+
+        return - q_e * (F_n[-1] + F_p[-1])
+
+
+
+    def operating_points(self, U_list, illumination=1.0):
+        """
+        Purpose:    Solve the device at all voltages U_list (no external resistances)
+
+        Model:      Newton iteration of the dark equilibrium, illumination switched on at U = 0, continuation to the voltages
+                    (ascending from 0 V and descending from 0 V)
+
+        Output:     Current densities J in A/m**2 and states (psi, phi_n, phi_p in U_T, shape (3, n_nodes)) at U_list
+        """
+
+        U_list = np.asarray(U_list, dtype=float)
+        state, converged = self.newton(np.array([self.v_eq, np.zeros_like(self.v_eq), np.zeros_like(self.v_eq)]), 0.0, 0.0)
+        if not converged:
+            raise ArithmeticError('drift-diffusion solution did not converge in thermal equilibrium')
+        state = self.continuation(state, 0.0, 0.0, 0.0, illumination)
+
+        J = np.empty(U_list.shape)
+        states = [None] * U_list.size
+        for branch in (np.flatnonzero(U_list >= 0.0), np.flatnonzero(U_list < 0.0)):
+            branch = branch[np.argsort(np.abs(U_list[branch]))]
+            branch_state, U_prev, previous = state, 0.0, None
+            for k in branch:
+                new_state = self.continuation(branch_state, U_prev, U_list[k], illumination, illumination, previous)
+                if U_list[k] != U_prev:
+                    previous = (branch_state, U_prev)
+                branch_state, U_prev = new_state, U_list[k]
+                J[k] = self.current(branch_state)
+                states[k] = branch_state
+
+        return J, states
+
+
+
+    def j_u_curve(self, U_list, illumination=1.0):
+        """
+        Purpose:    Calculate current density J at the terminal voltages U_list, comparable to 'twodiodemodel.SiCell.j_u_curve'
+
+        Model:      J = J_d(U_d) + U_d / R_p,   U = U_d + J * R_s, diode voltage U_d of every U by secant iteration,
+                    every iteration continues the device solution of the previous one
+
+        Input:      Voltages U_list in V, illumination (factor of the generation)
+
+        Output:     Current densities J in A/m**2
+        """
+
+        U_list = np.asarray(U_list, dtype=float)
+        if self.R_s == 0.0:
+            J_d, unused_states = self.operating_points(U_list, illumination)
+            return J_d + U_list / self.R_p
+
+        J = np.empty(U_list.shape)
+        J_0, (state_0,) = self.operating_points([0.0], illumination)
+        for branch in (np.flatnonzero(U_list >= 0.0), np.flatnonzero(U_list < 0.0)):
+            branch = branch[np.argsort(np.abs(U_list[branch]))]
+            state, U_d, J_U_d = state_0, 0.0, J_0[0]
+            for k in branch:
+                f = U_d + self.R_s * J_U_d - U_list[k]
+                slope = 1.0
+                for unused_i in range(self.max_iter):
+                    if abs(f) < self.tolerance * self.U_T:
+                        break
+                    U_d_new = U_d - f / slope
+                    state = self.continuation(state, U_d, U_d_new, illumination, illumination)
+                    J_U_d = self.current(state) + U_d_new / self.R_p
+                    f_new = U_d_new + self.R_s * J_U_d - U_list[k]
+                    slope = max((f_new - f) / (U_d_new - U_d), 1.0) if U_d_new != U_d else 1.0            # df/dU_d >= 1
+                    U_d, f = U_d_new, f_new
+                if abs(f) >= self.tolerance * self.U_T:
+                    raise ArithmeticError('series resistance iteration of the drift-diffusion solution did not converge at U = %g V' % U_list[k])
+                J[k] = J_U_d
+
+        return J
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Read measured current density-voltage characteristics J(U) (e.g. Keithley source meter exports)
+            from paired U/J files or multi-column files with vectorized parsing
+            Store whole measurement campaigns (many curves plus metadata) in a compact columnar binary format
+            which is memory-mapped on loading
+
+Requires:   -
+"""
+
+import glob
+import json
+import os
+import re
+import numpy as np
+#==============================================================================
+
+class Campaign:
+    """
+    Measurement campaign class
+
+    Columnar storage of n_curves J(U) curves: all voltages U in V and current densities J in A/m**2 are concatenated,
+    curve i spans U[offsets[i]:offsets[i + 1]]. Per curve metadata columns are the temperature T in K,
+    the irradiance G in W/m**2 (nan if unknown) and the cell ID cell_id.
+
+    On disk a campaign is a directory with one raw little-endian file per column and 'schema.json'.
+    'Campaign.load' memory-maps the columns, so campaigns larger than the main memory can be opened instantly.
+    """
+
+    columns = {'U': '<f8', 'J': '<f8', 'offsets': '<i8', 'T': '<f8', 'G': '<f8', 'cell_id': 'S32'}
+
+
+
+    def __init__(self, U, J, offsets, T, G, cell_id):
+        self.U = U
+        self.J = J
+        self.offsets = offsets
+        self.T = T
+        self.G = G
+        self.cell_id = cell_id
+
+
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+
+    def curve(self, i):
+        """
+        Return voltages U in V and current densities J in A/m**2 of curve i (views, no copy)
+        """
+
+        c = slice(self.offsets[i], self.offsets[i + 1])
+
+        return self.U[c], self.J[c]
+
+
+
+    def metadata(self, i):
+        """
+        Return metadata dictionary (T, G, cell_id) of curve i
+        """
+
+        return {'T': float(self.T[i]), 'G': float(self.G[i]), 'cell_id': self.cell_id[i].decode()}
+
+
+
+    def padded(self, index=None):
+        """
+        Return curves index (default: all) as 2-D arrays U, J of shape (n_curves, max. number of points), padded with nan
+        """
+
+        index = np.arange(len(self)) if index is None else np.asarray(index)
+        start = np.asarray(self.offsets[index])
+        n_points = np.asarray(self.offsets[index + 1]) - start
+        k = np.arange(n_points.max() if n_points.size else 0)
+        valid = k < n_points[:, None]
+        flat = np.where(valid, start[:, None] + k, 0)
+        U = np.where(valid, np.asarray(self.U)[flat], np.nan)
+        J = np.where(valid, np.asarray(self.J)[flat], np.nan)
+
+        return U, J
+
+
+
+    def save(self, path):
+        """
+        Write campaign to directory path
+        """
+
+        writer = CampaignWriter(path)
+        for i in range(len(self)):
+            writer.add(*self.curve(i), **self.metadata(i))
+        writer.close()
+
+
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Read (memory-map) campaign from directory path
+        """
+
+        with open(os.path.join(path, 'schema.json')) as fobj:
+            schema = json.load(fobj)
+        data = {}
+        for name, dtype in schema['columns'].items():
+            fname = os.path.join(path, name + '.bin')
+            if mmap and os.path.getsize(fname) > 0:
+                data[name] = np.memmap(fname, dtype=dtype, mode='r')
+            else:
+                data[name] = np.fromfile(fname, dtype=dtype)
+
+        return cls(data['U'], data['J'], data['offsets'], data['T'], data['G'], data['cell_id'])
+
+
+
+class CampaignWriter:
+    """
+    Campaign writer class
+
+    Streams curves to a campaign directory (see class Campaign) without keeping the campaign in memory.
+    Call method 'add' for every curve and 'close' at the end.
+    """
+
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.files = {name: open(os.path.join(path, name + '.bin'), 'wb') for name in Campaign.columns}
+        self.n_points = 0
+        self.n_curves = 0
+        np.asarray([0], dtype=Campaign.columns['offsets']).tofile(self.files['offsets'])
+
+
+
+    def add(self, U, J, T=np.nan, G=np.nan, cell_id=''):
+        """
+        Append one curve with voltages U in V, current densities J in A/m**2 and its metadata
+        """
+
+        U = np.asarray(U, dtype=Campaign.columns['U'])
+        J = np.asarray(J, dtype=Campaign.columns['J'])
+        if U.shape != J.shape:
+            raise ValueError('U and J of one curve must have the same length')
+        U.tofile(self.files['U'])
+        J.tofile(self.files['J'])
+        self.n_points += U.size
+        self.n_curves += 1
+        np.asarray([self.n_points], dtype=Campaign.columns['offsets']).tofile(self.files['offsets'])
+        np.asarray([T], dtype=Campaign.columns['T']).tofile(self.files['T'])
+        np.asarray([G], dtype=Campaign.columns['G']).tofile(self.files['G'])
+        np.asarray([str(cell_id).encode()], dtype=Campaign.columns['cell_id']).tofile(self.files['cell_id'])
+
+
+
+    def close(self):
+        """
+        Close the column files and write the schema
+        """
+
+        for fobj in self.files.values():
+            fobj.close()
+        with open(os.path.join(self.path, 'schema.json'), 'w') as fobj:
+            json.dump({'n_curves': self.n_curves, 'n_points': self.n_points, 'columns': Campaign.columns}, fobj)
+
+
+
+    def __enter__(self):
+        return self
+
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+
+class MeasurementIO:
+    """
+    Measurement reader class
+
+    Call method 'read_pair' with *args 'U_path, J_path' to read one curve stored in a voltage and a current density file
+    Call method 'read_columns' with *args 'path' to read one or more curves from a multi-column file
+    Call method 'read_directory' with *args 'path, campaign_path' to convert a whole directory of paired files into a campaign
+
+    Header lines starting with '#' may contain metadata as 'key = value' (e.g. '# T = 278.15', '# G = 1000', '# cell_id = A17').
+    Paired files named like the example measurements '5-00_U.txt' / '5-00_J.txt' carry the temperature in degree Celsius.
+    """
+
+    file_name_T = re.compile(r'(-?\d+)-(\d+)_[UJ]\.\w+$')
+    comment = b'#'
+
+
+
+    def parse(self, data):
+        """
+        Parse the numbers of a text file (bytes) into a float array (vectorized) and the header metadata
+        Lines are split at whitespace, ',' and ';', rows are returned as the first axis of a 2-D array
+        """
+
+        metadata = {}
+        while data.lstrip().startswith(self.comment):
+            line, unused_sep, data = data.lstrip().partition(b'\n')
+            key, sep, value = line[1:].decode().partition('=')
+            if sep:
+                metadata[key.strip()] = value.strip()
+        body = data
+        for sep in (b',', b';'):
+            if sep in body:
+                body = body.replace(sep, b' ')
+        n_columns = max(len(body.lstrip().split(b'\n', 1)[0].split()), 1)
+        values = np.fromstring(body, dtype=np.float64, sep=' ')
+
+        return values.reshape(-1, n_columns), metadata
+
+
+
+    def read(self, path):
+        """
+        Read a text file into a float array and its header metadata
+        """
+
+        with open(path, 'rb') as fobj:
+            return self.parse(fobj.read())
+
+
+
+    def metadata_from(self, path, header):
+        """
+        Combine metadata from header lines and from the file name, returns T in K, G in W/m**2 and cell_id
+        """
+
+        T = float(header['T']) if 'T' in header else np.nan
+        match = self.file_name_T.search(os.path.basename(path))
+        if 'T' not in header and match:
+            T = float(match.group(1) + '.' + match.group(2)) + 273.15
+        G = float(header['G']) if 'G' in header else np.nan
+        cell_id = header.get('cell_id', os.path.basename(path).rsplit('_', 1)[0])
+
+        return {'T': T, 'G': G, 'cell_id': cell_id}
+
+
+
+    def read_pair(self, U_path, J_path):
+        """
+        Read one curve from a voltage file U_path and a current density file J_path
+
+        Output:     Voltages U in V, current densities J in A/m**2, metadata dictionary (T, G, cell_id)
+        """
+
+        U, U_header = self.read(U_path)
+        J, J_header = self.read(J_path)
+        U = U.ravel()
+        J = J.ravel()
+        if U.shape != J.shape:
+            raise ValueError("'%s' and '%s' contain a different number of values" % (U_path, J_path))
+        header = dict(J_header, **U_header)
+
+        return U, J, self.metadata_from(U_path, header)
+
+
+
+    def read_columns(self, path, U_col=0, J_col=1, curve_col=None):
+        """
+        Read curves from a multi-column file
+        column curve_col (optional) numbers the curves, a new curve starts whenever its value changes
+
+        Output:     List of (U, J) tuples in V and A/m**2, metadata dictionary (T, G, cell_id)
+        """
+
+        data, header = self.read(path)
+        if curve_col is None:
+            curves = [(data[:, U_col], data[:, J_col])]
+        else:
+            starts = np.flatnonzero(np.diff(data[:, curve_col])) + 1
+            curves = [(d[:, U_col], d[:, J_col]) for d in np.split(data, starts)]
+
+        return curves, self.metadata_from(path, header)
+
+
+
+    def read_directory(self, path, campaign_path, pattern='*_U.txt'):
+        """
+        Convert all paired U/J files of directory path (U files matching pattern, J files with '_U' replaced by '_J')
+        into a campaign at campaign_path, curve by curve
+
+        Output:     Number of curves written
+        """
+
+        with CampaignWriter(campaign_path) as writer:
+            for U_path in sorted(glob.glob(os.path.join(path, pattern))):
+                head, tail = os.path.split(U_path)
+                J_path = os.path.join(head, tail.replace('_U', '_J'))
+                U, J, metadata = self.read_pair(U_path, J_path)
+                writer.add(U, J, **metadata)
+
+        return writer.n_curves
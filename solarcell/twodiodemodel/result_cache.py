@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Persistent content-addressed cache (SQLite) of computed results like solar cell characteristics and J(U) curves
+            shared by notebooks, command line runs and CI jobs, with size-based eviction of the least recently used results
+
+Requires:   -
+"""
+
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+#==============================================================================
+
+class ResultCache:
+    """
+    Result cache class
+
+    Opt-in for a 'twodiodemodel.SiCell': cell.cache = ResultCache(path), then 'characteristics', 'j_u_curve' and 'p_u_curve'
+    return cached results. Keys are SHA-256 hashes of the kind of result, all scalar values of the cell (parameters,
+    initial / fit and simulation values, active effects, fit options, solver accuracy and voltage bounds), the input arrays
+    and the library version, so any change of these computes a new result.
+    Results are stored as .npy blobs; when the cache exceeds max_bytes, the least recently used results are deleted
+    until it is below eviction_ratio * max_bytes. A cache can be shared by several processes (SQLite WAL mode).
+    """
+
+    path = os.path.join(os.path.expanduser('~'), '.cache', 'solarcell', 'results.sqlite')
+    max_bytes = 2**30                   # B
+    eviction_ratio = 0.8
+    timeout = 60.0                      # s, waiting for a lock of another process
+
+
+
+    def __init__(self, path=None, max_bytes=None):
+        if path is not None:
+            self.path = path
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        self.connection = None
+        self.total = None               # estimated size in B (exact after every eviction check)
+        self.hits = 0
+        self.misses = 0
+
+
+
+    def __getstate__(self):
+        """
+        Copies and pickles (e.g. for worker processes) open their own connection
+        """
+
+        state = dict(self.__dict__)
+        state['connection'] = None
+
+        return state
+
+
+
+    def connect(self):
+        """
+        Open the database (created on first use)
+        """
+
+        if self.connection is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, kind TEXT, value BLOB, size INTEGER, accessed REAL)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+
+        return self.connection
+
+
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+
+#==============================================================================
+# keys
+    def state(self, cell):
+        """
+        All scalar values (bool, int, float, str) of cell and its class as sorted list of (name, repr(value))
+        """
+
+        values = {}
+        for source in (vars(type(cell)), vars(cell)):
+            for name, value in source.items():
+                if not name.startswith('_') and name != 'cache' and isinstance(value, (bool, int, float, str, np.number)):
+                    values[name] = repr(value.item() if isinstance(value, np.number) else value)
+
+        return sorted(values.items())
+
+
+
+    def key(self, kind, *parts):
+        """
+        SHA-256 hash of kind, the library version and parts (arrays, scalars, strings or JSON serializable objects)
+        """
+
+        from .. import __version__
+
+        digest = hashlib.sha256(('%s\0%s' % (kind, __version__)).encode())
+        for part in parts:
+            if isinstance(part, np.ndarray):
+                part = np.ascontiguousarray(part)
+                digest.update(('\0%s%s' % (part.dtype.str, part.shape)).encode())
+                digest.update(part.tobytes())
+            else:
+                digest.update(('\0' + json.dumps(part, sort_keys=True, default=repr)).encode())
+
+        return kind + ':' + digest.hexdigest()
+
+
+
+    def cell_key(self, cell, kind, *arrays):
+        """
+        Key of result kind of a 'twodiodemodel.SiCell' for the input arrays
+        """
+
+        return self.key(kind, self.state(cell), *(np.asarray(a, dtype=float) for a in arrays))
+
+
+
+#==============================================================================
+# storage
+    def get(self, key):
+        """
+        Return the cached array of key or None
+        """
+
+        connection = self.connect()
+        row = connection.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        connection.execute('UPDATE results SET accessed = ? WHERE key = ?', (time.time(), key))
+
+        return np.load(io.BytesIO(row[0]), allow_pickle=False)
+
+
+
+    def put(self, key, value):
+        """
+        Store array value under key and evict old results if the cache is too large
+        """
+
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(value), allow_pickle=False)
+        blob = buffer.getvalue()
+        connection = self.connect()
+        connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)', (key, key.split(':', 1)[0], blob, len(blob), time.time()))
+        self.total = (self.size() if self.total is None else self.total + len(blob))
+        if self.total > self.max_bytes:
+            self.evict()
+
+
+
+    def cached(self, key, compute):
+        """
+        Return the cached array of key, call compute() and store its result on a miss
+        """
+
+        value = self.get(key)
+        if value is None:
+            value = np.asarray(compute())
+            self.put(key, value)
+
+        return value
+
+
+
+    def size(self):
+        """
+        Total size of the stored results in B
+        """
+
+        return self.connect().execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+
+
+
+    def evict(self):
+        """
+        Delete the least recently used results until the cache is below eviction_ratio * max_bytes (only if above max_bytes)
+        """
+
+        size = self.size()
+        keys = []
+        if size > self.max_bytes:
+            target = self.eviction_ratio * self.max_bytes
+            connection = self.connect()
+            for key, row_size in connection.execute('SELECT key, size FROM results ORDER BY accessed').fetchall():
+                if size <= target:
+                    break
+                keys.append((key,))
+                size -= row_size
+            connection.executemany('DELETE FROM results WHERE key = ?', keys)
+        self.total = size
+
+        return len(keys)
+
+
+
+    def clear(self):
+        """
+        Delete all results
+        """
+
+        self.connect().execute('DELETE FROM results')
+        self.total = 0
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Calculate saturation current densities J_s1, J_s2 in A/m**2 of the two-diode-model for every supported
+            combination of active effects and fit options, vectorized over arrays of temperature, tau, S, W and N_a
+            (e.g. lifetime and thickness design studies)
+
+Requires:   constants.py
+"""
+
+from ..constants import q_e, m_e, h_P, k_B
+import math as m
+import numpy as np
+#==============================================================================
+
+class SaturationCurrents:
+    """
+    Saturation current density class
+
+    One effect combination (flags of 'twodiodemodel.SiCell') per instance, all inputs of 'j_sx' broadcast against each other.
+    Precedence of the combinations (the sequential branches of the original 'SiCell.j_sx', made explicit in 'modes'):
+
+        J_s1 mode       condition (first matching row)                  J_s1
+        'absolute'      fit_tau_on and not fit_J_sx_on                  q_e N_c N_v / N_a exp(-E_g / U_Te) F(U_Te mu_As_b)
+        'arrhenius'     fit_J_sx_on and not fit_tau_on                  J_s1_T_ini * A_1(T_sim) / A_1(T_ini)
+        'arrhenius'     J_sx_on and not D_x_on                          J_s1_T_ini * A_1(T_sim) / A_1(T_ini)
+        'diffusion'     J_sx_on and not mu_x_on                         J_s1_T_ini * A_1(T_sim) F(D_e_T_sim) / (A_1(T_ini) F(D_e_T_ini))
+        'mobility'      J_sx_on                                         as 'diffusion' with D = U_Te mu_As_b
+        'constant'      otherwise                                       J_s1_T_ini
+
+        J_s2 mode       condition
+        'arrhenius'     J_sx_on or (fit_J_sx_on and not fit_tau_on)     J_s2_T_ini * A_2(T_sim) / A_2(T_ini)
+        'constant'      otherwise                                       J_s2_T_ini
+
+    with A_1(T) = T**3 exp(-E_g / U_Te), A_2(T) = T**2.5 exp(-E_g / (2 U_Te)), U_Te = k_B T,
+    the effective densities of states N_c N_v = 32 pi**3 (m_e k_B T / h**2)**3 (m_c m_v)**1.5 and the diffusion factor
+        F(D) = sqrt(D / tau) (1 + sqrt(D) tanh(W / L) / (sqrt(tau) S)) / (sqrt(D) / (sqrt(tau) S + tanh(W / L))),  L = sqrt(D tau)
+    """
+
+    input_names = {}                    # names of the used inputs of 'j_sx' per modes
+
+
+
+
+    def __init__(self, J_sx_on=0, D_x_on=0, mu_x_on=0, fit_J_sx_on=0, fit_tau_on=0):
+        self.J_sx_on = bool(J_sx_on)
+        self.D_x_on = bool(D_x_on)
+        self.mu_x_on = bool(mu_x_on)
+        self.fit_J_sx_on = bool(fit_J_sx_on)
+        self.fit_tau_on = bool(fit_tau_on)
+
+
+
+    @classmethod
+    def from_cell(cls, cell):
+        """
+        Engine of the effect combination of a 'twodiodemodel.SiCell'
+        """
+
+        return cls(cell.J_sx_on, cell.D_x_on, cell.mu_x_on, cell.fit_J_sx_on, cell.fit_tau_on)
+
+
+
+    def modes(self):
+        """
+        Modes of J_s1 and J_s2 of the effect combination (see class docstring)
+        """
+
+        if self.fit_tau_on and not self.fit_J_sx_on:
+            mode_1 = 'absolute'
+        elif self.fit_J_sx_on and not self.fit_tau_on:
+            mode_1 = 'arrhenius'
+        elif self.J_sx_on and not self.D_x_on:
+            mode_1 = 'arrhenius'
+        elif self.J_sx_on and not self.mu_x_on:
+            mode_1 = 'diffusion'
+        elif self.J_sx_on:
+            mode_1 = 'mobility'
+        else:
+            mode_1 = 'constant'
+        if self.J_sx_on or (self.fit_J_sx_on and not self.fit_tau_on):
+            mode_2 = 'arrhenius'
+        else:
+            mode_2 = 'constant'
+
+        return mode_1, mode_2
+
+
+
+    def inputs(self):
+        """
+        Names of the inputs of 'j_sx' used by the effect combination (memoized per modes)
+        """
+
+        modes = self.modes()
+        if modes not in self.input_names:
+            mode_1, mode_2 = modes
+            names = ['J_s1_T_ini', 'J_s2_T_ini']
+            if 'arrhenius' in modes or mode_1 in ('diffusion', 'mobility'):
+                names += ['T_ini', 'T_sim', 'E_g_T_ini', 'E_g_T_sim']
+            if mode_1 == 'absolute':
+                names += ['T_sim', 'E_g_T_sim', 'N_a', 'm_c_eff_T_sim', 'm_v_eff_T_sim', 'mu_As_b_T_sim']
+            if mode_1 in ('diffusion', 'mobility', 'absolute'):
+                names += ['W', 'tau', 'S']
+            if mode_1 == 'diffusion':
+                names += ['D_e_T_ini', 'D_e_T_sim']
+            if mode_1 == 'mobility':
+                names += ['mu_As_b_T_ini', 'mu_As_b_T_sim']
+            self.input_names[modes] = tuple(dict.fromkeys(names))
+
+        return self.input_names[modes]
+
+
+
+    def functions(self, *values):
+        """
+        Module of the elementary functions for values: math if all given values are scalars (fast path of 'SiCell.j_sx'), numpy otherwise
+        """
+
+        for value in values:
+            if value is not None and not isinstance(value, (int, float)):
+                return np
+
+        return m
+
+
+
+    def arrhenius(self, T, E_g, xp=np):
+        """
+        Temperature factors A_1 = T**3 exp(-E_g / U_Te) of J_s1 and A_2 = T**2.5 exp(-E_g / (2 U_Te)) of J_s2
+        """
+
+        exp_2 = xp.exp(-E_g / (2.0 * k_B * T))
+
+        return T**3 * exp_2**2, xp.sqrt(T**5) * exp_2
+
+
+
+    def diffusion_factor(self, D, W, tau, S, xp=np):
+        """
+        Diffusion factor F(D) of J_s1 in m/s (simplified: the sqrt(D) terms of numerator and denominator cancel)
+        """
+
+        sqrt_tau = xp.sqrt(tau)
+        sqrt_D = xp.sqrt(D)
+        a = sqrt_tau * S
+        t = xp.tanh(W / (sqrt_D * sqrt_tau))
+
+        return (1.0 + sqrt_D * t / a) * (a + t) / sqrt_tau
+
+
+
+    def j_sx(self, J_s1_T_ini, J_s2_T_ini, T_ini=None, T_sim=None, E_g_T_ini=None, E_g_T_sim=None, W=None, tau=None, S=None, N_a=None,
+             D_e_T_ini=None, D_e_T_sim=None, mu_As_b_T_ini=None, mu_As_b_T_sim=None, m_c_eff_T_sim=None, m_v_eff_T_sim=None):
+        """
+        Purpose:    Calculate saturation current densities J_s1, J_s2 of the effect combination
+
+        Model:      see class docstring (only the inputs of 'inputs' are needed)
+
+        Input:      Initial / fit values J_s1_T_ini, J_s2_T_ini in A/m**2 at T_ini in K, simulation temperature T_sim in K
+                    bandgaps E_g_T_ini, E_g_T_sim in eV, thickness W in m, lifetime tau in s, surface recombination velocity S in m/s,
+                    acceptor concentration N_a in m^-3, electron diffusion coefficients D_e in m**2/s, bulk mobilities mu_As_b in m**2/(V*s),
+                    effective masses m_c_eff, m_v_eff in 1 (all scalars or numpy arrays, broadcast against each other)
+
+        Output:     Saturation current densities J_s1, J_s2 in A/m**2 (scalars or arrays of the broadcast shape of the used inputs)
+        """
+
+        mode_1, mode_2 = self.modes()
+        xp = self.functions(T_ini, T_sim, E_g_T_ini, E_g_T_sim, W, tau, S, N_a, D_e_T_ini, D_e_T_sim,
+                            mu_As_b_T_ini, mu_As_b_T_sim, m_c_eff_T_sim, m_v_eff_T_sim)
+        if 'arrhenius' in (mode_1, mode_2) or mode_1 in ('diffusion', 'mobility'):
+            A_1_T_ini, A_2_T_ini = self.arrhenius(T_ini, E_g_T_ini, xp)
+            A_1_T_sim, A_2_T_sim = self.arrhenius(T_sim, E_g_T_sim, xp)
+
+        if mode_1 == 'absolute':
+            A_1_T_sim, unused_A_2 = self.arrhenius(T_sim, E_g_T_sim, xp)
+            c_s1 = (32.0 * m.pi**3.0 * q_e * k_B**3 * (m_e / q_e)**3) / (N_a * h_P**6.0)          # q_e * N_c * N_v / (N_a * T**3 * (m_c m_v)**1.5)
+            J_s1 = c_s1 * A_1_T_sim * (m_c_eff_T_sim * m_v_eff_T_sim)**1.5 * self.diffusion_factor(k_B * T_sim * mu_As_b_T_sim, W, tau, S, xp)
+        elif mode_1 == 'arrhenius':
+            J_s1 = J_s1_T_ini * (A_1_T_sim / A_1_T_ini)
+        elif mode_1 in ('diffusion', 'mobility'):
+            if mode_1 == 'diffusion':
+                D_T_ini, D_T_sim = D_e_T_ini, D_e_T_sim
+            else:
+                D_T_ini, D_T_sim = k_B * T_ini * mu_As_b_T_ini, k_B * T_sim * mu_As_b_T_sim
+            J_s1 = J_s1_T_ini * (A_1_T_sim * self.diffusion_factor(D_T_sim, W, tau, S, xp)) / (A_1_T_ini * self.diffusion_factor(D_T_ini, W, tau, S, xp))
+        else:
+            J_s1 = J_s1_T_ini
+
+        if mode_2 == 'arrhenius':
+            J_s2 = J_s2_T_ini * (A_2_T_sim / A_2_T_ini)
+        else:
+            J_s2 = J_s2_T_ini
+
+        if xp is np and np.shape(J_s1) != np.shape(J_s2):
+            J_s1, J_s2 = (np.array(J) for J in np.broadcast_arrays(J_s1, J_s2))
+
+        return J_s1, J_s2
+
+
+
+    def cell_values(self, cell, **values):
+        """
+        Inputs of 'j_sx' of a 'twodiodemodel.SiCell' (current values), replaced by values (e.g. tau=array, W=array)
+        Temperature arrays need the temperature dependent inputs as well, e.g. from 'material_state.MaterialState(T_sim, N_d, N_a)'
+        """
+
+        inputs = {name: getattr(cell, name) for name in self.inputs()}
+        inputs.update(values)
+
+        return inputs
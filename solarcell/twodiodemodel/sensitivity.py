@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Global sensitivity analysis (Sobol indices) of the solar cell characteristics (e.g. eta, FF) of a silicon
+            solar cell with respect to J_ph, J_s1, J_s2, R_s, R_p, T_sim, W, tau, S and N_a within a process window
+            Quasi-random sample matrices are evaluated in large vectorized chunks, optionally spread across worker processes
+
+Requires:   saturation_currents.py, twodiodemodel_batch.py (which themselves use constants.py)
+            material_state.py (temperature and doping dependent parameters of the samples)
+            scipy (imported on first use)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+from ..parameters import material_state as ms
+from . import saturation_currents as sc
+from . import twodiodemodel_batch as tdb
+import numpy as np
+#==============================================================================
+
+class SobolSensitivity:
+    """
+    Sobol sensitivity class
+
+    Call method 'analyze' with *args 'bounds' (dictionary {name: (lower, upper)} of the varied inputs, uniformly distributed,
+    inputs of log_scale log-uniformly) for a 'twodiodemodel.SiCell' after set_values / set_active_effects. The other
+    inputs keep the values of the cell. J_s1, J_s2 are the initial values J_s1_T_ini, J_s2_T_ini of 'SiCell.set_values';
+    like in 'SiCell' they are scaled to T_sim by the effect combination of the cell ('saturation_currents.SaturationCurrents'),
+    so W, tau, S and N_a only act with the corresponding effects (e.g. set_fit_options(0, 1)) and J_s1 not at all then.
+
+    Model:      Saltelli sampling: two independent matrices A, B of n_samples rows (scrambled Sobol sequence of dimension 2 k,
+                n_samples rounded up to a power of 2) and k matrices AB_i (A with column i from B), n_samples (k + 2) evaluations
+                    first order index   S_i  = mean(f(B) (f(AB_i) - f(A))) / V                (Saltelli 2010)
+                    total index         ST_i = mean((f(A) - f(AB_i))**2) / (2 V)              (Jansen 1999)
+                with V the variance of f(A), f(B) (outputs centered). Confidence intervals: percentiles of n_bootstrap resamples of the rows.
+                Rows with a failed evaluation (no maximum power point) in any matrix are left out.
+    """
+
+    input_names = ('J_ph', 'J_s1', 'J_s2', 'R_s', 'R_p', 'T_sim', 'W', 'tau', 'S', 'N_a')
+    characteristics_names = ('U_oc', 'J_sc', 'U_MPP', 'J_MPP', 'S_MPP', 'FF', 'eta')
+    log_scale = ('J_s1', 'J_s2', 'R_p', 'tau', 'S', 'N_a')
+    outputs = ('eta', 'FF')             # analyzed characteristics
+    n_bootstrap = 200                   # resamples of the confidence intervals
+    confidence = 0.95                   # level of the confidence intervals
+    seed = None
+    processes = 1                       # worker processes, None: number of CPUs
+    chunk_size = 65536                  # evaluations per chunk (and worker task)
+    worker = None
+
+
+
+    def __init__(self, cell):
+        self.cell = cell
+        self.engine = sc.SaturationCurrents.from_cell(cell)
+        self.names = ()
+        self.lower = np.zeros(0)
+        self.upper = np.zeros(0)
+
+
+
+    def samples(self, n_samples):
+        """
+        Sample matrices A, B of shape (n_samples rounded up to a power of 2, len(names)) in the unit hypercube
+        """
+
+        import scipy.stats.qmc as qmc
+
+        k = len(self.names)
+        sobol = qmc.Sobol(2 * k, scramble=True, seed=self.seed)
+        u = sobol.random_base2(max(int(np.ceil(np.log2(n_samples))), 1))
+
+        return u[:, :k], u[:, k:]
+
+
+
+    def values(self, u):
+        """
+        Inputs {name: array} of the samples u (unit hypercube, shape (n, len(names)))
+        """
+
+        x = self.lower + u * (self.upper - self.lower)
+
+        return {name: 10.0**x[:, i] if name in self.log_scale else x[:, i] for i, name in enumerate(self.names)}
+
+
+
+    def material_values(self, values):
+        """
+        Temperature and doping dependent inputs of the saturation current engine for sampled T_sim and / or N_a
+        (same models and effect flags as 'SiCell.activate_effects')
+        """
+
+        cell = self.cell
+        material = {}
+        if 'T_sim' not in values and 'N_a' not in values:
+            return material
+        T_sim = values.get('T_sim', cell.T_sim)
+        state = ms.MaterialState(T_sim, cell.N_d, values.get('N_a', cell.N_a))
+        if 'T_sim' in values:
+            if cell.E_g_on:
+                material['E_g_T_sim'] = state.E_g
+            if cell.m_x_eff_on:
+                material['m_c_eff_T_sim'], material['m_v_eff_T_sim'] = state.m_x
+            if cell.D_x_on and not cell.mu_x_on:
+                material['D_e_T_sim'] = cell.D_e_T_sim * T_sim / cell.T_sim
+        if cell.mu_x_on:
+            material['mu_As_b_T_sim'] = state.mu_As_b
+
+        return material
+
+
+
+    def characteristics(self, values):
+        """
+        Solar cell characteristics U_oc, J_sc, U_MPP, J_MPP, S_MPP, FF, eta of all samples {name: array}
+        (stacked along the first axis)
+        """
+
+        cell = self.cell
+        engine_values = {name: value for name, value in values.items() if name in ('T_sim', 'W', 'tau', 'S', 'N_a')}
+        if 'J_s1' in values:
+            engine_values['J_s1_T_ini'] = values['J_s1']
+        if 'J_s2' in values:
+            engine_values['J_s2_T_ini'] = values['J_s2']
+        engine_values.update(self.material_values(values))
+        J_s1, J_s2 = self.engine.j_sx(**self.engine.cell_values(cell, **engine_values))
+        batch = tdb.SiCellBatch(values.get('J_ph', cell.J_ph), J_s1, J_s2, values.get('R_s', cell.R_s), values.get('R_p', cell.R_p),
+                                values.get('T_sim', cell.T_sim))
+        batch.accuracy = cell.accuracy
+        batch.U_min = cell.U_min
+        batch.U_max = cell.U_max
+
+        return batch.characteristics()
+
+
+
+    def output_values(self, u):
+        """
+        Analyzed outputs of the samples u (shape (n, len(names))), shape (len(outputs), n)
+        """
+
+        characteristics = self.characteristics(self.values(u))[[self.characteristics_names.index(name) for name in self.outputs]]
+
+        return np.broadcast_to(characteristics, (len(self.outputs), u.shape[0]))      # inputs without effect give scalars
+
+
+
+    @staticmethod
+    def init_worker(sensitivity):
+        """
+        Keep the sensitivity analysis once per worker process
+        """
+
+        SobolSensitivity.worker = sensitivity
+
+
+
+    @staticmethod
+    def evaluate_chunk(u):
+        """
+        Analyzed outputs of the samples u (runs in the worker processes)
+        """
+
+        return SobolSensitivity.worker.output_values(u)
+
+
+
+    def evaluate(self, A, B):
+        """
+        Outputs f(A), f(B) of shape (len(outputs), n) and f(AB_i) of shape (len(names), len(outputs), n)
+        (one matrix AB_i at a time, every matrix in chunks of chunk_size rows)
+        """
+
+        def matrix(i):
+            if i == 0:
+                return A
+            if i == 1:
+                return B
+            AB_i = A.copy()
+            AB_i[:, i - 2] = B[:, i - 2]
+            return AB_i
+
+        n_matrices = len(self.names) + 2
+        f = np.empty((n_matrices, len(self.outputs), A.shape[0]))
+        processes = self.processes or os.cpu_count()
+        if processes == 1:
+            for i in range(n_matrices):
+                u = matrix(i)
+                for start in range(0, A.shape[0], self.chunk_size):
+                    f[i, :, start:start + self.chunk_size] = self.output_values(u[start:start + self.chunk_size])
+        else:
+            with ProcessPoolExecutor(max_workers=processes, initializer=self.init_worker, initargs=(self,)) as executor:
+                futures = {}
+                for i in range(n_matrices):
+                    u = matrix(i)
+                    for start in range(0, A.shape[0], self.chunk_size):
+                        futures[(i, start)] = executor.submit(self.evaluate_chunk, u[start:start + self.chunk_size])
+                for (i, start), future in futures.items():
+                    f[i, :, start:start + self.chunk_size] = future.result()
+
+        return f[0], f[1], f[2:]
+
+
+
+    def terms(self, f_A, f_B, f_AB):
+        """
+        Row terms of the estimators (outputs centered by their mean) f(A) + f(B), f(A)**2 + f(B)**2, f(B) (f(AB_i) - f(A))
+        and (f(A) - f(AB_i))**2 of shape (n, 2 len(outputs) (1 + len(names))), the indices only need their (weighted) means
+        """
+
+        center = np.mean(np.concatenate((f_A, f_B), axis=-1), axis=-1, keepdims=True)
+        f_A, f_B, f_AB = f_A - center, f_B - center, f_AB - center
+        n = f_A.shape[-1]
+
+        return np.concatenate((f_A + f_B, f_A**2 + f_B**2, (f_B * (f_AB - f_A)).reshape(-1, n), ((f_A - f_AB)**2).reshape(-1, n))).T
+
+
+
+    def indices(self, means):
+        """
+        First order indices S_i and total indices ST_i of shape (len(names), len(outputs)) from the means of the row terms
+        """
+
+        k = len(self.names)
+        n_out = len(self.outputs)
+        V = means[n_out:2 * n_out] / 2.0 - (means[:n_out] / 2.0)**2
+        S = means[2 * n_out:(2 + k) * n_out].reshape(k, n_out) / V
+        ST = 0.5 * means[(2 + k) * n_out:].reshape(k, n_out) / V
+
+        return S, ST
+
+
+
+    def analyze(self, bounds, n_samples=65536, outputs=None):
+        """
+        Purpose:    Calculate Sobol indices of the outputs with respect to the inputs varied within bounds
+
+        Input:      Bounds {name: (lower, upper)} of the varied inputs (subset of input_names, SI units)
+                    Number of rows n_samples of the sample matrices (rounded up to a power of 2), n_samples (len(bounds) + 2)
+                    evaluations, outputs (names of characteristics_names, default: class attribute outputs)
+
+        Output:     Dictionary {output: {'S1': {name: value}, 'S1_conf': {name: (lower, upper)}, 'ST': ..., 'ST_conf': ...}},
+                    'n_evaluations' and 'n_valid' (rows used)
+        """
+
+        unknown = [name for name in bounds if name not in self.input_names]
+        if unknown:
+            raise ValueError('unknown inputs %s (use %s)' % (', '.join(unknown), ', '.join(self.input_names)))
+        if outputs is not None:
+            self.outputs = tuple(outputs)
+        self.names = tuple(bounds)
+        self.lower, self.upper = np.array([np.log10(bounds[name]) if name in self.log_scale else bounds[name] for name in self.names], dtype=float).T
+
+        A, B = self.samples(n_samples)
+        f_A, f_B, f_AB = self.evaluate(A, B)
+        valid = np.isfinite(f_A).all(axis=0) & np.isfinite(f_B).all(axis=0) & np.isfinite(f_AB).all(axis=(0, 1))
+        f_A, f_B, f_AB = f_A[:, valid], f_B[:, valid], f_AB[:, :, valid]
+
+        terms = self.terms(f_A, f_B, f_AB)
+        n = terms.shape[0]
+        S, ST = self.indices(terms.mean(axis=0))
+        rng = np.random.default_rng(self.seed)          # bootstrap: resampled rows as counts, one weighted mean per resample
+        resampled = np.array([self.indices(np.bincount(rng.integers(0, n, n), minlength=n) @ terms / n) for unused_b in range(self.n_bootstrap)])
+        conf = np.percentile(resampled, [50.0 * (1.0 - self.confidence), 50.0 * (1.0 + self.confidence)], axis=0)
+
+        output = {}
+        for j, name in enumerate(self.outputs):
+            output[name] = {'S1': dict(zip(self.names, S[:, j].tolist())),
+                            'S1_conf': dict(zip(self.names, zip(conf[0, 0, :, j].tolist(), conf[1, 0, :, j].tolist()))),
+                            'ST': dict(zip(self.names, ST[:, j].tolist())),
+                            'ST_conf': dict(zip(self.names, zip(conf[0, 1, :, j].tolist(), conf[1, 1, :, j].tolist())))}
+        output.update(n_evaluations=A.shape[0] * (len(self.names) + 2), n_valid=int(valid.sum()))
+
+        return output
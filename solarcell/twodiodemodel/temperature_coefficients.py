@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Calculate temperature coefficients dU_oc/dT, dJ_sc/dT, dU_MPP/dT, dJ_MPP/dT, dS_MPP/dT, dFF/dT, deta/dT
+            of a whole batch of silicon solar cells at their simulation temperatures T_sim at once
+
+Requires:   constants.py
+            bandgap.py (analytic dE_g/dT)
+            material_state.py (mobilities and effective masses at T_sim +- dT for central differences)
+            saturation_currents.py (modes of the effect combinations)
+            twodiodemodel_batch.py (which itself uses constants.py)
+"""
+
+from ..constants import k_B
+from ..parameters import bandgap as bg
+from ..parameters import material_state as ms
+from . import saturation_currents as sc
+from . import twodiodemodel_batch as tdb
+import numpy as np
+#==============================================================================
+
+class TemperatureCoefficients:
+    """
+    Temperature coefficient class
+
+    Call method 'coefficients' with *args 'cells' (list of 'twodiodemodel.SiCell' after set_values / set_active_effects)
+    to get the derivatives of all outputs of 'characteristics' with respect to T_sim, no cell is re-evaluated at other
+    temperatures. J_ph, R_s and R_p do not depend on temperature in the two-diode-model; J_s1, J_s2 and the thermal voltage do:
+        dJ_sx/dT        analytic derivative of the active mode of 'saturation_currents.SaturationCurrents', with analytic dE_g/dT
+                        (Paessler 2002) and central differences (step dT) of the mobility and effective masses models
+        characteristics implicit differentiation of J = j(U_d), U = U_d + J * R_s at open circuit, short circuit and
+                        at the maximum power point (dP/dU_d = 0) for all cells at once ('twodiodemodel_batch.SiCellBatch')
+    Operating points are assumed within U_min...U_max of the cells (no linear continuation of the diode currents).
+    """
+
+    names = ('U_oc', 'J_sc', 'U_MPP', 'J_MPP', 'S_MPP', 'FF', 'eta')
+    dT = 0.01                           # K, step of the central differences
+
+
+
+    def values(self, cells, name, default=np.nan):
+        """
+        Array of attribute name of all cells (default for cells without it)
+        """
+
+        return np.array([getattr(cell, name, default) for cell in cells], dtype=float)
+
+
+
+    def material_derivatives(self, cells):
+        """
+        Central differences dmu_As_b/dT in m**2/(V*s*K), dm_c/dT, dm_v/dT in 1/K at T_sim of all cells (one vectorized evaluation)
+        """
+
+        T_sim = self.values(cells, 'T_sim')[:, None] + np.array([-self.dT, self.dT])
+        state = ms.MaterialState(T_sim, self.values(cells, 'N_d')[:, None], self.values(cells, 'N_a')[:, None])
+        m_c, m_v = state.m_x
+
+        return [np.diff(x, axis=1)[:, 0] / (2.0 * self.dT) for x in (state.mu_As_b, m_c, m_v)]
+
+
+
+    def dlnf(self, D, tau, W, S):
+        """
+        Derivative d ln(F)/dD of the diffusion factor F of J_s1 ('SiCell.j_sx') with respect to the diffusion coefficient D in s/m**2
+        """
+
+        a = np.sqrt(tau) * S
+        x = W / np.sqrt(D * tau)
+        t = np.tanh(x)
+        dt = - (1.0 - t**2) * x / (2.0 * D)
+
+        return (t / (2.0 * np.sqrt(D)) + np.sqrt(D) * dt) / (a + np.sqrt(D) * t) + dt / (a + t)
+
+
+
+    def j_sx_derivatives(self, cells):
+        """
+        Purpose:    Calculate temperature derivatives of the saturation current densities J_s1, J_s2 of all cells
+
+        Model:      d ln(J_sx)/dT of the modes of 'saturation_currents.SaturationCurrents' (same precedence as 'SiCell.j_sx')
+                    d ln(T**3 exp(-E_g / U_Te))/dT = 3 / T - dE_g/dT / U_Te + E_g * k_B / U_Te**2 (and analog for J_s2)
+                    d ln(F(D))/dT = d ln(F)/dD * dD/dT with D = U_Te * mu_300 (D_x) or D = U_Te * mu_As_b(T) (mu_x)
+
+        Output:     Derivatives dJ_s1/dT, dJ_s2/dT in A/(m**2*K)
+        """
+
+        flag = lambda name: self.values(cells, name).astype(bool)
+        T_sim = self.values(cells, 'T_sim')
+        U_Te = self.values(cells, 'U_Te_T_sim')
+        E_g = self.values(cells, 'E_g_T_sim')
+        W, tau, S = (self.values(cells, name) for name in ('W', 'tau', 'S'))
+        dE_g = np.where(flag('E_g_on'), bg.Eg().deg_paessler2002(T_sim), 0.0)
+        if any(cell.mu_x_on or cell.m_x_eff_on for cell in cells):
+            dmu, dm_c, dm_v = self.material_derivatives(cells)
+            dmu = np.where(flag('mu_x_on'), dmu, 0.0)
+            dlnm = np.where(flag('m_x_eff_on'), 1.5 * (dm_c / self.values(cells, 'm_c_eff_T_sim') + dm_v / self.values(cells, 'm_v_eff_T_sim')), 0.0)
+        else:
+            dmu = dlnm = np.zeros_like(T_sim)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dln_1 = 3.0 / T_sim - dE_g / U_Te + E_g * k_B / U_Te**2
+            dln_2 = 2.5 / T_sim - dE_g / (2.0 * U_Te) + E_g * k_B / (2.0 * U_Te**2)
+            D_e = self.values(cells, 'D_e_T_sim')
+            dln_D_x = self.dlnf(D_e, tau, W, S) * D_e / T_sim
+            mu = self.values(cells, 'mu_As_b_T_sim')
+            dln_mu_x = self.dlnf(U_Te * mu, tau, W, S) * (k_B * mu + U_Te * dmu)
+
+            modes = np.array([sc.SaturationCurrents.from_cell(cell).modes() for cell in cells]).reshape(-1, 2)
+            dlnJ_s1 = np.select([modes[:, 0] == 'arrhenius', modes[:, 0] == 'diffusion', modes[:, 0] == 'mobility', modes[:, 0] == 'absolute'],
+                                [dln_1, dln_1 + dln_D_x, dln_1 + dln_mu_x, dln_1 + dlnm + dln_mu_x], 0.0)
+            dlnJ_s2 = np.where(modes[:, 1] == 'arrhenius', dln_2, 0.0)
+
+        return self.values(cells, 'J_s1') * dlnJ_s1, self.values(cells, 'J_s2') * dlnJ_s2
+
+
+
+    def diode_derivatives(self, batch, U_d, dJ_s1, dJ_s2):
+        """
+        Current density J of the diodes and the parallel resistance at diode voltage U_d and its partial derivatives
+        J_U = dJ/dU_d, J_UU = d**2J/dU_d**2, J_T = dJ/dT, J_UT = d**2J/(dU_d dT)
+        """
+
+        U_Te = batch.U_Te_T_sim
+        exp_1 = np.exp(U_d / U_Te)
+        exp_2 = np.exp(U_d / (2.0 * U_Te))
+        J = batch.J_ph + batch.J_s1 * (exp_1 - 1.0) + batch.J_s2 * (exp_2 - 1.0) + U_d / batch.R_p
+        J_U = batch.J_s1 * exp_1 / U_Te + batch.J_s2 * exp_2 / (2.0 * U_Te) + 1.0 / batch.R_p
+        J_UU = batch.J_s1 * exp_1 / U_Te**2 + batch.J_s2 * exp_2 / (4.0 * U_Te**2)
+        J_T = dJ_s1 * (exp_1 - 1.0) + dJ_s2 * (exp_2 - 1.0) - k_B * U_d * (batch.J_s1 * exp_1 + batch.J_s2 * exp_2 / 2.0) / U_Te**2
+        J_UT = (dJ_s1 * exp_1 / U_Te + dJ_s2 * exp_2 / (2.0 * U_Te)
+                - k_B * (batch.J_s1 * exp_1 * (U_d / U_Te + 1.0) + batch.J_s2 * exp_2 * (U_d / (2.0 * U_Te) + 1.0) / 2.0) / U_Te**2)
+
+        return J, J_U, J_UU, J_T, J_UT
+
+
+
+    def batch(self, cells):
+        """
+        Vectorized cell ('twodiodemodel_batch.SiCellBatch') of the current simulation values of all cells
+        """
+
+        batch = tdb.SiCellBatch(*(self.values(cells, name) for name in ('J_ph', 'J_s1', 'J_s2', 'R_s', 'R_p', 'T_sim')))
+        batch.accuracy = min(cell.accuracy for cell in cells)
+
+        return batch
+
+
+
+    def coefficients(self, cells, relative=False):
+        """
+        Purpose:    Calculate temperature coefficients of all outputs of 'characteristics' for a batch of cells
+
+        Model:      open circuit:   j(U_oc) = 0                                 dU_oc/dT = - J_T / J_U
+                    short circuit:  J_sc = j(- J_sc * R_s)                      dJ_sc/dT = J_T / (1 + R_s * J_U)
+                    MPP:            G = (1 + R_s J_U) J + (U_d + R_s J) J_U = 0 dU_d/dT = - G_T / G_U
+                                    U_MPP = U_d + R_s J_MPP, J_MPP = j(U_d), S_MPP = U_MPP * J_MPP
+                    FF = S_MPP / (U_oc * J_sc) * 100, eta = S_MPP / 1000
+
+        Input:      List of 'twodiodemodel.SiCell' (active effects set)
+                    relative: return the relative temperature coefficients (1 / X) dX/dT in %/K instead (datasheet values)
+
+        Output:     Array of shape (7, len(cells)): dU_oc/dT in V/K, dJ_sc/dT in A/(m**2*K), dU_MPP/dT in V/K,
+                    dJ_MPP/dT in A/(m**2*K), dS_MPP/dT in W/(m**2*K), dFF/dT in %/K, deta/dT in 1/K
+                    (rows in the order of names)
+        """
+
+        batch = self.batch(cells)
+        characteristics = batch.characteristics()
+        U_oc, J_sc, U_MPP, J_MPP, S_MPP, FF, unused_eta = characteristics
+        dJ_s1, dJ_s2 = self.j_sx_derivatives(cells)
+
+        unused_J, J_U, unused_J_UU, J_T, unused_J_UT = self.diode_derivatives(batch, U_oc, dJ_s1, dJ_s2)
+        dU_oc = - J_T / J_U
+
+        unused_J, J_U, unused_J_UU, J_T, unused_J_UT = self.diode_derivatives(batch, - J_sc * batch.R_s, dJ_s1, dJ_s2)
+        dJ_sc = J_T / (1.0 + batch.R_s * J_U)
+
+        U_d = U_MPP - J_MPP * batch.R_s
+        J, J_U, J_UU, J_T, J_UT = self.diode_derivatives(batch, U_d, dJ_s1, dJ_s2)
+        G_U = 2.0 * J_U * (1.0 + batch.R_s * J_U) + J_UU * (2.0 * batch.R_s * J + U_d)
+        G_T = J_T * (1.0 + 2.0 * batch.R_s * J_U) + J_UT * (2.0 * batch.R_s * J + U_d)
+        dU_d = - G_T / G_U
+        dJ_MPP = J_U * dU_d + J_T
+        dU_MPP = dU_d + batch.R_s * dJ_MPP
+        dS_MPP = dU_MPP * J_MPP + U_MPP * dJ_MPP
+        dFF = FF * (dS_MPP / S_MPP - dU_oc / U_oc - dJ_sc / J_sc)
+        deta = dS_MPP / 1000.0
+
+        coefficients = np.array(np.broadcast_arrays(dU_oc, dJ_sc, dU_MPP, dJ_MPP, dS_MPP, dFF, deta))
+        if relative:
+            return coefficients / characteristics * 100.0
+
+        return coefficients
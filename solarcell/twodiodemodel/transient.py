@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Calculate the transient current density J(t) in A/m**2 of whole batches of silicon solar cells for arbitrary
+            voltage and irradiance waveforms with two-diode-model extended by junction and diffusion capacitance
+            Correct sweep-speed artefacts of fast (flash) J(U) measurements
+
+Requires:   constants.py
+            twodiodemodel_batch.py (diode currents and their derivatives, which itself uses constants.py)
+"""
+
+from ..constants import q_e, eps_0
+from . import twodiodemodel_batch as tdb
+import numpy as np
+#==============================================================================
+
+class TransientCell:
+    """
+    Transient silicon solar cell class
+
+    Call method 'simulate' with *args 't', 'U' (terminal voltage waveform) and optionally 'irradiance' (waveform of the
+    factor of J_ph), create the cells from a 'twodiodemodel.SiCell' with 'from_cell' or from a 'twodiodemodel_batch.SiCellBatch'
+    (all parameters, incl. C_j0 and tau_d, may be arrays that broadcast against each other like in 'SiCellBatch').
+
+    Model:      two-diode-model with the capacitance C = dQ/dU_d of the diode voltage U_d = U - J * R_s in parallel to the diodes
+                    J = (U - U_d) / R_s = J_d(U_d) + dQ(U_d)/dt,     J_d(U_d) = 'SiCellBatch.j_bounded' (J_ph scaled by the irradiance)
+                    junction charge     Q_j = C_j0 V_bi / (1 - m_j) (1 - (1 - U_d / V_bi)**(1 - m_j)),
+                                        C_j continued linearly beyond f_c V_bi
+                    diffusion charge    Q_d = tau_d J_s1 (exp(U_d / U_Te) - 1) (stored minority carriers of the base, diode 1)
+                TR-BDF2 integration of the charge (Bank et al. 1985, L-stable, 2nd order), one adaptive time step for the whole
+                batch, every stage solved by a Newton iteration of all cells at once (diagonal Jacobian dQ/dU_d + a h (1 / R_s +
+                dJ_d/dU_d) from 'SiCellBatch.j_bounded'). Steady state at t[0] unless U_d0 is given.
+    input of t in s, U in V, C_j0 in F/m**2, tau_d in s
+    """
+
+    V_bi = 0.8                          # V, built-in voltage of the junction
+    m_j = 0.5                           # grading coefficient of the junction (abrupt)
+    f_c = 0.5                           # forward bias (in V_bi) beyond which C_j is continued linearly
+    eps_r = 11.7                        # relative permittivity of silicon
+    rtol = 1.0e-6                       # relative local error of U_d per step
+    atol = 1.0e-9                       # V, absolute local error of U_d per step
+    first_step = 1.0e-3                 # first time step (in the first output interval)
+    max_steps = 1000000                 # time steps per simulation
+    max_iter = 30                       # Newton iterations per stage
+    tolerance = 1.0e-12                 # V, largest Newton update at convergence
+
+
+
+    def __init__(self, elements, C_j0, tau_d):
+        self.elements = elements
+        self.C_j0 = np.asarray(C_j0, dtype=float)
+        self.tau_d = np.asarray(tau_d, dtype=float)
+
+
+
+    @classmethod
+    def from_cell(cls, cell):
+        """
+        Create a batch of one cell from the current (simulation) values of a 'twodiodemodel.SiCell'
+        (C_j0 of a one-sided abrupt junction on the base doping N_a, tau_d = tau)
+        """
+
+        C_j0 = np.sqrt(q_e * eps_0 * cls.eps_r * cell.N_a / (2.0 * cls.V_bi))
+
+        return cls(tdb.SiCellBatch.from_cell(cell), C_j0, cell.tau)
+
+
+
+    def charge(self, U_d):
+        """
+        Charge Q in C/m**2 of junction and diffusion capacitance at diode voltage U_d and capacitance C = dQ/dU_d in F/m**2
+        """
+
+        elements = self.elements
+        V_c = self.f_c * self.V_bi
+        U_j = np.minimum(U_d, V_c)
+        Q_j = self.C_j0 * self.V_bi / (1.0 - self.m_j) * (1.0 - (1.0 - U_j / self.V_bi)**(1.0 - self.m_j))
+        C_j = self.C_j0 * (1.0 - U_j / self.V_bi)**(- self.m_j)
+        dC_j = C_j * self.m_j / (self.V_bi - V_c)                  # slope of the linear continuation
+        U_l = np.maximum(U_d - V_c, 0.0)
+        Q_j = Q_j + C_j * U_l + dC_j * U_l**2 / 2.0
+        C_j = C_j + dC_j * U_l
+
+        U_c = np.clip(U_d, elements.U_min, elements.U_max)          # same continuation as the diode current
+        exp_1 = np.exp(U_c / elements.U_Te_T_sim)
+        C_d = self.tau_d * elements.J_s1 / elements.U_Te_T_sim * exp_1
+        Q_d = self.tau_d * elements.J_s1 * (exp_1 - 1.0) + C_d * (U_d - U_c)
+
+        return Q_j + Q_d, C_j + C_d
+
+
+
+    def capacitance(self, U_d):
+        """
+        Capacitance C in F/m**2 at diode voltage U_d
+        """
+
+        unused_Q, C = self.charge(np.asarray(U_d, dtype=float))
+
+        return C
+
+
+
+    def waveform(self, values, t):
+        """
+        Function of time of a waveform: callable values(t), constant or values at the times t (last axis, linear interpolation)
+        """
+
+        if callable(values):
+            return values
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 0 or values.shape[-1] != t.size:
+            return lambda time: values
+
+        def value(time):
+            k = min(max(np.searchsorted(t, time, side='right') - 1, 0), t.size - 2)
+            w = (time - t[k]) / (t[k + 1] - t[k])
+            return values[..., k] * (1.0 - w) + values[..., k + 1] * w
+
+        return value
+
+
+
+    def sampled(self, waveform, t, shape):
+        """
+        Values of the function of time waveform at all times t, shape (len(t),) + shape
+        """
+
+        return np.array([np.broadcast_to(waveform(time), shape) for time in t])
+
+
+
+    def static(self, U, irradiance=1.0):
+        """
+        Steady state current density J in A/m**2 at terminal voltage U and irradiance (factor of J_ph)
+        """
+
+        elements = self.elements
+        batch = tdb.SiCellBatch(elements.J_ph * irradiance, elements.J_s1, elements.J_s2, elements.R_s, elements.R_p, elements.T_sim)
+        batch.accuracy = elements.accuracy
+        batch.U_min = elements.U_min
+        batch.U_max = elements.U_max
+
+        return batch.j(U)
+
+
+
+    def f(self, U_d, U, irradiance):
+        """
+        Charging current density dQ/dt = (U - U_d) / R_s - J_d(U_d) in A/m**2 and its derivative by U_d
+        """
+
+        elements = self.elements
+        J_d, dJ_d = elements.j_bounded(U_d)
+        J_d = J_d + (irradiance - 1.0) * elements.J_ph
+
+        return (U - U_d) / elements.R_s - J_d, - 1.0 / elements.R_s - dJ_d
+
+
+
+    def stage(self, U_d, rhs, a_h, U, irradiance):
+        """
+        Newton iteration of Q(U_d) - a_h f(U_d) = rhs of all cells (start at U_d), returns U_d, f(U_d) and True at convergence
+        """
+
+        for unused_i in range(self.max_iter):
+            Q, C = self.charge(U_d)
+            f, df = self.f(U_d, U, irradiance)
+            step = (Q - a_h * f - rhs) / (C - a_h * df)
+            U_d = U_d - step
+            if np.max(np.abs(step)) < self.tolerance:
+                return U_d, self.f(U_d, U, irradiance)[0], True
+
+        return U_d, f, False
+
+
+
+    def simulate(self, t, U, irradiance=1.0, U_d0=None):
+        """
+        Purpose:    Simulate the terminal current density of all cells for the voltage and irradiance waveforms
+
+        Model:      TR-BDF2 steps (gamma = 2 - sqrt(2)) of the charge, local error
+                        2 k h (f_n / gamma - f_gamma / (gamma (1 - gamma)) + f_n+1 / (1 - gamma)) / C,
+                        k = (- 3 gamma**2 + 4 gamma - 2) / (12 (2 - gamma))
+                    (largest over the batch, scaled by atol + rtol |U_d|), steps end on every time of t
+
+        Input:      Times t in s (ascending), terminal voltage U in V and irradiance (factor of J_ph) as callables of the time,
+                    constants or arrays with the values at t along the last axis, initial diode voltages U_d0 in V
+
+        Output:     Current densities J in A/m**2 and diode voltages U_d in V (shape of the batch + (len(t),))
+        """
+
+        elements = self.elements
+        if np.any(elements.R_s <= 0.0):
+            raise ValueError('transient simulation needs R_s > 0 (diode voltage as state)')
+        t = np.asarray(t, dtype=float)
+        if t.ndim != 1 or t.size < 2 or np.any(np.diff(t) <= 0.0):
+            raise ValueError('t must be ascending with at least 2 times')
+        U_t = self.waveform(U, t)
+        g_t = self.waveform(irradiance, t)
+
+        gamma = 2.0 - np.sqrt(2.0)
+        a = 1.0 / (gamma * (2.0 - gamma))
+        b = (1.0 - gamma)**2 / (gamma * (2.0 - gamma))
+        c = (1.0 - gamma) / (2.0 - gamma)
+        k_err = (- 3.0 * gamma**2 + 4.0 * gamma - 2.0) / (12.0 * (2.0 - gamma))
+
+        if U_d0 is None:
+            U_0 = U_t(t[0])
+            U_d0 = U_0 - self.static(U_0, g_t(t[0])) * elements.R_s
+        y = np.array(np.broadcast_arrays(U_d0, elements.J_ph, elements.R_s, self.C_j0, self.tau_d)[0], dtype=float)
+        f_n = np.broadcast_to(self.f(y, U_t(t[0]), g_t(t[0]))[0], y.shape)
+        U_d = np.empty(y.shape + t.shape)
+        U_d[..., 0] = y
+
+        time = t[0]
+        h = self.first_step * (t[1] - t[0])
+        n_steps = 0
+        for k in range(1, t.size):
+            while time < t[k]:
+                n_steps += 1
+                if n_steps > self.max_steps:
+                    raise ArithmeticError('transient simulation exceeded %d time steps at t = %g s' % (self.max_steps, time))
+                last = h >= (t[k] - time) * (1.0 - 1.0e-12)
+                h_step = t[k] - time if last else h
+                Q_n = self.charge(y)[0]
+                t_gamma = time + gamma * h_step
+                y_gamma, f_gamma, converged = self.stage(y, Q_n + gamma * h_step / 2.0 * f_n, gamma * h_step / 2.0, U_t(t_gamma), g_t(t_gamma))
+                if converged:
+                    t_1 = t[k] if last else time + h_step
+                    y_1, f_1, converged = self.stage(y_gamma, a * self.charge(y_gamma)[0] - b * Q_n, c * h_step, U_t(t_1), g_t(t_1))
+                if not converged:
+                    h = h_step / 4.0
+                    continue
+                error = 2.0 * k_err * h_step * (f_n / gamma - f_gamma / (gamma * (1.0 - gamma)) + f_1 / (1.0 - gamma)) / self.charge(y_1)[1]
+                error = np.max(np.abs(error) / (self.atol + self.rtol * np.abs(y_1)))
+                factor = 0.9 * error**(- 1.0 / 3.0) if error > 0.0 else 5.0
+                if error <= 1.0:
+                    time = t_1
+                    y, f_n = y_1, f_1
+                    if not last or h_step >= h:                 # a last step shortened to t[k] keeps h
+                        h = h_step * min(factor, 5.0)
+                else:
+                    h = h_step * max(factor, 0.2)
+            U_d[..., k] = y
+
+        J = (np.moveaxis(self.sampled(U_t, t, y.shape), 0, -1) - U_d) / np.broadcast_to(elements.R_s, y.shape)[..., np.newaxis]
+
+        return J, U_d
+
+
+
+    def correct(self, t, U, J_measured, irradiance=1.0):
+        """
+        Purpose:    Correct the sweep-speed artefact of measured (or simulated) current densities
+
+        Model:      J_corrected = J_measured - (J_transient - J_static), J_transient simulated for the voltage and irradiance
+                    waveforms of the measurement, J_static the steady state current density at the same U and irradiance
+
+        Input:      Times t in s, voltages U in V and current densities J_measured in A/m**2 at t (last axis), irradiance
+
+        Output:     Corrected current densities J in A/m**2
+        """
+
+        t = np.asarray(t, dtype=float)
+        J_transient, unused_U_d = self.simulate(t, U, irradiance)
+        shape = J_transient.shape[:-1]
+        J_static = self.static(self.sampled(self.waveform(U, t), t, shape), self.sampled(self.waveform(irradiance, t), t, shape))
+
+        return J_measured - (J_transient - np.moveaxis(J_static, 0, -1))
@@ -7,20 +7,18 @@ Purpose:    Calculate current density-voltage characteristic J(U) in A/m**2 with
             Calculate solar cell characteristics U_oc, J_sc, U_MPP, J_MPP, S_MPP, FF, eta
 
 Requires:   constants.py
-            bandgap.py
-            effective_masses.py (which itself uses bandgap.py)
-            mobilities.py (which itself uses carrier_concentrations.py (which itself uses constants.py and bandgap.py))
-            diffusion_coefficients.py (which itself uses mobilities.py)
+            material_state.py (which itself uses bandgap.py, effective_masses.py, carrier_concentrations.py and mobilities.py)
+            saturation_currents.py (which itself uses constants.py)
+            twodiodemodel_batch.py (which itself uses constants.py)
+            temperature_coefficients.py (imported on first use)
+            material_state.py and scipy are imported on first use (fast import for j_u_curve / p_u_curve only)
 """
 
-from constants import q_e, h_P, k_B, T_STC, U_Te_STC
-import bandgap as bg
-import effective_masses as em
-import mobilities as mu
-import diffusion_coefficients as dc
+from ..constants import k_B, T_STC, U_Te_STC
+from . import saturation_currents as sc
+from . import twodiodemodel_batch as tdb
 import math as m
 import numpy as np
-import scipy.optimize as sp_o
 #==============================================================================
 
 class SiCell:
@@ -30,8 +28,10 @@ class SiCell:
 
     J_ph = -10.0e-20                    # A/m**2        -350.0
     accuracy = 1.0e-9                   # relative
+    max_iter = 100                      # Newton iterations of j (no relative convergence for J close to 0, e.g. at U_oc)
     U_min = - 0.5                       # V
     U_max = 1.5                         # V
+    cache = None                        # opt-in persistent result cache ('result_cache.ResultCache')
 
 # typical Si-cell values:
     N_d = 1.0e12                        # m^-3
@@ -75,6 +75,43 @@ class SiCell:
     D_x_on = 0
     mu_x_on = 0
 
+# inputs of the derived values (dirty tracking: activate_effects only recomputes values whose inputs changed):
+    dependencies = {
+        'e_g': ('T_ini', 'T_sim', 'N_d', 'N_a', 'E_g_on'),
+        'm_x_eff': ('T_ini', 'T_sim', 'N_d', 'N_a', 'm_x_eff_on'),
+        'd_x': ('T_ini', 'T_sim', 'D_x_on', 'mu_x_on'),
+        'mu_x': ('T_ini', 'T_sim', 'N_d', 'N_a', 'mu_x_on'),
+        'j_sx': ('J_s1_T_ini', 'J_s2_T_ini', 'T_ini', 'T_sim', 'U_Te_T_ini', 'U_Te_T_sim', 'N_a', 'W', 'tau', 'S',
+                 'J_sx_on', 'D_x_on', 'mu_x_on', 'fit_J_sx_on', 'fit_tau_on',
+                 'E_g_T_ini', 'E_g_T_sim', 'm_c_eff_T_sim', 'm_v_eff_T_sim', 'D_e_T_ini', 'D_e_T_sim', 'mu_As_b_T_ini', 'mu_As_b_T_sim'),
+    }
+
+
+
+    def __init__(self):
+        """
+        
+        """
+
+        self.material_states = {}
+        self.inputs = {}
+
+
+
+    def material_state(self, T):
+        """
+        Return the (lazily evaluated) material state at temperature T for the cell doping N_d, N_a
+        States are reused as long as temperature and doping do not change
+        """
+
+        from ..parameters import material_state as ms
+
+        key = (T, self.N_d, self.N_a)
+        if key not in self.material_states:
+            self.material_states[key] = ms.MaterialState(T, self.N_d, self.N_a)
+
+        return self.material_states[key]
+
 
 
     def set_values(self, J_ph, J_s1, J_s2, R_s, R_p, T_ini, T_sim):
@@ -125,18 +162,59 @@ class SiCell:
         
         """
 
-        # call required methods:
-        if self.E_g_on == False:
-            self.e_g(self.T_ini, self.T_ini)    #self.E_g_T_sim = self.E_g_T_ini
-        if self.E_g_on == True:
-            self.e_g(self.T_ini, self.T_sim)
-        if self.m_x_eff_on == True:
-            self.m_x_eff(self.T_ini, self.T_sim)
-        if self.D_x_on == True and self.mu_x_on == False:
-            self.d_x(self.T_ini, self.T_sim)
-        if self.mu_x_on == True:
-            self.mu_x(self.T_ini, self.T_sim)
-        self.j_sx()
+        # call required methods (only if their inputs changed, e.g. not for new J_ph, R_s, R_p):
+        if self.outdated('e_g'):
+            if self.E_g_on == False:
+                self.e_g(self.T_ini, self.T_ini)    #self.E_g_T_sim = self.E_g_T_ini
+            if self.E_g_on == True:
+                self.e_g(self.T_ini, self.T_sim)
+            self.updated('e_g')
+        if self.outdated('m_x_eff'):
+            if self.m_x_eff_on == True:
+                self.m_x_eff(self.T_ini, self.T_sim)
+            self.updated('m_x_eff')
+        if self.outdated('d_x'):
+            if self.D_x_on == True and self.mu_x_on == False:
+                self.d_x(self.T_ini, self.T_sim)
+            self.updated('d_x')
+        if self.outdated('mu_x'):
+            if self.mu_x_on == True:
+                self.mu_x(self.T_ini, self.T_sim)
+            self.updated('mu_x')
+        if self.outdated('j_sx'):
+            self.j_sx()
+            self.updated('j_sx')
+
+        # keep only the material states of the current operating points
+        keys = [(T, self.N_d, self.N_a) for T in (self.T_ini, self.T_sim)]
+        self.material_states = {key: self.material_states[key] for key in keys if key in self.material_states}
+
+
+
+    def input_values(self, name):
+        """
+        Current values of the inputs of derived value name (see dependencies)
+        """
+
+        return tuple(getattr(self, input_name, None) for input_name in self.dependencies[name])
+
+
+
+    def outdated(self, name):
+        """
+        True if an input of derived value name changed since its last calculation
+        """
+
+        return self.inputs.get(name) != self.input_values(name)
+
+
+
+    def updated(self, name):
+        """
+        Remember the inputs of the just calculated derived value name
+        """
+
+        self.inputs[name] = self.input_values(name)
 
 
 
@@ -145,9 +223,8 @@ class SiCell:
         
         """
 
-        E_g_O = bg.Eg()
-        self.E_g_T_ini = E_g_O.eg_models(T_ini)[-1]     # [-1] = E_g_Paessler2002
-        self.E_g_T_sim = E_g_O.eg_models(T_sim)[-1]
+        self.E_g_T_ini = self.material_state(T_ini).E_g
+        self.E_g_T_sim = self.material_state(T_sim).E_g
 
 
 
@@ -156,11 +233,8 @@ class SiCell:
         
         """
 
-        m_x_eff_O = em.EffectiveMasses()
-        self.m_c_eff_T_ini = m_x_eff_O.m_x(T_ini)[0]
-        self.m_v_eff_T_ini = m_x_eff_O.m_x(T_ini)[1]
-        self.m_c_eff_T_sim = m_x_eff_O.m_x(T_sim)[0]
-        self.m_v_eff_T_sim = m_x_eff_O.m_x(T_sim)[1]
+        self.m_c_eff_T_ini, self.m_v_eff_T_ini = self.material_state(T_ini).m_x
+        self.m_c_eff_T_sim, self.m_v_eff_T_sim = self.material_state(T_sim).m_x
 
 
 
@@ -186,45 +260,23 @@ class SiCell:
         
         """
 
-        Mu_O = mu.Klaassen()
-        self.mu_As_b_T_ini, self.mu_P_b_T_ini, self.mu_B_b_T_ini = Mu_O.mu_i_bulk(T_ini, self.N_d*1.0e-6, self.N_a*1.0e-6)
-        self.mu_As_b_T_sim, self.mu_P_b_T_sim, self.mu_B_b_T_sim = Mu_O.mu_i_bulk(T_sim, self.N_d*1.0e-6, self.N_a*1.0e-6)
+        self.mu_As_b_T_ini, self.mu_P_b_T_ini, self.mu_B_b_T_ini = self.material_state(T_ini).mu_b
+        self.mu_As_b_T_sim, self.mu_P_b_T_sim, self.mu_B_b_T_sim = self.material_state(T_sim).mu_b
 
 
 
     def j_sx(self):
         """
-        
+        Saturation current densities J_s1, J_s2 at T_sim of the active effects and fit options
+        (precedence of the combinations see 'saturation_currents.SaturationCurrents')
         """
 
-        if self.J_sx_on == False or self.T_sim == self.T_ini:
-            self.J_s1 = self.J_s1_T_ini
-            self.J_s2 = self.J_s2_T_ini
-        if self.J_sx_on == True and self.D_x_on == False:
-            c_s1 = self.J_s1_T_ini / (self.T_ini**3 * m.exp(-self.E_g_T_ini / self.U_Te_T_ini))
-            c_s2 = self.J_s2_T_ini / (m.sqrt(self.T_ini**5) * m.exp(-self.E_g_T_ini / (2.0 * self.U_Te_T_ini)))
-            self.J_s1 = c_s1 * self.T_sim**3 * m.exp(-self.E_g_T_sim / self.U_Te_T_sim)
-            self.J_s2 = c_s2 * m.sqrt(self.T_sim**5) * m.exp(-self.E_g_T_sim / (2.0 * self.U_Te_T_sim))
-        if self.J_sx_on == True and self.D_x_on == True and self.mu_x_on == False:
-            c_s1 = self.J_s1_T_ini / (self.T_ini**3 * m.exp(-self.E_g_T_ini / self.U_Te_T_ini) * m.sqrt(self.D_e_T_ini / self.tau) * ((1 + m.sqrt(self.D_e_T_ini) * m.tanh(self.W / m.sqrt(self.D_e_T_ini * self.tau)) / (m.sqrt(self.tau) * self.S)) / (m.sqrt(self.D_e_T_ini)/(m.sqrt(self.tau) * self.S + m.tanh(self.W / m.sqrt(self.D_e_T_ini * self.tau))))))
-            c_s2 = self.J_s2_T_ini / (m.sqrt(self.T_ini**5) * m.exp(-self.E_g_T_ini / (2.0 * self.U_Te_T_ini)))
-            self.J_s1 = c_s1 * (self.T_sim**3 * m.exp(-self.E_g_T_sim / self.U_Te_T_sim) * m.sqrt(self.D_e_T_sim / self.tau) * ((1 + m.sqrt(self.D_e_T_sim) * m.tanh(self.W / m.sqrt(self.D_e_T_sim * self.tau)) / (m.sqrt(self.tau) * self.S)) / (m.sqrt(self.D_e_T_sim) / (m.sqrt(self.tau) * self.S + m.tanh(self.W / m.sqrt(self.D_e_T_sim * self.tau))))))
-            self.J_s2 = c_s2 * m.sqrt(self.T_sim**5) * m.exp(-self.E_g_T_sim / (2.0 * self.U_Te_T_sim))
-        if self.J_sx_on == True and self.D_x_on == True and self.mu_x_on == True:
-            c_s1 = self.J_s1_T_ini / (self.T_ini**3 * m.exp(-self.E_g_T_ini / self.U_Te_T_ini) * m.sqrt(self.U_Te_T_ini * self.mu_As_b_T_ini / self.tau) * ((1 + m.sqrt(self.U_Te_T_ini * self.mu_As_b_T_ini) * m.tanh(self.W / m.sqrt(self.U_Te_T_ini * self.mu_As_b_T_ini * self.tau)) / (m.sqrt(self.tau) * self.S)) / (m.sqrt(self.U_Te_T_ini * self.mu_As_b_T_ini) / (m.sqrt(self.tau) * self.S + m.tanh(self.W / m.sqrt(self.U_Te_T_ini * self.mu_As_b_T_ini * self.tau))))))
-            c_s2 = self.J_s2_T_ini / (m.sqrt(self.T_ini**5) * m.exp(-self.E_g_T_ini / (2.0 * self.U_Te_T_ini)))
-            self.J_s1 = c_s1 * (self.T_sim**3 * m.exp(-self.E_g_T_sim / self.U_Te_T_sim) * m.sqrt(self.U_Te_T_sim * self.mu_As_b_T_sim / self.tau) * ((1 + m.sqrt(self.U_Te_T_sim * self.mu_As_b_T_sim) * m.tanh(self.W / m.sqrt(self.U_Te_T_sim * self.mu_As_b_T_sim * self.tau)) / (m.sqrt(self.tau) * self.S)) / (m.sqrt(self.U_Te_T_sim * self.mu_As_b_T_sim) / (m.sqrt(self.tau) * self.S + m.tanh(self.W / m.sqrt(self.U_Te_T_sim * self.mu_As_b_T_sim * self.tau))))))
-            self.J_s2 = c_s2 * m.sqrt(self.T_sim**5) * m.exp(-self.E_g_T_sim / (2.0 * self.U_Te_T_sim))
-        if self.fit_J_sx_on == True and self.fit_tau_on == False:
-            c_s1 = self.J_s1_T_ini / (self.T_ini**3 * m.exp(-self.E_g_T_ini / self.U_Te_T_ini))
-            c_s2 = self.J_s2_T_ini / (m.sqrt(self.T_ini**5) * m.exp(-self.E_g_T_ini / (2.0 * self.U_Te_T_ini)))
-            self.J_s1 = c_s1 * self.T_sim**3 * m.exp(-self.E_g_T_sim / self.U_Te_T_sim)
-            self.J_s2 = c_s2 * m.sqrt(self.T_sim**5) * m.exp(-self.E_g_T_sim / (2.0 * self.U_Te_T_sim))
-        if self.fit_J_sx_on == False and self.fit_tau_on == True:
-            c_s1 = (32.0 * m.pi**3.0 * q_e * k_B**3) / (self.N_a * h_P**6.0)
-            self.J_s1 = c_s1 * (self.T_sim**3 * (self.m_c_eff_T_sim * self.m_v_eff_T_sim)**1.5 * m.exp(-self.E_g_T_sim / self.U_Te_T_sim) * m.sqrt(self.U_Te_T_sim * self.mu_As_b_T_sim / self.tau) * ((1 + m.sqrt(self.U_Te_T_sim * self.mu_As_b_T_sim) * m.tanh(self.W / m.sqrt(self.U_Te_T_sim * self.mu_As_b_T_sim * self.tau)) / (m.sqrt(self.tau) * self.S)) / (m.sqrt(self.U_Te_T_sim * self.mu_As_b_T_sim) / (m.sqrt(self.tau) * self.S + m.tanh(self.W / m.sqrt(self.U_Te_T_sim * self.mu_As_b_T_sim * self.tau))))))
         if self.fit_tau_on == True and self.fit_J_sx_on == True:
             print('Make up your mind what parameters you want to fit!')
+        engine = sc.SaturationCurrents.from_cell(self)
+        J_s1, J_s2 = engine.j_sx(**engine.cell_values(self))
+        self.J_s1 = float(J_s1)
+        self.J_s2 = float(J_s2)
 
 
 
@@ -284,7 +336,9 @@ class SiCell:
         U_R_s = self.j_bounded(U) * self.R_s
         J = U_R_s / self.R_s
         Ji = self.j_bounded(U - U_R_s) - J
-        while (abs(Ji / J) > self.accuracy):
+        n_iter = 0
+        while (abs(Ji) > self.accuracy * abs(J) and n_iter < self.max_iter):
+            n_iter += 1
             deriv = -self.dj_bounded(U - U_R_s) - 1.0 / self.R_s
             U_R_s -= Ji / deriv
             J = U_R_s / self.R_s
@@ -330,7 +384,9 @@ class SiCell:
         
         """
 
-        U_oc = sp_o.fsolve(self.j, 0.62)
+        import scipy.optimize as sp_o
+
+        U_oc = sp_o.fsolve(lambda U: self.j(U[0]), 0.62)[0]
 
         return U_oc
 
@@ -350,7 +406,9 @@ class SiCell:
         
         """
 
-        U_MPP = sp_o.fsolve(self.dp, 0.5)
+        import scipy.optimize as sp_o
+
+        U_MPP = sp_o.fsolve(lambda U: self.dp(U[0]), 0.5)[0]
         J_MPP = self.j(U_MPP)
         S_MPP = U_MPP * J_MPP
 
@@ -365,6 +423,18 @@ class SiCell:
         
         """
 
+        if self.cache is not None:
+            return self.cache.cached(self.cache.cell_key(self, 'characteristics'), self.compute_characteristics)
+
+        return self.compute_characteristics()
+
+
+
+    def compute_characteristics(self):
+        """
+        Solar cell characteristics U_oc, J_sc, U_MPP, J_MPP, S_MPP, FF, eta (without cache)
+        """
+
         U_oc = self.u_oc()
         J_sc = self.j(0)
         U_MPP, J_MPP, S_MPP = self.mpp()
@@ -375,16 +445,27 @@ class SiCell:
 
 
 
+    def temperature_coefficients(self, relative=False):
+        """
+        Temperature derivatives of U_oc, J_sc, U_MPP, J_MPP, S_MPP, FF, eta at T_sim (relative: in %/K),
+        see 'temperature_coefficients.TemperatureCoefficients'
+        """
+
+        from . import temperature_coefficients as tc
+
+        return tc.TemperatureCoefficients().coefficients([self], relative)[:, 0]
+
+
+
     def j_u_curve(self, U_list):
         """
         
         """
 
-        J_list = []
-        for U in U_list:
-            J_list.append(self.j(U))
+        if self.cache is not None:
+            return self.cache.cached(self.cache.cell_key(self, 'j_u_curve', U_list), lambda: tdb.SiCellBatch.from_cell(self).j_u_curve(U_list))
 
-        return np.array(J_list)
+        return tdb.SiCellBatch.from_cell(self).j_u_curve(U_list)
 
 
 
@@ -393,8 +474,7 @@ class SiCell:
         
         """
 
-        P_list = []
-        for U in U_list:
-            P_list.append(self.p(U))
+        if self.cache is not None:
+            return self.cache.cached(self.cache.cell_key(self, 'p_u_curve', U_list), lambda: tdb.SiCellBatch.from_cell(self).p_u_curve(U_list))
 
-        return np.array(P_list)
+        return tdb.SiCellBatch.from_cell(self).p_u_curve(U_list)
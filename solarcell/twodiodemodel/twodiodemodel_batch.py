@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Calculate current density-voltage characteristics J(U) in A/m**2 with two-diode-model for whole batches
+            of parameter sets at once (vectorized, numpy broadcasting of parameters against voltages)
+            Calculate solar cell characteristics U_oc, J_sc, U_MPP, J_MPP, S_MPP, FF, eta of every parameter set
+            Calculate the derivatives of J(U) with respect to the parameters J_ph, J_s1, J_s2, R_s, R_p
+
+Requires:   constants.py
+"""
+
+from ..constants import k_B
+import numpy as np
+#==============================================================================
+
+class SiCellBatch:
+    """
+    Vectorized silicon solar cell class
+
+    Same two-diode-model as 'twodiodemodel.SiCell' (incl. linear continuation of the diode currents outside U_min...U_max),
+    but every parameter may be an array. Parameters broadcast against each other and against the voltages, e.g.
+    parameters of shape (n_cells, 1) and voltages of shape (n_points,) give currents of shape (n_cells, n_points).
+    input of J_ph, J_s1, J_s2 in A/m**2, R_s, R_p in Ohm*m**2, T_sim in K
+    """
+
+    accuracy = 1.0e-9                   # relative
+    max_iter = 100
+    U_min = - 0.5                       # V
+    U_max = 1.5                         # V
+
+
+
+    def __init__(self, J_ph, J_s1, J_s2, R_s, R_p, T_sim):
+        self.J_ph = np.asarray(J_ph, dtype=float)
+        self.J_s1 = np.asarray(J_s1, dtype=float)
+        self.J_s2 = np.asarray(J_s2, dtype=float)
+        self.R_s = np.asarray(R_s, dtype=float)
+        self.R_p = np.asarray(R_p, dtype=float)
+        self.T_sim = np.asarray(T_sim, dtype=float)
+        self.U_Te_T_sim = k_B * self.T_sim
+
+
+
+    @classmethod
+    def from_cell(cls, cell):
+        """
+        Create a batch of one parameter set from the current (simulation) values of a 'twodiodemodel.SiCell'
+        """
+
+        batch = cls(cell.J_ph, cell.J_s1, cell.J_s2, cell.R_s, cell.R_p, cell.T_sim)
+        batch.accuracy = cell.accuracy
+        batch.U_min = cell.U_min
+        batch.U_max = cell.U_max
+
+        return batch
+
+
+
+    def j_bounded(self, U):
+        """
+        Current density of the diodes and the parallel resistance at diode voltage U
+        returns current density J and its derivative dJ/dU
+        """
+
+        U_c = np.clip(U, self.U_min, self.U_max)
+        exp_1 = np.exp(U_c / self.U_Te_T_sim)
+        exp_2 = np.exp(U_c / (2.0 * self.U_Te_T_sim))
+        dJ = self.J_s1 / self.U_Te_T_sim * exp_1 + self.J_s2 / (2.0 * self.U_Te_T_sim) * exp_2 + 1.0 / self.R_p
+        J = self.J_ph + self.J_s1 * (exp_1 - 1.0) + self.J_s2 * (exp_2 - 1.0) + U_c / self.R_p + dJ * (U - U_c)
+
+        return J, dJ
+
+
+
+    def j(self, U):
+        """
+        Purpose:    Calculate current density J(U) at terminal voltage U
+
+        Model:      J = j_bounded(U - J * R_s), Newton iteration in J (convex, hence converging for every start value)
+
+        Input:      Voltage U in V (scalar or array)
+
+        Output:     Current density J in A/m**2 (broadcast shape of U and the parameters)
+        """
+
+        U = np.asarray(U, dtype=float)
+        J, unused_dJ = self.j_bounded(U)
+        for unused_i in range(self.max_iter):
+            J_U, dJ_U = self.j_bounded(U - J * self.R_s)
+            J_step = (J_U - J) / (1.0 + self.R_s * dJ_U)
+            J = J + J_step
+            if np.all(np.abs(J_step) <= self.accuracy * np.abs(J)):
+                break
+
+        return J
+
+
+
+    def dj(self, U):
+        """
+        Derivative dJ/dU in A/(V*m**2) at terminal voltage U
+        """
+
+        U = np.asarray(U, dtype=float)
+        unused_J_U, dJ_U = self.j_bounded(U - self.j(U) * self.R_s)
+
+        return dJ_U / (1.0 + self.R_s * dJ_U)
+
+
+
+    def p(self, U):
+        """
+        Power density P = U * J in W/m**2 at terminal voltage U
+        """
+
+        U = np.asarray(U, dtype=float)
+
+        return U * self.j(U)
+
+
+
+    def jacobian(self, U):
+        """
+        Purpose:    Calculate J(U) and its derivatives with respect to the parameters (implicit differentiation of J = j_bounded(U - J * R_s))
+
+        Input:      Voltage U in V (scalar or array)
+
+        Output:     Current density J in A/m**2
+                    Array of the derivatives dJ/dJ_ph, dJ/dJ_s1, dJ/dJ_s2 in 1, dJ/dR_s, dJ/dR_p in A/(Ohm*m**4) (stacked along the first axis)
+        """
+
+        U = np.asarray(U, dtype=float)
+        J = self.j(U)
+        U_d = U - J * self.R_s
+        U_c = np.clip(U_d, self.U_min, self.U_max)
+        exp_1 = np.exp(U_c / self.U_Te_T_sim)
+        exp_2 = np.exp(U_c / (2.0 * self.U_Te_T_sim))
+        unused_J_U, dJ_U = self.j_bounded(U_d)
+        denominator = 1.0 + self.R_s * dJ_U
+
+        dJ_ph = 1.0 / denominator
+        dJ_s1 = (exp_1 - 1.0 + exp_1 / self.U_Te_T_sim * (U_d - U_c)) / denominator
+        dJ_s2 = (exp_2 - 1.0 + exp_2 / (2.0 * self.U_Te_T_sim) * (U_d - U_c)) / denominator
+        dR_s = - dJ_U * J / denominator
+        dR_p = - U_d / self.R_p**2 / denominator
+
+        return J, np.array(np.broadcast_arrays(dJ_ph, dJ_s1, dJ_s2, dR_s, dR_p))
+
+
+
+    def u_oc(self):
+        """
+        Purpose:    Calculate open-circuit voltage U_oc
+
+        Model:      J = 0 means no voltage drop at R_s, so j_bounded(U_oc) = 0 is solved by Newton iteration,
+                    starting at the one-diode estimate U_Te * ln(1 - J_ph / J_s1) (right of the root, hence monotonic convergence)
+
+        Output:     Open-circuit voltage U_oc in V (shape of the parameters)
+        """
+
+        U = self.U_Te_T_sim * np.log1p(np.maximum(- self.J_ph, 0.0) / self.J_s1)
+        for unused_i in range(self.max_iter):
+            J_U, dJ_U = self.j_bounded(U)
+            U_step = J_U / dJ_U
+            U = U - U_step
+            if np.all(np.abs(U_step) <= self.accuracy * np.abs(U)):
+                break
+
+        return U
+
+
+
+    def j_sc(self):
+        """
+        Short-circuit current density J_sc = J(0) in A/m**2
+        """
+
+        return self.j(0.0)
+
+
+
+    def mpp(self):
+        """
+        Purpose:    Calculate maximum power point
+
+        Model:      Parametrisation by the diode voltage U_d (U = U_d + J * R_s, J = j_bounded(U_d)),
+                    dP/dU_d = 0 solved by bisection in 0...U_oc
+
+        Output:     U_MPP in V, J_MPP in A/m**2, S_MPP in W/m**2 (shape of the parameters, nan without illumination)
+        """
+
+        U_oc = self.u_oc()
+        U_d_low = np.zeros_like(U_oc)
+        U_d_high = np.where(U_oc > 0.0, U_oc, np.nan)
+        for unused_i in range(self.max_iter):
+            U_d = 0.5 * (U_d_low + U_d_high)
+            J, dJ = self.j_bounded(U_d)
+            dP = (1.0 + self.R_s * dJ) * J + (U_d + J * self.R_s) * dJ
+            U_d_low = np.where(dP < 0.0, U_d, U_d_low)
+            U_d_high = np.where(dP < 0.0, U_d_high, U_d)
+            if not np.any(U_d_high - U_d_low > self.accuracy * U_d_high):
+                break
+
+        J_MPP, unused_dJ = self.j_bounded(U_d)
+        U_MPP = U_d + J_MPP * self.R_s
+        S_MPP = U_MPP * J_MPP
+
+        return U_MPP, J_MPP, S_MPP
+
+
+
+#==============================================================================
+# for your convenience
+    def characteristics(self):
+        """
+        Solar cell characteristics U_oc, J_sc, U_MPP, J_MPP, S_MPP, FF, eta (stacked along the first axis)
+        """
+
+        U_oc = self.u_oc()
+        J_sc = self.j_sc()
+        U_MPP, J_MPP, S_MPP = self.mpp()
+        FF = S_MPP / (U_oc * J_sc) * 100
+        eta = U_MPP * J_MPP / 1000.0            # only valid @ STC conditions
+
+        return np.array(np.broadcast_arrays(U_oc, J_sc, U_MPP, J_MPP, S_MPP, FF, eta))
+
+
+
+    def j_u_curve(self, U_list):
+        """
+        Current densities J in A/m**2 at all voltages of U_list
+        """
+
+        return self.j(np.asarray(U_list, dtype=float))
+
+
+
+    def p_u_curve(self, U_list):
+        """
+        Power densities P in W/m**2 at all voltages of U_list
+        """
+
+        return self.p(np.asarray(U_list, dtype=float))
@@ -7,6 +7,7 @@ Purpose:    Plot current density-voltage characteristic J(U) in A/m**2 for vario
             Plot solar cell characteristics U_oc, J_sc, U_MPP, J_MPP, S_MPP, FF, eta
 
 Requires:   twodiodemodel.py
+            measurement_io.py
 
 ===============================================================================
 MANUAL:
@@ -17,7 +18,8 @@ MANUAL:
 ===============================================================================
 """
 
-import twodiodemodel as tdm
+from solarcell.twodiodemodel import twodiodemodel as tdm
+from solarcell.twodiodemodel import measurement_io as mio
 import numpy as np
 import matplotlib.pyplot as mpl_p
 #==============================================================================
@@ -143,29 +145,9 @@ print('-------------------------------------------------------------------------
 
 #==============================================================================
 # experimental data from *.dat file (Keithley source meter)
-fobj_U_T_sim1 = open('5-00_U.txt','r')
-U_T_sim1_str = fobj_U_T_sim1.read()
-fobj_U_T_sim1.close()
-U_T_sim1_str_list = U_T_sim1_str.splitlines()
-U_T_sim1_list = [float(i) for i in U_T_sim1_str_list]
-
-fobj_J_T_sim1 = open('5-00_J.txt','r')
-J_T_sim1_str = fobj_J_T_sim1.read()
-fobj_J_T_sim1.close()
-J_T_sim1_str_list = J_T_sim1_str.splitlines()
-J_T_sim1_list = [float(i) for i in J_T_sim1_str_list]
-
-fobj_U_T_sim2 = open('60-00_U.txt','r')
-U_T_sim2_str = fobj_U_T_sim2.read()
-fobj_U_T_sim2.close()
-U_T_sim2_str_list = U_T_sim2_str.splitlines()
-U_T_sim2_list = [float(i) for i in U_T_sim2_str_list]
-
-fobj_J_T_sim2 = open('60-00_J.txt','r')
-J_T_sim2_str = fobj_J_T_sim2.read()
-fobj_J_T_sim2.close()
-J_T_sim2_str_list = J_T_sim2_str.splitlines()
-J_T_sim2_list = [float(i) for i in J_T_sim2_str_list]
+M_IO = mio.MeasurementIO()
+U_T_sim1_list, J_T_sim1_list, metadata_T_sim1 = M_IO.read_pair('5-00_U.txt', '5-00_J.txt')
+U_T_sim2_list, J_T_sim2_list, metadata_T_sim2 = M_IO.read_pair('60-00_U.txt', '60-00_J.txt')
 
 
 
@@ -173,6 +155,7 @@ J_T_sim2_list = [float(i) for i in J_T_sim2_str_list]
 # 4.)
 # plotting results:
 fig1 = mpl_p.figure(1)
+fig1.set_label('JU-Kennlinien')
 ax1 = fig1.add_subplot(111)
 ax1.set_xlabel(r'Spannung   $U / V$')
 ax1.set_ylabel(r'Stromdichte   $\vec{J} / \frac{A}{m^2}$')
@@ -189,6 +172,7 @@ mpl_p.ylim(0.0, 400.0)
 ax1.legend()
 
 fig2 = mpl_p.figure(2)
+fig2.set_label('JU-Kennlinien_log')
 ax2 = fig2.add_subplot(111)
 ax2.set_xlabel(r'Spannung   $U / V$')
 ax2.set_ylabel(r'Stromdichte   $\vec{J} / \frac{A}{m^2}$')
@@ -0,0 +1,579 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Fit the two-diode-model parameters J_ph, J_s1, J_s2, R_s, R_p to measured current density-voltage characteristics J(U)
+            Estimate start values of the fit analytically from the measured curves (vectorized over many curves)
+            Fit one curve from many start values at once to find the global minimum (multi-start)
+            Fit whole measurement campaigns (e.g. a day of flash tester output) in parallel and stream the results to a CSV table
+
+Requires:   constants.py
+            twodiodemodel.py (which itself uses constants.py and material_state.py)
+            twodiodemodel_batch.py (which itself uses constants.py)
+            measurement_io.py
+            scipy (imported on first use)
+"""
+
+from ..constants import k_B
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import copy
+import csv
+import os
+from . import twodiodemodel as tdm
+from . import twodiodemodel_batch as tdb
+from . import measurement_io as mio
+import numpy as np
+#==============================================================================
+
+class InitialGuess:
+    """
+    Initial guess class
+
+    Call method 'estimate' with *args 'U, J, T' to derive start values J_ph, J_s1, J_s2, R_s, R_p from measured curves.
+    U and J are 1-D (one curve) or 2-D (one curve per row, padded with nan, e.g. 'measurement_io.Campaign.padded'),
+    all curves are processed at once.
+
+    Illuminated curves (J_sc < 0 and a zero crossing at U_oc):
+        J_sc, R_p           <- linear fit of J(U) near U = 0
+        U_oc, dU/dJ(U_oc)   <- zero crossing and linear fit of U(J) near U_oc
+        R_s                 <- MPP method (Phang 1984) from J_sc, U_oc, MPP and both slopes
+    Dark curves:
+        R_p                 <- linear fit of J(U) near U = 0
+        R_s                 <- dU/dJ at the highest currents minus U_Te / J (diode 1 dominates)
+    J_s1, J_s2              <- linear least squares of J - J_ph - U_d / R_p = J_s1 (exp(U_d / U_Te) - 1) + J_s2 (exp(U_d / (2 U_Te)) - 1)
+                               with U_d = U - J R_s on the dark-like (diode dominated) points, relative weighting,
+                               repeated for R_s scanned around the slope estimate, R_s with the smallest residual is kept
+    Values which cannot be estimated (e.g. no U_oc in the sweep) fall back to the class defaults of 'twodiodemodel.SiCell'.
+    Finally refine_steps vectorized Levenberg-Marquardt steps polish the estimates of all curves together.
+    """
+
+    fraction_sc = 0.1                   # width of the fit window around U = 0 (relative to the voltage range)
+    fraction_oc = 0.03                  # half width of the fit window around U_oc (relative to the voltage range)
+    fraction_dark = 0.1                 # width of the fit window at the highest voltages of dark curves (relative to the voltage range)
+    diode_fraction_light = 0.02         # dark-like points of illuminated curves: diode current > diode_fraction_light * |J_sc|
+    diode_fraction_dark = 1.0e-6        # dark-like points of dark curves: diode current > diode_fraction_dark * max(J)
+    R_s_factors = np.geomspace(1.0 / 3.0, 3.0, 45)   # R_s scan around the slope estimate
+    refine_steps = 3                    # vectorized Levenberg-Marquardt steps after the analytic estimate (0: analytic estimate only)
+    J_floor = 1.0e-2                    # relative to max(|J|), weighting of the residuals (see class CurveFit)
+
+
+
+    def linear_fit(self, x, y, mask):
+        """
+        Linear least squares y = a + b * x over the points mask (per row), returns intercept a and slope b (nan for < 2 points)
+        """
+
+        w = mask.astype(float)
+        x = np.where(mask, x, 0.0)
+        y = np.where(mask, y, 0.0)
+        n = w.sum(axis=-1)
+        S_x = x.sum(axis=-1)
+        S_y = y.sum(axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            b = (n * (x * y).sum(axis=-1) - S_x * S_y) / (n * (x * x).sum(axis=-1) - S_x**2)
+            a = (S_y - b * S_x) / n
+
+        return np.where(n >= 2, a, np.nan), np.where(n >= 2, b, np.nan)
+
+
+
+    def refine(self, U, J, valid, T, guess, steps=None):
+        """
+        Polish the estimates guess (one column per row of U, J) at once with steps (default: refine_steps) Levenberg-Marquardt steps
+        (J_ph linear, the others logarithmic, weighting as in class CurveFit), steps which do not decrease the residual are rejected
+        returns the polished parameters and their sums of squared weighted residuals
+        """
+
+        weight = np.where(valid, 1.0 / (np.abs(J) + self.J_floor * np.max(np.where(valid, np.abs(J), 0.0), axis=-1, initial=0.0)[:, None]), 0.0)
+        U = np.where(valid, U, 0.0)
+        J = np.where(valid, J, 0.0)
+        T = T[:, None]
+
+        def cost(values):
+            J_model = tdb.SiCellBatch(*values[:, :, None], T).j(U)
+            return np.sum(((J_model - J) * weight)**2, axis=-1)
+
+        x = np.concatenate((guess[:1], np.log(guess[1:])))
+        damping = np.full(x.shape[1], 1.0e-3)
+        with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+            values = guess
+            S = cost(values)
+            for unused_i in range(self.refine_steps if steps is None else steps):
+                J_model, dJ = tdb.SiCellBatch(*values[:, :, None], T).jacobian(U)
+                dJ[1:] *= values[1:, :, None]
+                A = np.moveaxis(dJ * weight, 0, -1)
+                H = np.einsum('nki,nkj->nij', A, A)
+                g = np.einsum('nki,nk->ni', A, (J_model - J) * weight)
+                H_damped = H + damping[:, None, None] * H * np.eye(len(x))
+                singular = ~(np.isfinite(H_damped).all(axis=(1, 2)) & np.isfinite(g).all(axis=-1))
+                H_damped[singular] = np.eye(len(x))
+                g[singular] = 0.0
+                dx = - np.einsum('nij,nj->ni', np.linalg.pinv(H_damped), g).T
+                values_new = np.concatenate((x[:1] + dx[:1], np.exp(x[1:] + dx[1:])))
+                S_new = cost(values_new)
+                accept = np.isfinite(S_new) & (S_new < S)
+                x = np.where(accept, x + dx, x)
+                values = np.where(accept, values_new, values)
+                S = np.where(accept, S_new, S)
+                damping = np.where(accept, damping * 0.1, damping * 10.0)
+
+        return values, S
+
+
+
+    def two_exponential(self, U, J, valid, U_Te, J_ph, R_p, J_D_min, R_s):
+        """
+        Linear least squares of the diode current J_D = J - J_ph - U_d / R_p = J_s1 (exp(U_d / U_Te) - 1) + J_s2 (exp(U_d / (2 U_Te)) - 1)
+        with relative weighting on the points with U_d = U - J R_s > 2 U_Te and J_D > J_D_min (all inputs broadcast, points on the last axis)
+        returns J_s1, J_s2 (single exponential if one of both would be negative) and the mean squared relative residual (inf if not possible)
+        """
+
+        U_d = U - J * R_s
+        J_D = J - J_ph - U_d / R_p
+        diode = valid & (U_d > 2.0 * U_Te) & (J_D > J_D_min)
+        a_1 = np.where(diode, np.expm1(U_d / U_Te) / J_D, 0.0)
+        a_2 = np.where(diode, np.expm1(U_d / (2.0 * U_Te)) / J_D, 0.0)
+        b = diode.astype(float)
+        S_11, S_12, S_22 = (a_1 * a_1).sum(-1), (a_1 * a_2).sum(-1), (a_2 * a_2).sum(-1)
+        S_1b, S_2b = (a_1 * b).sum(-1), (a_2 * b).sum(-1)
+        determinant = S_11 * S_22 - S_12**2
+        J_s1 = (S_22 * S_1b - S_12 * S_2b) / determinant
+        J_s2 = (S_11 * S_2b - S_12 * S_1b) / determinant
+        both = (J_s1 > 0.0) & (J_s2 > 0.0)
+        J_s1 = np.where(both, J_s1, np.where(J_s1 > 0.0, S_1b / S_11, 0.0))
+        J_s2 = np.where(both, J_s2, np.where(J_s1 > 0.0, 0.0, S_2b / S_22))
+        n = b.sum(-1)
+        S = ((a_1 * J_s1[..., None] + a_2 * J_s2[..., None] - b)**2).sum(-1) / n
+
+        return J_s1, J_s2, np.where((n >= 3) & np.isfinite(S), S, np.inf)
+
+
+
+    def estimate(self, U, J, T):
+        """
+        Purpose:    Estimate start values of the two-diode-model parameters from measured curves
+
+        Model:      see class docstring, Phang (1984) for R_s of illuminated curves
+
+        Input:      Measured voltages U in V and current densities J in A/m**2 (1-D or 2-D, rows padded with nan)
+                    Measurement temperature T in K (scalar or one per row)
+
+        Output:     Array of J_ph, J_s1, J_s2 in A/m**2, R_s, R_p in Ohm*m**2 (shape (5,) or (5, n_curves))
+        """
+
+        U = np.asarray(U, dtype=float)
+        J = np.asarray(J, dtype=float)
+        one_curve = U.ndim == 1
+        U = np.atleast_2d(U)
+        J = np.atleast_2d(J)
+        if U.shape[-1] < 2:                     # empty or single point curves: pad, their values fall back to the defaults
+            pad = ((0, 0), (0, 2 - U.shape[-1]))
+            U = np.pad(U, pad, constant_values=np.nan)
+            J = np.pad(J, pad, constant_values=np.nan)
+        valid = np.isfinite(U) & np.isfinite(J)
+        order = np.argsort(np.where(valid, U, np.inf), axis=-1)
+        U = np.take_along_axis(np.where(valid, U, np.nan), order, axis=-1)
+        J = np.take_along_axis(np.where(valid, J, np.nan), order, axis=-1)
+        valid = np.take_along_axis(valid, order, axis=-1)
+        U_Te = k_B * np.broadcast_to(np.asarray(T, dtype=float), U.shape[:1])
+        U_top = np.max(np.where(valid, U, -np.inf), axis=-1)
+        U_range = U_top - np.min(np.where(valid, U, np.inf), axis=-1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # slope near J_sc
+            J_sc, dJ_sc = self.linear_fit(U, J, valid & (np.abs(U) <= self.fraction_sc * U_range[:, None]))
+            R_p = 1.0 / dJ_sc
+
+            # zero crossing and slope near U_oc
+            crossing = (J[:, :-1] <= 0.0) & (J[:, 1:] > 0.0)
+            illuminated = (J_sc < 0.0) & crossing.any(axis=-1)
+            k = np.argmax(crossing, axis=-1)[:, None]
+            U_k, U_k1 = np.take_along_axis(U, k, -1)[:, 0], np.take_along_axis(U, k + 1, -1)[:, 0]
+            J_k, J_k1 = np.take_along_axis(J, k, -1)[:, 0], np.take_along_axis(J, k + 1, -1)[:, 0]
+            U_oc = np.where(illuminated, U_k - J_k * (U_k1 - U_k) / (J_k1 - J_k), np.nan)
+            unused_U, R_so = self.linear_fit(J, U, valid & (np.abs(U - U_oc[:, None]) <= self.fraction_oc * U_range[:, None]))
+
+            # MPP location and Phang's method (currents counted positive)
+            P = np.where(valid & (U >= 0.0) & (U <= U_oc[:, None]), U * J, np.inf)
+            i_m = np.argmin(P, axis=-1)[:, None]
+            U_m, I_m = np.take_along_axis(U, i_m, -1)[:, 0], - np.take_along_axis(J, i_m, -1)[:, 0]
+            I_sc = - J_sc
+            I_oc = I_sc - U_oc / R_p
+            nU_Te = (U_m + R_so * I_m - U_oc) / (np.log(I_sc - U_m / R_p - I_m) - np.log(I_oc) + I_m / I_oc)
+            R_s_light = R_so - nU_Te / I_oc
+
+            # slope at the highest currents of dark curves
+            top = valid & (U >= (U_top - self.fraction_dark * U_range)[:, None])
+            unused_U, R_top = self.linear_fit(J, U, top)
+            J_top = np.where(top, J, 0.0).sum(axis=-1) / top.sum(axis=-1)
+            R_s_dark = R_top - U_Te / J_top
+
+            R_s = np.where(illuminated, R_s_light, R_s_dark)
+            R_s = np.where(np.isfinite(R_s) & (R_s > 0.0), R_s, tdm.SiCell.R_s_typical)
+            R_p = np.where(np.isfinite(R_p) & (R_p > 0.0), R_p, tdm.SiCell.R_p_typical)
+            J_sc = np.where(np.isfinite(J_sc), J_sc, 0.0)
+            J_ph = np.where(illuminated, J_sc * (1.0 + R_s / R_p), tdm.SiCell.J_ph)
+
+            # R_s scan with the two-exponential linear least squares on the dark-like points, parabolic refinement of the minimum
+            J_D_min = np.where(illuminated, self.diode_fraction_light * np.abs(J_sc), self.diode_fraction_dark * np.max(np.where(valid, J, -np.inf), axis=-1))
+            args = (U[:, None, :], J[:, None, :], valid[:, None, :], U_Te[:, None, None], J_ph[:, None, None], R_p[:, None, None], J_D_min[:, None, None])
+            ln_R_s = np.log(R_s)[:, None] + np.log(self.R_s_factors)
+            unused_J_s1, unused_J_s2, S = self.two_exponential(*args, np.exp(ln_R_s)[:, :, None])
+            k = np.clip(np.argmin(S, axis=-1), 1, len(self.R_s_factors) - 2)[:, None]
+            S_l, S_k, S_r = (np.take_along_axis(S, k + i, -1)[:, 0] for i in (-1, 0, 1))
+            step = np.log(self.R_s_factors[1] / self.R_s_factors[0])
+            shift = np.clip(0.5 * (S_l - S_r) / (S_l - 2.0 * S_k + S_r), -1.0, 1.0)
+            ln_R_s = np.take_along_axis(ln_R_s, k, -1)[:, 0] + np.where(np.isfinite(shift), shift, 0.0) * step
+            R_s = np.where(np.isfinite(S_k), np.exp(ln_R_s), R_s)
+            J_s1, J_s2, unused_S = self.two_exponential(*(a[:, 0] for a in args), R_s[:, None])
+
+        J_s1 = np.where(np.isfinite(J_s1) & (J_s1 > 0.0), J_s1, tdm.SiCell.J_s1_typical)
+        J_s2 = np.where(np.isfinite(J_s2) & (J_s2 > 0.0), J_s2, tdm.SiCell.J_s2_typical)
+
+        # J_ph from J(0) = J_sc with the voltage drop at R_s
+        J_ph = np.where(illuminated, J_ph - J_s1 * np.expm1(- J_sc * R_s / U_Te) - J_s2 * np.expm1(- J_sc * R_s / (2.0 * U_Te)), J_ph)
+        guess, unused_S = self.refine(U, J, valid, U_Te / k_B, np.array([J_ph, J_s1, J_s2, R_s, R_p]))
+
+        return guess[:, 0] if one_curve else guess
+
+
+
+class CurveFit:
+    """
+    Curve fit class
+
+    Call method 'fit' with *args 'U, J, T' to fit one measured curve at temperature T.
+    J_ph is fitted linearly, J_s1, J_s2, R_s, R_p logarithmically (bounded by lower and upper), with the analytic Jacobian
+    of 'twodiodemodel_batch.SiCellBatch'. The residuals are weighted by 1 / (|J| + J_floor * max(|J|)), so dark curves
+    are fitted over all decades of current and illuminated curves around J_sc, MPP and U_oc alike.
+
+    If the active effects of cell scale J_s1, J_s2 with temperature (J_sx_on or fit_J_sx_on), the fitted saturation
+    current densities are also referred to the initial temperature cell.T_ini (J_s1_T_ini, J_s2_T_ini).
+    """
+
+    parameters = ('J_ph', 'J_s1', 'J_s2', 'R_s', 'R_p')
+    lower = (-np.inf, 1.0e-20, 1.0e-16, 1.0e-9, 1.0e-4)    # A/m**2, A/m**2, A/m**2, Ohm*m**2, Ohm*m**2
+    upper = (np.inf, 1.0, 10.0, 1.0e-2, 1.0e4)              # A/m**2, A/m**2, A/m**2, Ohm*m**2, Ohm*m**2
+    J_floor = InitialGuess.J_floor      # relative to max(|J|)
+    initial = 'estimate'                # start values: 'estimate' (class InitialGuess) or 'defaults' (class defaults of SiCell)
+    max_nfev = 200
+    tolerance = 1.0e-10                 # relative (ftol, xtol)
+
+
+
+    def __init__(self, cell=None):
+        self.cell = tdm.SiCell() if cell is None else cell
+
+
+
+    def initial_guess(self, U, J, T):
+        """
+        Start values J_ph, J_s1, J_s2, R_s, R_p of the fit (see class attribute initial)
+        """
+
+        if self.initial == 'estimate':
+            return InitialGuess().estimate(U, J, T)
+
+        return np.array([tdm.SiCell.J_ph, tdm.SiCell.J_s1_typical, tdm.SiCell.J_s2_typical, tdm.SiCell.R_s_typical, tdm.SiCell.R_p_typical])
+
+
+
+    def to_x(self, values):
+        """
+        Transform parameters J_ph, J_s1, J_s2, R_s, R_p into the fit variables (J_ph, ln of the others)
+        """
+
+        values = np.clip(values, self.lower, self.upper)
+
+        return np.concatenate((values[:1], np.log(values[1:])))
+
+
+
+    def from_x(self, x):
+        """
+        Transform fit variables back into parameters J_ph, J_s1, J_s2, R_s, R_p
+        """
+
+        return np.concatenate((x[:1], np.exp(x[1:])))
+
+
+
+    def fit(self, U, J, T, p0=None):
+        """
+        Purpose:    Fit two-diode-model parameters to one measured curve
+
+        Model:      Weighted nonlinear least squares (scipy.optimize.least_squares, trust region reflective)
+
+        Input:      Measured voltages U in V and current densities J in A/m**2
+                    Measurement temperature T in K
+                    Optional start values p0 = (J_ph, J_s1, J_s2, R_s, R_p), default: method 'initial_guess'
+
+        Output:     Dictionary of the fitted parameters, J_s1_T_ini, J_s2_T_ini, RMS of the weighted residuals rms,
+                    number of function evaluations nfev, success (bool) and message
+        """
+
+        import scipy.optimize as sp_o
+
+        U = np.asarray(U, dtype=float)
+        J = np.asarray(J, dtype=float)
+        valid = np.isfinite(U) & np.isfinite(J)
+        U = U[valid]
+        J = J[valid]
+        if U.size < len(self.parameters):
+            raise ValueError('curve has less valid points than parameters')
+        weight = 1.0 / (np.abs(J) + self.J_floor * np.max(np.abs(J)))
+        p0 = self.initial_guess(U, J, T) if p0 is None else np.asarray(p0, dtype=float)
+
+        def residuals(x):
+            J_ph, J_s1, J_s2, R_s, R_p = self.from_x(x)
+            return (tdb.SiCellBatch(J_ph, J_s1, J_s2, R_s, R_p, T).j(U) - J) * weight
+
+        def jacobian(x):
+            values = self.from_x(x)
+            unused_J, dJ = tdb.SiCellBatch(*values, T).jacobian(U)
+            dJ[1:] *= values[1:, None]                  # chain rule d/d(ln p) = p * d/dp
+            return (dJ * weight).T
+
+        bounds = (self.to_x(np.array(self.lower, dtype=float)), self.to_x(np.array(self.upper, dtype=float)))
+        result = sp_o.least_squares(residuals, self.to_x(p0), jac=jacobian, bounds=bounds,
+                                    x_scale='jac', ftol=self.tolerance, xtol=self.tolerance, max_nfev=self.max_nfev)
+
+        fitted = dict(zip(self.parameters, self.from_x(result.x)))
+        fitted['J_s1_T_ini'], fitted['J_s2_T_ini'] = self.refer_to_T_ini(fitted, T)
+        fitted['rms'] = np.sqrt(np.mean(result.fun**2))
+        fitted['nfev'] = result.nfev
+        fitted['success'] = result.status > 0
+        fitted['message'] = result.message
+
+        return fitted
+
+
+
+    def refer_to_T_ini(self, fitted, T):
+        """
+        Refer fitted J_s1, J_s2 at temperature T to cell.T_ini with the temperature scaling of the cell's active effects
+        (J_s1 and J_s2 are proportional to J_s1_T_ini and J_s2_T_ini)
+        """
+
+        cell = self.cell
+        if not (cell.J_sx_on or cell.fit_J_sx_on) or cell.fit_tau_on:
+            return fitted['J_s1'], fitted['J_s2']
+        cell.set_values(fitted['J_ph'], 1.0, 1.0, fitted['R_s'], fitted['R_p'], cell.T_ini, T)
+        cell.activate_effects()
+
+        return fitted['J_s1'] / cell.J_s1, fitted['J_s2'] / cell.J_s2
+
+
+
+class MultiStartFit:
+    """
+    Multi-start fit class
+
+    Call method 'fit' with *args 'U, J, T' to fit one measured curve from n_seeds start values at once.
+    The seeds are scattered around the analytic initial guess (J_ph relative, J_s1, J_s2, R_s, R_p in decades, see seed_spread)
+    and advanced together by vectorized Levenberg-Marquardt steps in stages. After every stage all seeds share the
+    early-termination bound prune_factor * (best residual so far), seeds above it are dropped.
+    The surviving seeds are grouped into distinct minima (distance > distinct in J_ph relative / ln of the others),
+    one seed per minimum is polished by class CurveFit.
+    """
+
+    n_seeds = 64
+    seed = 0                            # random generator seed (reproducible start values)
+    seed_spread = (0.02, 2.0, 2.0, 1.0, 1.0)    # half widths: J_ph relative, J_s1, J_s2, R_s, R_p in decades
+    stages = (2, 4, 8)                  # Levenberg-Marquardt steps per stage
+    prune_factor = 4.0
+    distinct = 0.05                     # minimum distance of distinct minima
+    rms_tolerance = 0.1                 # minima with rms <= (1 + rms_tolerance) * best rms are equivalent (spread)
+
+
+
+    def __init__(self, cell=None):
+        self.curve_fit = CurveFit(cell)
+
+
+
+    def distance(self, x, x_ref):
+        """
+        Distance of fit variables x to x_ref (J_ph relative, the others in ln)
+        """
+
+        return np.max(np.abs(np.concatenate(((x[:1] - x_ref[:1]) / np.abs(x_ref[:1]), x[1:] - x_ref[1:]))), axis=0)
+
+
+
+    def fit(self, U, J, T):
+        """
+        Purpose:    Fit two-diode-model parameters to one measured curve from many start values
+
+        Input:      Measured voltages U in V and current densities J in A/m**2
+                    Measurement temperature T in K
+
+        Output:     Dictionary of class CurveFit for the best minimum plus
+                    minima (list of dictionaries of class CurveFit, sorted by rms),
+                    spread (dictionary parameter: (min, max) over the equivalent minima)
+        """
+
+        curve_fit = self.curve_fit
+        guess = InitialGuess()
+        U = np.asarray(U, dtype=float)
+        J = np.asarray(J, dtype=float)
+        valid = np.isfinite(U) & np.isfinite(J)
+        U = U[valid]
+        J = J[valid]
+
+        x_0 = curve_fit.to_x(guess.estimate(U, J, T))
+        spread = np.array(self.seed_spread) * np.r_[np.abs(x_0[0]), np.full(4, np.log(10.0))]
+        rng = np.random.default_rng(self.seed)
+        x = x_0[:, None] + spread[:, None] * rng.uniform(-1.0, 1.0, (len(x_0), self.n_seeds))
+        x[:, 0] = x_0
+        values = np.array([curve_fit.from_x(x_i) for x_i in x.T]).T
+        values = np.clip(values, np.array(curve_fit.lower)[:, None], np.array(curve_fit.upper)[:, None])
+
+        for steps in self.stages:
+            n = values.shape[1]
+            values, S = guess.refine(np.broadcast_to(U, (n, U.size)), np.broadcast_to(J, (n, J.size)), np.ones((n, U.size), dtype=bool),
+                                     np.full(n, float(T)), values, steps)
+            finite = np.isfinite(S)
+            if not finite.any():
+                raise ArithmeticError('multi-start fit: no start value has a finite residual')
+            keep = finite & (S <= self.prune_factor * np.nanmin(np.where(finite, S, np.nan)))
+            values = values[:, keep]
+            S = S[keep]
+
+        # one seed per distinct minimum, polished by least squares
+        order = np.argsort(S)
+        x = np.array([curve_fit.to_x(v) for v in values[:, order].T]).T
+        representatives = []
+        for i in range(x.shape[1]):
+            if all(self.distance(x[:, i], x[:, j]) > self.distinct for j in representatives):
+                representatives.append(i)
+        minima = []
+        for i in representatives:
+            fitted = curve_fit.fit(U, J, T, curve_fit.from_x(x[:, i]))
+            x_i = curve_fit.to_x(np.array([fitted[name] for name in curve_fit.parameters]))
+            if all(self.distance(x_i, x_j) > self.distinct for x_j, unused_fitted in minima):
+                minima.append((x_i, fitted))
+        minima = sorted((fitted for unused_x, fitted in minima), key=lambda fitted: fitted['rms'])
+
+        best = dict(minima[0])
+        equivalent = [fitted for fitted in minima if fitted['rms'] <= (1.0 + self.rms_tolerance) * best['rms']]
+        best['minima'] = minima
+        best['spread'] = {name: (min(f[name] for f in equivalent), max(f[name] for f in equivalent)) for name in curve_fit.parameters}
+
+        return best
+
+
+
+class BatchFit:
+    """
+    Batch fit class
+
+    Call method 'run' with *args 'campaign_path, out_path' to fit all curves of a campaign ('measurement_io.Campaign').
+    The curves are sharded into tasks of chunk_size curves which are spread over a process pool. Every worker opens
+    the (memory-mapped) campaign and its own copy of the cell once and keeps both warm over all of its tasks, so neither
+    curves nor material states are sent between the processes and the memory does not grow with the campaign size.
+    Results are written to the CSV table out_path as soon as a task has finished (unordered, column 'index' refers to the campaign).
+    At most tasks_per_process * processes tasks are in flight, further tasks are submitted as earlier ones finish.
+    Curves which cannot be fitted get a row with status 'failed' and the reason in column 'message'.
+    """
+
+    processes = None                    # worker processes (None: os.cpu_count(), 1: fit in this process)
+    chunk_size = 32                     # curves per task
+    tasks_per_process = 2               # tasks in flight per worker process
+    columns = ('index', 'cell_id', 'T', 'G') + CurveFit.parameters + ('J_s1_T_ini', 'J_s2_T_ini', 'rms', 'nfev', 'status', 'message')
+    worker = None                       # (campaign, curve fit) of the worker process
+
+
+
+    def __init__(self, cell=None):
+        self.cell = tdm.SiCell() if cell is None else cell
+
+
+
+    @staticmethod
+    def init_worker(campaign_path, cell):
+        """
+        Open campaign and curve fit once per worker process
+        """
+
+        BatchFit.worker = (mio.Campaign.load(campaign_path), CurveFit(copy.deepcopy(cell)))
+
+
+
+    @staticmethod
+    def fit_chunk(index):
+        """
+        Fit the curves index of the worker's campaign, returns a list of table rows (runs in the worker processes)
+        """
+
+        campaign, curve_fit = BatchFit.worker
+        T = np.asarray(campaign.T[index], dtype=float)
+        T = np.where(np.isfinite(T), T, curve_fit.cell.T_ini)
+        p0 = None
+        if curve_fit.initial == 'estimate':
+            try:
+                p0 = InitialGuess().estimate(*campaign.padded(np.asarray(index)), T)  # whole chunk at once
+            except (ValueError, ArithmeticError, IndexError, np.linalg.LinAlgError):
+                p0 = None                       # estimate curve by curve in CurveFit.fit, failing curves get status 'failed'
+        rows = []
+        for k, i in enumerate(index):
+            metadata = campaign.metadata(i)
+            row = {'index': i, 'cell_id': metadata['cell_id'], 'T': T[k], 'G': metadata['G']}
+            try:
+                fitted = curve_fit.fit(*campaign.curve(i), T[k], None if p0 is None else p0[:, k])
+                row.update(fitted)
+                row['status'] = 'ok' if fitted['success'] else 'not converged'
+            except (ValueError, ArithmeticError, np.linalg.LinAlgError) as error:
+                row['status'] = 'failed'
+                row['message'] = '%s: %s' % (type(error).__name__, error)
+            rows.append(row)
+
+        return rows
+
+
+
+    def run(self, campaign_path, out_path, index=None):
+        """
+        Purpose:    Fit all curves index (default: all) of the campaign at campaign_path and write the results to out_path
+
+        Input:      Campaign directory campaign_path, CSV output file out_path
+                    Optional sequence of curve indices index
+
+        Output:     Number of fitted curves, number of curves which were not fitted successfully
+        """
+
+        index = np.arange(len(mio.Campaign.load(campaign_path))) if index is None else np.asarray(index)
+        chunks = [index[i:i + self.chunk_size].tolist() for i in range(0, index.size, self.chunk_size)]
+        processes = self.processes or os.cpu_count()
+        n_failed = 0
+
+        with open(out_path, 'w', newline='') as fobj:
+            writer = csv.DictWriter(fobj, fieldnames=self.columns, extrasaction='ignore')
+            writer.writeheader()
+
+            def write(rows):
+                writer.writerows(rows)
+                fobj.flush()
+                return sum(row['status'] != 'ok' for row in rows)
+
+            if processes == 1 or len(chunks) <= 1:
+                self.init_worker(campaign_path, self.cell)
+                for chunk in chunks:
+                    n_failed += write(self.fit_chunk(chunk))
+            else:
+                with ProcessPoolExecutor(max_workers=processes, initializer=self.init_worker, initargs=(campaign_path, self.cell)) as executor:
+                    pending = iter(chunks)
+                    futures = set()
+                    for chunk in pending:
+                        futures.add(executor.submit(self.fit_chunk, chunk))
+                        if len(futures) >= self.tasks_per_process * processes:
+                            break
+                    while futures:
+                        done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                        while done:
+                            n_failed += write(done.pop().result())          # rows written, future dropped
+                            chunk = next(pending, None)
+                            if chunk is not None:
+                                futures.add(executor.submit(self.fit_chunk, chunk))
+
+        return index.size, n_failed
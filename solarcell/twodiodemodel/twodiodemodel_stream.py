@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Fit two-diode-model parameters to a continuous stream of measured J(U) curves (e.g. an inline tester)
+            Warm-start every fit from a running estimate of the previous cells and flag drifting parameters
+
+Requires:   twodiodemodel_fit.py (which itself uses twodiodemodel.py and twodiodemodel_batch.py)
+"""
+
+import asyncio
+import time
+from . import twodiodemodel_fit as tdf
+import numpy as np
+#==============================================================================
+
+class StreamFit:
+    """
+    Stream fit class
+
+    Call method 'run' with *args 'curves' (iterable of (U, J, T) tuples) or 'run_async' with *args 'queue'
+    (asyncio.Queue of (U, J, T) tuples, None ends the stream) to fit curve after curve.
+
+    Every fit starts from the exponentially weighted moving average (EWMA, weight alpha of the newest fit) of the previous fits
+    with at most max_nfev_warm function evaluations. If this warm fit does not converge or its residual exceeds rms_limit,
+    the curve is fitted again from the analytic initial guess (cold fit).
+    Control limits are center +- k_sigma standard deviations, with center line and variance as slower EWMA (weight alpha_limits,
+    J_ph linear, the other parameters logarithmic), active after n_warmup fits (weights 1 / n during the warm-up). Optional fixed control limits
+    limits = {'R_s': (low, high), ...} (in the units of the parameters) are checked as well. Failed and not converged fits,
+    fits above rms_limit and fits outside the control limits do not change the running estimate (n counts the fits which do).
+    """
+
+    alpha = 0.1                         # EWMA weight of the newest fit (warm start)
+    alpha_limits = 0.02                 # EWMA weight of the newest fit (center line and variance of the control limits)
+    max_nfev_warm = 20
+    rms_limit = 1.0e-2                  # RMS of the weighted residuals, above: cold fit, not used for the running estimate
+    n_warmup = 20                       # fits before the statistical control limits are active
+    k_sigma = 3.0
+    limits = None                       # fixed control limits {parameter: (low, high)}
+    fit_errors = (ValueError, ArithmeticError, np.linalg.LinAlgError)         # curves which cannot be fitted (status 'failed')
+
+
+
+    def __init__(self, cell=None):
+        self.curve_fit = tdf.CurveFit(cell)
+        self.reset()
+
+
+
+    def reset(self):
+        """
+        Forget the running estimate (e.g. at the start of a new wafer lot)
+        """
+
+        self.n = 0
+        self.mean = None
+        self.center = None
+        self.variance = None
+
+
+
+    def update(self, U, J, T):
+        """
+        Purpose:    Fit one curve of the stream and update the running estimate
+
+        Model:      Only converged fits within rms_limit and without drift update the running estimate and the control limits. Curves which
+                    cannot be fitted return status 'failed' and the reason in 'message', the stream goes on.
+
+        Input:      Measured voltages U in V and current densities J in A/m**2
+                    Measurement temperature T in K
+
+        Output:     Dictionary of class 'twodiodemodel_fit.CurveFit' plus status ('ok', 'not converged' or 'failed'),
+                    warm (bool, warm fit accepted), drift (tuple of the parameters outside their control limits) and latency in s
+        """
+
+        start = time.perf_counter()
+        curve_fit = self.curve_fit
+        fitted = None
+        if self.mean is not None:
+            max_nfev = curve_fit.max_nfev
+            curve_fit.max_nfev = self.max_nfev_warm
+            try:
+                fitted = curve_fit.fit(U, J, T, curve_fit.from_x(self.mean))
+            except self.fit_errors:
+                fitted = None
+            finally:
+                curve_fit.max_nfev = max_nfev
+            if fitted is not None and (not fitted['success'] or fitted['rms'] > self.rms_limit):
+                fitted = None
+        warm = fitted is not None
+        if not warm:
+            try:
+                fitted = curve_fit.fit(U, J, T)
+            except self.fit_errors as error:
+                return {'status': 'failed', 'message': '%s: %s' % (type(error).__name__, error), 'warm': False, 'drift': (),
+                        'latency': time.perf_counter() - start}
+
+        values = np.array([fitted[name] for name in curve_fit.parameters])
+        x = curve_fit.to_x(values)
+        drift = []
+        if self.n >= self.n_warmup:
+            drift = [name for name, x_i, center_i, variance_i in zip(curve_fit.parameters, x, self.center, self.variance)
+                     if abs(x_i - center_i) > self.k_sigma * np.sqrt(variance_i)]
+        if self.limits is not None:
+            drift += [name for name, value in zip(curve_fit.parameters, values)
+                      if name in self.limits and not self.limits[name][0] <= value <= self.limits[name][1] and name not in drift]
+
+        if fitted['success'] and fitted['rms'] <= self.rms_limit and not drift and np.all(np.isfinite(x)):
+            if self.mean is None:
+                self.mean = x
+                self.center = x
+                self.variance = np.zeros_like(x)
+            else:
+                weight = max(self.alpha, 1.0 / (self.n + 1))            # plain mean during the warm-up
+                self.mean = self.mean + weight * (x - self.mean)
+                weight = max(self.alpha_limits, 1.0 / (self.n + 1))     # plain mean and variance during the warm-up
+                deviation = x - self.center
+                self.center = self.center + weight * deviation
+                self.variance = (1.0 - weight) * (self.variance + weight * deviation**2)
+            self.n += 1
+
+        fitted['status'] = 'ok' if fitted['success'] else 'not converged'
+        fitted['warm'] = warm
+        fitted['drift'] = tuple(drift)
+        fitted['latency'] = time.perf_counter() - start
+
+        return fitted
+
+
+
+    def run(self, curves):
+        """
+        Fit all curves (iterable of (U, J, T) tuples) one after another, yields the result dictionaries of method 'update'
+        """
+
+        for U, J, T in curves:
+            yield self.update(U, J, T)
+
+
+
+    async def run_async(self, queue):
+        """
+        Fit the curves of an asyncio.Queue of (U, J, T) tuples until None is received, yields the result dictionaries of method 'update'
+        Fits run in the default executor, so the event loop keeps serving the tester meanwhile
+        """
+
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield await loop.run_in_executor(None, self.update, *item)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Author:     Tobias Ried, 2022
+
+Purpose:    Tests of the evaluation service (solarcell/service.py) against an in-process instance: batched 'j' and
+            'characteristics' requests agree with 'twodiodemodel.SiCell', names outside the parameter models are rejected
+
+Requires:   service.py, cli.py (configure_cell), twodiodemodel.py
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from solarcell import cli
+from solarcell import service as sv
+from solarcell.twodiodemodel import twodiodemodel as tdm
+#==============================================================================
+
+class ServiceTest(unittest.TestCase):
+
+    cells = [{'J_ph': -350.0, 'R_s': 2.0e-5, 'T_sim': 298.15}, {'J_ph': -300.0, 'R_s': 8.0e-5, 'T_sim': 333.15},
+             {'J_ph': -380.0, 'R_p': 0.1, 'T_sim': 310.0}]
+    U = [-0.1, 0.0, 0.3, 0.55, 0.62]
+
+
+
+    def handle_all(self, requests):
+        """
+        Send all requests concurrently to a new in-process service, returns the responses and the service
+        """
+
+        service = sv.Service()
+
+        async def main():
+            return await asyncio.gather(*(service.handle(request) for request in requests))
+
+        return asyncio.run(main()), service
+
+
+
+    def reference(self, values):
+        return cli.configure_cell(tdm.SiCell(), values)
+
+
+
+    def test_j(self):
+        requests = [{'id': i, 'op': 'j', 'cell': self.cells[i % len(self.cells)], 'U': self.U} for i in range(30)]
+        responses, service = self.handle_all(requests)
+        self.assertLess(service.n_batches, len(requests))                   # collected into batches
+        for request, response in zip(requests, responses):
+            self.assertEqual(response['id'], request['id'])
+            J = self.reference(request['cell']).j_u_curve(self.U)
+            np.testing.assert_allclose(response['J'], J, rtol=1.0e-9, atol=1.0e-9)
+
+
+
+    def test_characteristics(self):
+        requests = [{'id': i, 'op': 'characteristics', 'cell': cell} for i, cell in enumerate(self.cells)]
+        responses, unused_service = self.handle_all(requests)
+        for request, response in zip(requests, responses):
+            characteristics = self.reference(request['cell']).characteristics()
+            np.testing.assert_allclose([response[name] for name in sv.Service.characteristics_names], characteristics, rtol=1.0e-6)
+
+
+
+    def test_model(self):
+        args = [300.0, 1.0e22, 1.0e16]
+        responses, unused_service = self.handle_all([{'op': 'model', 'model': name, 'args': args} for name in
+                                                     ('mobilities.Klaassen.mu_i_bulk', 'solarcell.parameters.mobilities.Klaassen.mu_i_bulk')])
+        self.assertEqual(responses[0], responses[1])
+        self.assertNotIn('error', responses[0])
+
+
+
+    def test_rejected_models(self):
+        names = ['os.system.x', 'subprocess.Popen.wait', 'builtins.object.__subclasses__', 'bandgap_exampleplot.Eg.eg_paessler2002',
+                 'grid_evaluator.GridEvaluator.evaluate', 'mobilities.np.load', 'mobilities._Klaassen.x', 'a.b.c.d.e', ['mobilities']]
+        modules = set(sys.modules)
+        responses, service = self.handle_all([{'id': i, 'op': 'model', 'model': name, 'args': [1.0]} for i, name in enumerate(names)])
+        for name, response in zip(names, responses):
+            self.assertIn('error', response, name)
+        self.assertEqual(service.models, {})
+        self.assertFalse([name for name in set(sys.modules) - modules if 'exampleplot' in name or name.startswith('matplotlib')])
+
+
+
+if __name__ == '__main__':
+    unittest.main()